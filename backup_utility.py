@@ -10,27 +10,120 @@ import hashlib
 import json
 import shutil
 import argparse
+import fnmatch
 import gzip
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Set, List, Optional, Tuple, Callable
+from typing import Dict, Set, List, Optional, Tuple, Callable, Iterator
 from dataclasses import dataclass, asdict, field
 import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+try:
+    import zstandard  # Optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCompressor:
+    """
+    Standard gzip. Blocks are compressed independently into gzip members;
+    concatenated members are one valid .gz stream to gunzip and Python.
+    """
+    name = 'gzip'
+    suffix = '.gz'
+    default_level = 6
+    fast_level = 1
+    
+    @staticmethod
+    def compress(data: bytes, level: int) -> bytes:
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    
+    @staticmethod
+    def decompress(data: bytes) -> bytes:
+        return gzip.decompress(data)
+    
+    @staticmethod
+    def open_reader(path: Path):
+        return gzip.open(path, 'rb')
+
+
+class ZstdCompressor:
+    """Zstandard via the optional zstandard package; blocks become concatenated frames."""
+    name = 'zstd'
+    suffix = '.zst'
+    default_level = 3
+    fast_level = 1
+    
+    @staticmethod
+    def _require():
+        if zstandard is None:
+            raise OSError("zstd compression needs the zstandard package (pip install zstandard)")
+    
+    @staticmethod
+    def compress(data: bytes, level: int) -> bytes:
+        ZstdCompressor._require()
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    
+    @staticmethod
+    def decompress(data: bytes) -> bytes:
+        ZstdCompressor._require()
+        return zstandard.ZstdDecompressor().decompress(data)
+    
+    @staticmethod
+    def open_reader(path: Path):
+        ZstdCompressor._require()
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, 'rb'), read_across_frames=True, closefd=True)
+
+
+COMPRESSORS = {c.name: c for c in (GzipCompressor, ZstdCompressor)}
+COMPRESSOR_SUFFIXES = {c.suffix: c for c in (GzipCompressor, ZstdCompressor)}
+DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+# Already-compressed formats are stored as they are
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.zip', '.7z', '.rar',
+    '.jar', '.whl', '.apk', '.docx', '.xlsx', '.pptx', '.odt',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.aac', '.ogg', '.flac', '.mp4', '.mkv', '.mov', '.avi', '.webm',
+}
 
 
 @dataclass
 class FileHash:
-    """Stores hash information for a file."""
+    """Stores hash information for a file (only the backup's algorithm is filled in)."""
     path: str
     size: int
     mtime: float
-    md5: str
-    sha256: str
+    md5: str = ''
+    sha256: str = ''
+    mtime_ns: int = 0
+    inode: int = 0
+    chunks: List[str] = field(default_factory=list)  # Repository format only
+    compression: str = ''  # Mirror format: compressor name, '' if stored plain
+    
+    def get_digest(self, algorithm: str) -> str:
+        return self.md5 if algorithm == 'md5' else self.sha256
+    
+    def set_digest(self, algorithm: str, digest: str):
+        if algorithm == 'md5':
+            self.md5 = digest
+        else:
+            self.sha256 = digest
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        # Shallow copy; asdict's deep copy is slow for 1M entries
+        data = dict(self.__dict__)
+        if not self.chunks:
+            del data['chunks']
+        if not self.compression:
+            del data['compression']
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'FileHash':
@@ -44,11 +137,15 @@ class BackupManifest:
     timestamp: str
     source_path: str
     dest_path: str
+    format: str = 'mirror'  # 'mirror' tree or deduplicated chunk 'repository'
     files_backed_up: int = 0
     files_skipped: int = 0
     files_removed: int = 0
     bytes_transferred: int = 0
     total_size: int = 0
+    chunks_stored: int = 0
+    chunks_reused: int = 0
+    bytes_stored: int = 0
     errors: List[str] = field(default_factory=list)
     
     def to_dict(self) -> Dict:
@@ -60,37 +157,79 @@ class BackupUtility:
     Incremental backup utility using file hashing.
     
     Features:
-    - MD5 and SHA256 file hashing for integrity
-    - Incremental backups (only changed files)
+    - MD5 or SHA256 file hashing for integrity, computed while copying
+    - Incremental backups (only changed files); unchanged files are found
+      from a persisted stat index without being read
     - Manifest tracking for each backup
-    - Compression support
-    - Parallel file processing
+    - Compression support (gzip or zstd), with the level picked per file
+      and large files compressed block-parallel
+    - Optional repository format: files split into content-defined chunks,
+      each stored once under its SHA256 in .chunks/
+    - Parallel directory scanning and file processing
     - Dry-run mode
     """
     
+    # Read size for hashing and copying; large reads keep the per-chunk
+    # Python overhead negligible next to hashing and I/O
+    CHUNK_SIZE = 1024 * 1024
+    
+    # Content-defined chunking for the repository format (FastCDC-style gear
+    # hash). The hash rolls over every byte and depends only on the last 64,
+    # so a chunk ends where its CHUNK_MASK bits are zero and boundaries move
+    # with inserted data. Hashing starts 64 bytes before MIN_CHUNK, which
+    # keeps the per-byte Python loop to a few KB per chunk.
+    MIN_CHUNK = 256 * 1024
+    MAX_CHUNK = 4 * 1024 * 1024
+    CHUNK_MASK = ((1 << 12) - 1) << 52  # high bits: they see the whole window
+    GEAR = tuple(int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big') for i in range(256))
+    
+    # Files up to MIN_COMPRESS_SIZE are stored plain; from LARGE_FILE_SIZE
+    # the compressor's fast level is used. Files of unknown type larger than
+    # PROBE_SIZE are stored plain if their first PROBE_SIZE bytes barely shrink.
+    MIN_COMPRESS_SIZE = 1024
+    LARGE_FILE_SIZE = 64 * 1024 * 1024
+    PROBE_SIZE = 64 * 1024
+    PROBE_MAX_RATIO = 0.9
+    
     def __init__(self, source: str, dest: str, 
                  compress: bool = False,
+                 compression: str = 'gzip',
                  checksum_algorithm: str = 'sha256',
                  threads: int = 4,
                  dry_run: bool = False,
                  exclude_patterns: List[str] = None,
-                 verbose: bool = False):
+                 verbose: bool = False,
+                 paranoid: bool = False,
+                 repository: bool = False):
         self.source = Path(source).resolve()
         self.dest = Path(dest).resolve()
         self.compress = compress
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+        self.compressor = COMPRESSORS[compression]
         self.checksum_algorithm = checksum_algorithm
         self.threads = threads
         self.dry_run = dry_run
         self.exclude_patterns = exclude_patterns or []
+        self._exclude = self._compile_excludes(self.exclude_patterns)
         self.verbose = verbose
+        self.paranoid = paranoid
+        self.repository = repository
+        self.chunks_dir = self.dest / '.chunks'
+        self._source_prefix = os.path.join(str(self.source), '')
         
         self.manifest = BackupManifest(
             backup_id=self._generate_backup_id(),
             timestamp=datetime.now().isoformat(),
             source_path=str(self.source),
             dest_path=str(self.dest),
+            format='repository' if repository else 'mirror',
         )
         
+        self._seen_chunks: Set[str] = set()
+        self._compress_pool: Optional[ThreadPoolExecutor] = None
         self.previous_hashes: Dict[str, FileHash] = {}
         self.current_hashes: Dict[str, FileHash] = {}
         self.lock = threading.Lock()
@@ -112,128 +251,341 @@ class BackupUtility:
                 pass
         return None
     
-    def _should_exclude(self, path: Path) -> bool:
+    def _load_previous_hashes(self) -> Dict[str, FileHash]:
+        """Load the hash index saved by the previous backup."""
+        hashes_path = self.dest / '.backup_hashes.json'
+        if not hashes_path.exists():
+            return {}
+        try:
+            with open(hashes_path, 'r') as f:
+                data = json.load(f)
+            return {path: FileHash.from_dict(info) for path, info in data.items()}
+        except (json.JSONDecodeError, IOError, TypeError) as e:
+            self.manifest.errors.append(f"Cannot load hash index, backing up everything: {e}")
+            return {}
+    
+    @staticmethod
+    def _compile_excludes(patterns: List[str]) -> Optional['re.Pattern']:
+        """
+        Compile exclude patterns into one regex searched against the full path.
+        Plain patterns match as substrings; glob patterns (*, ?, [) match the
+        end of the path from a component boundary, so "*.tmp" matches any
+        .tmp file.
+        """
+        if not patterns:
+            return None
+        parts = []
+        for pattern in patterns:
+            if any(c in pattern for c in '*?['):
+                parts.append(f"(?:^|{re.escape(os.sep)}){fnmatch.translate(pattern)}")
+            else:
+                parts.append(re.escape(pattern))
+        return re.compile('|'.join(parts))
+    
+    def _should_exclude(self, path) -> bool:
         """Check if path should be excluded."""
-        path_str = str(path)
-        for pattern in self.exclude_patterns:
-            if pattern in path_str:
-                return True
-        return False
+        return self._exclude is not None and self._exclude.search(str(path)) is not None
     
-    def _calculate_hash(self, filepath: Path) -> Tuple[str, str]:
+    def _calculate_hash(self, filepath: Path) -> str:
         """
-        Calculate MD5 and SHA256 hashes for a file.
+        Calculate the hash of a file with the configured algorithm.
         Uses chunked reading for memory efficiency with large files.
         """
-        md5_hash = hashlib.md5()
-        sha256_hash = hashlib.sha256()
-        
-        # 64KB chunks for efficient processing
-        chunk_size = 65536
+        hasher = hashlib.new(self.checksum_algorithm)
+        buffer = bytearray(self.CHUNK_SIZE)
+        view = memoryview(buffer)
         
         with open(filepath, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                md5_hash.update(chunk)
-                sha256_hash.update(chunk)
+            while n := f.readinto(buffer):
+                hasher.update(view[:n])
         
-        return md5_hash.hexdigest(), sha256_hash.hexdigest()
+        return hasher.hexdigest()
     
-    def _hash_file(self, filepath: Path) -> Optional[FileHash]:
-        """Create FileHash entry for a file."""
-        try:
-            stat = filepath.stat()
-            rel_path = str(filepath.relative_to(self.source))
-            
-            if self._should_exclude(filepath):
+    def _previous_if_unchanged(self, file_hash: FileHash) -> Optional[FileHash]:
+        """Get the previous index entry if size, mtime and inode still match."""
+        prev = self.previous_hashes.get(file_hash.path)
+        if prev is None or prev.size != file_hash.size:
+            return None
+        if prev.mtime_ns:
+            if prev.mtime_ns != file_hash.mtime_ns or prev.inode != file_hash.inode:
                 return None
+        elif abs(prev.mtime - file_hash.mtime) > 0.001:  # Older index: 1ms tolerance
+            return None
+        return prev
+    
+    def _hash_file(self, filepath, stat: Optional[os.stat_result] = None) -> Optional[FileHash]:
+        """
+        Create FileHash entry for a file, from the walker's stat if given.
+        An unchanged file takes its hash from the index without being read
+        (re-hashed in paranoid mode); a changed file is hashed while it is
+        copied.
+        """
+        try:
+            if stat is None:
+                stat = os.stat(filepath)
+            path_str = str(filepath)
+            if path_str.startswith(self._source_prefix):
+                rel_path = path_str[len(self._source_prefix):]
+            else:
+                rel_path = os.path.basename(path_str)  # Source is a single file
             
-            md5, sha256 = self._calculate_hash(filepath)
-            
-            return FileHash(
+            file_hash = FileHash(
                 path=rel_path,
                 size=stat.st_size,
                 mtime=stat.st_mtime,
-                md5=md5,
-                sha256=sha256,
+                mtime_ns=stat.st_mtime_ns,
+                inode=stat.st_ino,
             )
+            prev = self._previous_if_unchanged(file_hash)
+            if prev is not None:
+                digest = prev.get_digest(self.checksum_algorithm)
+                if self.paranoid or not digest:
+                    digest = self._calculate_hash(filepath)
+                file_hash.set_digest(self.checksum_algorithm, digest)
+                file_hash.chunks = prev.chunks
+            return file_hash
         except (OSError, PermissionError) as e:
             with self.lock:
                 self.manifest.errors.append(f"Cannot hash {filepath}: {e}")
             return None
     
-    def _collect_files(self) -> List[Path]:
-        """Collect all files to be processed."""
+    def _scan_dir(self, path: str) -> Tuple[List[Tuple[str, os.stat_result]], List[str]]:
+        """List one directory: its files with their stats, and its subdirectories."""
         files = []
-        
-        if self.source.is_file():
-            return [self.source]
-        
+        subdirs = []
         try:
-            for root, dirs, filenames in os.walk(self.source):
-                root_path = Path(root)
-                
-                # Filter directories
-                dirs[:] = [d for d in dirs if not self._should_exclude(root_path / d)]
-                
-                for filename in filenames:
-                    filepath = root_path / filename
-                    if not self._should_exclude(filepath):
-                        files.append(filepath)
-                        self.manifest.total_size += filepath.stat().st_size
-        except PermissionError as e:
-            self.manifest.errors.append(f"Cannot access directory: {e}")
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if self._exclude is not None and self._exclude.search(entry.path):
+                        continue
+                    try:
+                        # Like os.walk, symlinked directories are not followed
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            files.append((entry.path, entry.stat()))
+                    except OSError as e:
+                        with self.lock:
+                            self.manifest.errors.append(f"Cannot stat {entry.path}: {e}")
+        except OSError as e:
+            with self.lock:
+                self.manifest.errors.append(f"Cannot access directory: {e}")
+        return files, subdirs
+    
+    def _collect_files(self) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        Walk the source, yielding (path, stat) for each file as soon as its
+        directory has been scanned. Directories are scanned in parallel and
+        stats come from the scandir entries, so each file is stat'ed once.
+        """
+        if self.source.is_file():
+            if not self._should_exclude(self.source):
+                stat = self.source.stat()
+                self.manifest.total_size += stat.st_size
+                yield str(self.source), stat
+            return
         
-        return files
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            pending = {executor.submit(self._scan_dir, str(self.source))}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    pending.update(executor.submit(self._scan_dir, d) for d in subdirs)
+                    for path, stat in files:
+                        self.manifest.total_size += stat.st_size
+                        yield path, stat
     
     def _needs_backup(self, file_hash: FileHash) -> bool:
         """Check if file needs to be backed up (changed or new)."""
-        if file_hash.path not in self.previous_hashes:
+        # New files and stat changes were not hashed yet
+        prev = self._previous_if_unchanged(file_hash)
+        if prev is None:
             return True
         
-        prev = self.previous_hashes[file_hash.path]
-        
-        # Check size first (fastest)
-        if prev.size != file_hash.size:
+        # Same stat: the hash only differs in paranoid mode, for a silent change
+        current = file_hash.get_digest(self.checksum_algorithm)
+        return not current or prev.get_digest(self.checksum_algorithm) != current
+    
+    def _compression_level(self, path: str, size: int) -> Optional[int]:
+        """Pick a compression level from file type and size (None: store plain)."""
+        if not self.compress or size <= self.MIN_COMPRESS_SIZE:
+            return None
+        if os.path.splitext(path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+            return None
+        if size >= self.LARGE_FILE_SIZE:
+            return self.compressor.fast_level
+        return self.compressor.default_level
+    
+    def _worth_compressing(self, first_block: bytes) -> bool:
+        """Probe the start of a file with a fast compression pass."""
+        if len(first_block) < self.PROBE_SIZE:
             return True
+        sample = first_block[:self.PROBE_SIZE]
+        return len(zlib.compress(sample, 1)) < len(sample) * self.PROBE_MAX_RATIO
+    
+    def _get_compress_pool(self) -> ThreadPoolExecutor:
+        # zlib and zstandard release the GIL while compressing, so threads
+        # compress blocks in parallel without pickling them to processes
+        with self.lock:
+            if self._compress_pool is None:
+                self._compress_pool = ThreadPoolExecutor(max_workers=self.threads)
+            return self._compress_pool
+    
+    def _copy_and_hash(self, source_file: Path, dest_file: Path,
+                       level: Optional[int]) -> Tuple[str, Optional[type], Path]:
+        """
+        Copy a file in a single read, feeding each block to both the hasher
+        and the destination. With a compression level, blocks are compressed
+        independently on the compression pool, so one large file uses every
+        thread, and written in order.
+        Returns the digest of the bytes read, the compressor used (None for
+        a plain copy) and the file written.
+        """
+        hasher = hashlib.new(self.checksum_algorithm)
         
-        # Check modification time
-        if abs(prev.mtime - file_hash.mtime) > 0.001:  # 1ms tolerance
-            return True
+        with open(source_file, 'rb') as f_in:
+            block = f_in.read(self.CHUNK_SIZE)
+            if level is not None and not self._worth_compressing(block):
+                level = None
+            
+            if level is None:
+                with open(dest_file, 'wb') as f_out:
+                    while block:
+                        hasher.update(block)
+                        f_out.write(block)
+                        block = f_in.read(self.CHUNK_SIZE)
+                shutil.copystat(source_file, dest_file)  # Keep mtime like copy2
+                return hasher.hexdigest(), None, dest_file
+            
+            compressor = self.compressor
+            dest_file = dest_file.with_name(dest_file.name + compressor.suffix)
+            pool = self._get_compress_pool()
+            pending = deque()
+            with open(dest_file, 'wb') as f_out:
+                while block:
+                    hasher.update(block)
+                    pending.append(pool.submit(compressor.compress, block, level))
+                    if len(pending) > self.threads:
+                        f_out.write(pending.popleft().result())
+                    block = f_in.read(self.CHUNK_SIZE)
+                while pending:
+                    f_out.write(pending.popleft().result())
         
-        # Finally, check hash
-        if self.checksum_algorithm == 'md5':
-            return prev.md5 != file_hash.md5
-        else:
-            return prev.sha256 != file_hash.sha256
+        return hasher.hexdigest(), compressor, dest_file
+    
+    def _find_cut(self, buf: bytearray, eof: bool) -> Optional[int]:
+        """Find the end of the next chunk in buf (None if more data is needed)."""
+        if len(buf) <= self.MIN_CHUNK:
+            return len(buf) if eof else None
+        end = min(len(buf), self.MAX_CHUNK)
+        gear, mask = self.GEAR, self.CHUNK_MASK
+        h = 0
+        for pos in range(self.MIN_CHUNK - 64, end):
+            h = ((h << 1) + gear[buf[pos]]) & 0xFFFFFFFFFFFFFFFF
+            if not h & mask and pos >= self.MIN_CHUNK:
+                return pos + 1
+        if len(buf) >= self.MAX_CHUNK or eof:
+            return end
+        return None
+    
+    def _split_chunks(self, f):
+        """Yield the content-defined chunks of an open file."""
+        buf = bytearray()
+        eof = False
+        while buf or not eof:
+            cut = self._find_cut(buf, eof)
+            if cut is None:
+                block = f.read(self.CHUNK_SIZE)
+                if block:
+                    buf += block
+                else:
+                    eof = True
+                continue
+            yield bytes(buf[:cut])
+            del buf[:cut]
+    
+    @staticmethod
+    def _chunk_file(chunks_dir: Path, chunk_id: str) -> Optional[Path]:
+        """Find a stored chunk, plain or compressed."""
+        path = chunks_dir / chunk_id[:2] / chunk_id
+        if path.exists():
+            return path
+        for suffix in COMPRESSOR_SUFFIXES:
+            candidate = path.with_name(chunk_id + suffix)
+            if candidate.exists():
+                return candidate
+        return None
+    
+    def _store_chunk(self, chunk_id: str, chunk: bytes, level: Optional[int]):
+        """Write a chunk to the store unless it is already there."""
+        with self.lock:
+            seen = chunk_id in self._seen_chunks
+            self._seen_chunks.add(chunk_id)
+        if seen or self._chunk_file(self.chunks_dir, chunk_id) is not None:
+            with self.lock:
+                self.manifest.chunks_reused += 1
+            return
+        
+        path = self.chunks_dir / chunk_id[:2] / chunk_id
+        if level is not None and len(chunk) > self.MIN_COMPRESS_SIZE:
+            path = path.with_name(chunk_id + self.compressor.suffix)
+            chunk = self.compressor.compress(chunk, level)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename so a reader never sees half a chunk
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(chunk)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.manifest.chunks_stored += 1
+            self.manifest.bytes_stored += len(chunk)
+    
+    def _store_file(self, file_hash: FileHash, source_file: Path):
+        """Store a file as chunks, recording its chunk list and digest from the same read."""
+        hasher = hashlib.new(self.checksum_algorithm)
+        chunk_ids = []
+        level = self._compression_level(file_hash.path, file_hash.size)
+        with open(source_file, 'rb') as f:
+            for i, chunk in enumerate(self._split_chunks(f)):
+                if i == 0 and level is not None and not self._worth_compressing(chunk):
+                    level = None
+                hasher.update(chunk)
+                chunk_id = hashlib.sha256(chunk).hexdigest()
+                self._store_chunk(chunk_id, chunk, level)
+                chunk_ids.append(chunk_id)
+        file_hash.chunks = chunk_ids
+        file_hash.set_digest(self.checksum_algorithm, hasher.hexdigest())
     
     def _backup_file(self, file_hash: FileHash, source_file: Path) -> bool:
-        """Copy a file to backup destination."""
+        """
+        Copy a file to backup destination, recording its hash.
+        The hash comes from the same read as the copy; verify_backup
+        re-reads the destination for an end-to-end check.
+        """
         try:
+            if self.repository:
+                if not self.dry_run:
+                    self._store_file(file_hash, source_file)
+                return True
+            
             dest_file = self.dest / file_hash.path
             dest_file.parent.mkdir(parents=True, exist_ok=True)
             
             if self.dry_run:
                 return True
             
-            if self.compress and file_hash.size > 1024:  # Compress files > 1KB
-                dest_file = dest_file.with_suffix(dest_file.suffix + '.gz')
-                with open(source_file, 'rb') as f_in:
-                    with gzip.open(dest_file, 'wb', compresslevel=6) as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-            else:
-                shutil.copy2(source_file, dest_file)
+            level = self._compression_level(file_hash.path, file_hash.size)
+            digest, compressor, written = self._copy_and_hash(source_file, dest_file, level)
+            file_hash.set_digest(self.checksum_algorithm, digest)
+            file_hash.compression = compressor.name if compressor else ''
             
-            # Verify backup with hash
-            dest_hash = self._calculate_hash(dest_file if not self.compress else 
-                                             self.dest / file_hash.path)
-            source_hash = (file_hash.md5, file_hash.sha256)
-            
-            if self.checksum_algorithm == 'md5':
-                if dest_hash[0] != source_hash[0]:
-                    raise IOError(f"Hash mismatch for {file_hash.path}")
-            else:
-                if dest_hash[1] != source_hash[1]:
-                    raise IOError(f"Hash mismatch for {file_hash.path}")
+            # Drop the previous copy if it was stored in another form
+            prev = self.previous_hashes.get(file_hash.path)
+            if prev is not None and prev.compression != file_hash.compression:
+                stale = self._stored_file(self.dest, prev.path, prev.compression)
+                if stale != written:
+                    stale.unlink(missing_ok=True)
             
             return True
             
@@ -247,11 +599,19 @@ class BackupUtility:
         removed = 0
         current_paths = set(self.current_hashes.keys())
         
+        if self.repository:
+            removed = sum(1 for old_path in self.previous_hashes if old_path not in current_paths)
+            if not self.dry_run:
+                self._remove_unreferenced_chunks()
+            return removed
+        
         for old_path in self.previous_hashes.keys():
             if old_path not in current_paths:
-                dest_file = self.dest / old_path
-                if self.compress:
-                    dest_file = dest_file.with_suffix(dest_file.suffix + '.gz')
+                prev = self.previous_hashes[old_path]
+                dest_file = self._stored_file(self.dest, old_path, prev.compression)
+                compressed_file = dest_file.with_suffix(dest_file.suffix + '.gz')
+                if not prev.compression and self.compress and compressed_file.exists():
+                    dest_file = compressed_file  # Index from before compression was recorded
                 
                 if not self.dry_run and dest_file.exists():
                     try:
@@ -266,6 +626,26 @@ class BackupUtility:
         
         return removed
     
+    def _remove_unreferenced_chunks(self):
+        """Delete chunks that only deleted or changed files referenced."""
+        dropped = set()
+        for path, prev in self.previous_hashes.items():
+            current = self.current_hashes.get(path)
+            if current is None or current.chunks is not prev.chunks:
+                dropped.update(prev.chunks)
+        if not dropped:
+            return
+        
+        for file_hash in self.current_hashes.values():
+            dropped.difference_update(file_hash.chunks)
+        for chunk_id in dropped:
+            chunk_file = self._chunk_file(self.chunks_dir, chunk_id)
+            if chunk_file is not None:
+                try:
+                    chunk_file.unlink()
+                except OSError as e:
+                    self.manifest.errors.append(f"Cannot remove chunk {chunk_id}: {e}")
+    
     def run(self) -> BackupManifest:
         """Execute the backup operation."""
         print(f"\n{'=' * 60}")
@@ -275,47 +655,56 @@ class BackupUtility:
         print(f" Destination: {self.dest}")
         print(f" Backup ID:   {self.manifest.backup_id}")
         print(f" Algorithm:   {self.checksum_algorithm}")
-        print(f" Compress:    {self.compress}")
+        print(f" Format:      {self.manifest.format}")
+        print(f" Compress:    {self.compressor.name if self.compress else False}")
         print(f" Threads:     {self.threads}")
+        print(f" Paranoid:    {self.paranoid}")
         print(f" Dry-run:     {self.dry_run}")
         print(f"{'=' * 60}\n")
         
         # Load previous manifest
         prev_manifest = self._load_previous_manifest()
-        if prev_manifest:
-            print(" Previous backup found. Loading hashes...")
-            # In a real implementation, load from a separate hashes file
-        
-        # Collect files
-        print(" Scanning source directory...")
-        files = self._collect_files()
-        print(f" Found {len(files)} files ({self._format_size(self.manifest.total_size)})")
+        if prev_manifest and prev_manifest.get('format', 'mirror') != self.manifest.format:
+            print(f" Previous backup is in {prev_manifest.get('format', 'mirror')} format, backing up everything")
+        else:
+            if prev_manifest:
+                print(" Previous backup found. Loading hashes...")
+            self.previous_hashes = self._load_previous_hashes()
+        if self.previous_hashes:
+            print(f"  {len(self.previous_hashes)} files in hash index")
         
         # Create destination directory
         if not self.dry_run:
             self.dest.mkdir(parents=True, exist_ok=True)
         
-        # Calculate hashes in parallel
-        print("\n Calculating file hashes...")
-        with ThreadPoolExecutor(max_workers=self.threads) as executor:
-            future_to_file = {executor.submit(self._hash_file, f): f for f in files}
-            
-            for i, future in enumerate(as_completed(future_to_file)):
-                file_hash = future.result()
-                if file_hash:
-                    self.current_hashes[file_hash.path] = file_hash
-                
-                if (i + 1) % 100 == 0 or i == len(files) - 1:
-                    print(f"  Progress: {i + 1}/{len(files)} files hashed", end='\r')
+        # Files stream from the walker into hashing; only paranoid mode reads
+        # unchanged files, so only it needs a hashing pool
+        # The walker's source path goes along with each file that needs backup
+        print(" Scanning source directory and calculating file hashes...")
+        files_to_backup = []
+        
+        def add(file_hash: Optional[FileHash], path: str):
+            if file_hash:
+                self.current_hashes[file_hash.path] = file_hash
+                if self._needs_backup(file_hash):
+                    files_to_backup.append((file_hash, Path(path)))
         
-        print(f"\n  {len(self.current_hashes)} files hashed successfully")
+        if self.paranoid:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                future_to_path = {executor.submit(self._hash_file, path, stat): path
+                                  for path, stat in self._collect_files()}
+                
+                for i, future in enumerate(as_completed(future_to_path)):
+                    add(future.result(), future_to_path[future])
+                    
+                    if (i + 1) % 100 == 0 or i == len(future_to_path) - 1:
+                        print(f"  Progress: {i + 1}/{len(future_to_path)} files hashed", end='\r')
+                print()
+        else:
+            for path, stat in self._collect_files():
+                add(self._hash_file(path, stat), path)
         
-        # Determine which files need backup
-        files_to_backup = [
-            (h, self.source / h.path) 
-            for h in self.current_hashes.values() 
-            if self._needs_backup(h)
-        ]
+        print(f" Found {len(self.current_hashes)} files ({self._format_size(self.manifest.total_size)})")
         
         self.manifest.files_skipped = len(self.current_hashes) - len(files_to_backup)
         print(f"\n Files to backup: {len(files_to_backup)} (skipped: {self.manifest.files_skipped})")
@@ -336,6 +725,13 @@ class BackupUtility:
                         self.manifest.bytes_transferred += file_hash.size
                         if self.verbose:
                             print(f"  + {file_hash.path}")
+                    else:
+                        # Keep the last good version indexed (and its chunks referenced)
+                        prev = self.previous_hashes.get(file_hash.path)
+                        if prev is not None:
+                            self.current_hashes[file_hash.path] = prev
+                        else:
+                            del self.current_hashes[file_hash.path]
                     
                     if (i + 1) % 10 == 0 or i == len(files_to_backup) - 1:
                         print(f"  Progress: {i + 1}/{len(files_to_backup)} files", end='\r')
@@ -345,6 +741,10 @@ class BackupUtility:
         self.manifest.files_removed = self._remove_deleted_files()
         print(f"  Removed {self.manifest.files_removed} obsolete files")
         
+        if self._compress_pool is not None:
+            self._compress_pool.shutdown()
+            self._compress_pool = None
+        
         # Save manifest
         if not self.dry_run:
             self._save_manifest()
@@ -358,6 +758,10 @@ class BackupUtility:
         print(f" Files skipped:    {self.manifest.files_skipped}")
         print(f" Files removed:    {self.manifest.files_removed}")
         print(f" Bytes transferred: {self._format_size(self.manifest.bytes_transferred)}")
+        if self.repository:
+            print(f" Chunks stored:    {self.manifest.chunks_stored} "
+                  f"({self._format_size(self.manifest.bytes_stored)}), "
+                  f"reused: {self.manifest.chunks_reused}")
         print(f" Errors:           {len(self.manifest.errors)}")
         
         if self.manifest.errors and self.verbose:
@@ -381,8 +785,10 @@ class BackupUtility:
         """Save file hashes for future incremental backups."""
         hashes_path = self.dest / '.backup_hashes.json'
         hashes_data = {k: v.to_dict() for k, v in self.current_hashes.items()}
+        # Compact, and dumps() rather than dump() to use the C encoder:
+        # this index is written and read back on every run
         with open(hashes_path, 'w') as f:
-            json.dump(hashes_data, f, indent=2)
+            f.write(json.dumps(hashes_data, separators=(',', ':')))
     
     @staticmethod
     def _format_size(size: int) -> str:
@@ -394,40 +800,94 @@ class BackupUtility:
         return f"{size:.2f} PB"
     
     @staticmethod
-    def verify_backup(manifest_path: str) -> bool:
-        """Verify backup integrity by re-checking all hashes."""
-        print(f"\n Verifying backup: {manifest_path}")
+    def _stored_file(backup_dir: Path, path_str: str, compression: str) -> Path:
+        """Path of a mirrored file as stored, with its compressor's suffix."""
+        if not compression:
+            return backup_dir / path_str
+        return backup_dir / (path_str + COMPRESSORS[compression].suffix)
+    
+    @staticmethod
+    def _read_backup_file(backup_dir: Path, path_str: str, hash_info: Dict, repository: bool):
+        """
+        Yield the original content of a backed-up file in blocks.
+        Raises FileNotFoundError if the file or one of its chunks is missing.
+        """
+        if repository:
+            chunks_dir = backup_dir / '.chunks'
+            for chunk_id in hash_info.get('chunks', []):
+                chunk_file = BackupUtility._chunk_file(chunks_dir, chunk_id)
+                if chunk_file is None:
+                    raise FileNotFoundError(f"chunk {chunk_id}")
+                data = chunk_file.read_bytes()
+                compressor = COMPRESSOR_SUFFIXES.get(chunk_file.suffix)
+                yield compressor.decompress(data) if compressor else data
+            return
         
+        compression = hash_info.get('compression', '')
+        file_path = BackupUtility._stored_file(backup_dir, path_str, compression)
+        opener = None
+        if compression:
+            opener = COMPRESSORS[compression].open_reader
+        elif not file_path.exists():
+            # Index from before compression was recorded: only gzip existed
+            file_path = file_path.with_suffix(file_path.suffix + '.gz')
+            opener = GzipCompressor.open_reader
+        with (opener(file_path) if opener else open(file_path, 'rb')) as f:
+            while block := f.read(BackupUtility.CHUNK_SIZE):
+                yield block
+    
+    @staticmethod
+    def _load_backup(manifest_path: str) -> Optional[Tuple[Path, Dict, Dict]]:
+        """Load a backup's manifest and hash index (None if either is missing)."""
         manifest_file = Path(manifest_path)
         if not manifest_file.exists():
             print(" Manifest not found!")
-            return False
+            return None
         
         backup_dir = manifest_file.parent
         hashes_path = backup_dir / '.backup_hashes.json'
         
         if not hashes_path.exists():
             print(" Hash file not found!")
-            return False
+            return None
         
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
         with open(hashes_path, 'r') as f:
             hashes_data = json.load(f)
+        return backup_dir, manifest, hashes_data
+    
+    @staticmethod
+    def verify_backup(manifest_path: str) -> bool:
+        """Verify backup integrity by re-checking all hashes."""
+        print(f"\n Verifying backup: {manifest_path}")
+        
+        loaded = BackupUtility._load_backup(manifest_path)
+        if loaded is None:
+            return False
+        backup_dir, manifest, hashes_data = loaded
+        repository = manifest.get('format', 'mirror') == 'repository'
         
         all_valid = True
         errors = []
         
         for path_str, hash_info in hashes_data.items():
-            file_path = backup_dir / path_str
-            if not file_path.exists():
+            # Recalculate the hash that was recorded
+            algorithm = 'sha256' if hash_info.get('sha256') else 'md5'
+            hasher = hashlib.new(algorithm)
+            try:
+                for block in BackupUtility._read_backup_file(backup_dir, path_str, hash_info, repository):
+                    hasher.update(block)
+            except FileNotFoundError:
                 all_valid = False
                 errors.append(f"Missing: {path_str}")
                 continue
+            except DECOMPRESS_ERRORS as e:
+                all_valid = False
+                errors.append(f"Corrupted: {path_str} ({e})")
+                continue
             
-            # Recalculate hash
-            utility = BackupUtility("", "")
-            md5, sha256 = utility._calculate_hash(file_path)
-            
-            if md5 != hash_info['md5'] or sha256 != hash_info['sha256']:
+            if hasher.hexdigest() != hash_info[algorithm]:
                 all_valid = False
                 errors.append(f"Corrupted: {path_str}")
         
@@ -439,6 +899,50 @@ class BackupUtility:
             for error in errors[:5]:
                 print(f"   - {error}")
             return False
+    
+    @staticmethod
+    def restore_backup(manifest_path: str, target: str) -> bool:
+        """Restore every file of a backup into target, checking each against its recorded hash."""
+        print(f"\n Restoring backup: {manifest_path} -> {target}")
+        
+        loaded = BackupUtility._load_backup(manifest_path)
+        if loaded is None:
+            return False
+        backup_dir, manifest, hashes_data = loaded
+        repository = manifest.get('format', 'mirror') == 'repository'
+        target_dir = Path(target).resolve()
+        
+        errors = []
+        for path_str, hash_info in hashes_data.items():
+            algorithm = 'sha256' if hash_info.get('sha256') else 'md5'
+            hasher = hashlib.new(algorithm)
+            target_file = target_dir / path_str
+            try:
+                target_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(target_file, 'wb') as f:
+                    for block in BackupUtility._read_backup_file(backup_dir, path_str, hash_info, repository):
+                        hasher.update(block)
+                        f.write(block)
+                mtime_ns = hash_info.get('mtime_ns') or int(hash_info['mtime'] * 1e9)
+                os.utime(target_file, ns=(mtime_ns, mtime_ns))
+            except FileNotFoundError:
+                errors.append(f"Missing: {path_str}")
+                continue
+            except DECOMPRESS_ERRORS as e:
+                errors.append(f"Cannot restore {path_str}: {e}")
+                continue
+            
+            if hasher.hexdigest() != hash_info[algorithm]:
+                errors.append(f"Corrupted: {path_str}")
+        
+        if not errors:
+            print(f" ✓ Restored {len(hashes_data)} files")
+            return True
+        else:
+            print(f" ✗ Restore incomplete! {len(errors)} files have issues.")
+            for error in errors[:5]:
+                print(f"   - {error}")
+            return False
 
 
 def main():
@@ -450,10 +954,14 @@ def main():
 Examples:
   %(prog)s /home/user/docs /backup/docs          # Basic backup
   %(prog)s -c /home/user/docs /backup/docs       # Compress files
+  %(prog)s -c --compression zstd src dest        # Compress with zstd
   %(prog)s -n /home/user/docs /backup/docs       # Dry-run (show what would happen)
   %(prog)s -v /home/user/docs /backup/docs       # Verbose output
+  %(prog)s --paranoid /home/user/docs /backup/docs  # Re-hash unchanged files too
   %(prog)s -e "*.tmp" -e "*.log" src dest        # Exclude patterns
+  %(prog)s -r /home/user/docs /backup/docs       # Deduplicated chunk repository
   %(prog)s --verify /backup/docs/.backup_manifest.json  # Verify backup
+  %(prog)s --restore /backup/docs/.backup_manifest.json /restore/docs  # Restore
         """
     )
     
@@ -462,7 +970,9 @@ Examples:
     parser.add_argument('dest', nargs='?',
                         help='Destination directory for backup')
     parser.add_argument('-c', '--compress', action='store_true',
-                        help='Compress backed up files with gzip')
+                        help='Compress backed up files (level chosen per file type and size)')
+    parser.add_argument('--compression', choices=sorted(COMPRESSORS), default='gzip',
+                        help='Compressor for --compress (default: gzip; zstd needs the zstandard package)')
     parser.add_argument('-a', '--algorithm', choices=['md5', 'sha256'], default='sha256',
                         help='Hash algorithm for integrity (default: sha256)')
     parser.add_argument('-t', '--threads', type=int, default=4,
@@ -473,8 +983,14 @@ Examples:
                         help='Exclude pattern (can be used multiple times)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Verbose output')
+    parser.add_argument('--paranoid', action='store_true',
+                        help='Re-hash files even when size, mtime and inode are unchanged')
+    parser.add_argument('-r', '--repository', action='store_true',
+                        help='Store files as deduplicated content-defined chunks instead of a mirrored tree')
     parser.add_argument('--verify', metavar='MANIFEST',
                         help='Verify backup integrity using manifest file')
+    parser.add_argument('--restore', nargs=2, metavar=('MANIFEST', 'TARGET'),
+                        help='Restore a backup into TARGET')
     
     args = parser.parse_args()
     
@@ -483,10 +999,17 @@ Examples:
         success = BackupUtility.verify_backup(args.verify)
         return 0 if success else 1
     
+    if args.restore:
+        success = BackupUtility.restore_backup(*args.restore)
+        return 0 if success else 1
+    
     # Validate arguments
     if not args.source or not args.dest:
         parser.error("source and dest are required (unless using --verify)")
     
+    if args.compression == 'zstd' and zstandard is None:
+        parser.error("--compression zstd needs the zstandard package (pip install zstandard)")
+    
     if not os.path.exists(args.source):
         print(f"Error: Source path '{args.source}' does not exist.", file=sys.stderr)
         return 1
@@ -496,11 +1019,14 @@ Examples:
         source=args.source,
         dest=args.dest,
         compress=args.compress,
+        compression=args.compression,
         checksum_algorithm=args.algorithm,
         threads=args.threads,
         dry_run=args.dry_run,
         exclude_patterns=args.exclude,
         verbose=args.verbose,
+        paranoid=args.paranoid,
+        repository=args.repository,
     )
     
     try:
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for backup_utility.
+
+pipeline: hash-and-copy throughput (MB/s) of the original three-pass
+          per-file path (MD5+SHA256 read, copy2, re-hash the copy) against
+          the single-pass tee into one hasher and the destination.
+incremental: wall time of a backup run over a tree of tiny files where
+          nothing changed since the last run, using the persisted stat index,
+          against the same run with --paranoid re-hashing every file.
+dedup:    bytes written by the mirror and repository formats for an initial
+          backup followed by typical incremental changes (an insert into a
+          large binary, a log append, a few small edits, a copied directory),
+          and the dedup ratio (bytes of changed files per byte stored).
+compression: throughput (MB/s of input) compressing one large log-like file
+          with the original single gzip stream against the block-parallel
+          compressors at each thread count. Scaling needs free cores; on a
+          single CPU the thread counts only add scheduling overhead.
+
+Usage:
+    python bench_backup_utility.py pipeline [--small-files 2000] [--small-kb 16]
+                                            [--large-files 2] [--large-mb 512] [--threads 4]
+    python bench_backup_utility.py incremental [--files 100000] [--threads 4]
+    python bench_backup_utility.py dedup [--large-mb 64] [--log-mb 16] [--small-files 200]
+    python bench_backup_utility.py compression [--mb 64] [--threads 1,2,4,8]
+"""
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from backup_utility import COMPRESSORS, BackupUtility, FileHash, zstandard
+
+
+def make_tree(root: Path, small_files: int, small_kb: int, large_files: int, large_mb: int) -> int:
+    """Write a tree of many small files and a few large ones. Returns total bytes."""
+    total = 0
+    block = os.urandom(1024 * 1024)
+    for i in range(small_files):
+        path = root / f"dir{i % 50}" / f"file{i}.dat"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(small_kb * 1024))
+        total += small_kb * 1024
+    for i in range(large_files):
+        with open(root / f"large{i}.bin", 'wb') as f:
+            for _ in range(large_mb):
+                f.write(block)
+        total += large_mb * 1024 * 1024
+    return total
+
+
+def legacy_backup_file(source_file: Path, dest_file: Path):
+    """The original per-file path: hash, copy, then hash the copy again."""
+    def both_hashes(path):
+        md5, sha256 = hashlib.md5(), hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(65536):
+                md5.update(chunk)
+                sha256.update(chunk)
+        return md5.hexdigest(), sha256.hexdigest()
+
+    source_hash = both_hashes(source_file)
+    dest_file.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(source_file, dest_file)
+    if both_hashes(dest_file)[1] != source_hash[1]:
+        raise IOError(f"Hash mismatch for {dest_file}")
+
+
+def single_pass_backup_file(utility: BackupUtility, source_file: Path):
+    stat = source_file.stat()
+    file_hash = FileHash(path=str(source_file.relative_to(utility.source)),
+                         size=stat.st_size, mtime=stat.st_mtime)
+    if not utility._backup_file(file_hash, source_file):
+        raise IOError(utility.manifest.errors[-1])
+
+
+def timed_pass(name: str, work, files, threads: int, total: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(work, files))
+    elapsed = time.perf_counter() - started
+    print(f"  {name:<28} {elapsed:7.2f} s  {total / elapsed / 1e6:8.1f} MB/s")
+
+
+def bench_pipeline(args):
+    with tempfile.TemporaryDirectory(prefix='backup-bench-') as tmp:
+        source = Path(tmp) / 'source'
+        source.mkdir()
+        total = make_tree(source, args.small_files, args.small_kb, args.large_files, args.large_mb)
+        files = sorted(p for p in source.rglob('*') if p.is_file())
+        print(f"{len(files)} files, {total / 1e6:.0f} MB, {args.threads} threads "
+              f"(files are likely in the page cache, so this mostly measures CPU)")
+
+        legacy_dest = Path(tmp) / 'legacy'
+        timed_pass("three-pass md5+sha256", lambda f: legacy_backup_file(
+            f, legacy_dest / f.relative_to(source)), files, args.threads, total)
+        shutil.rmtree(legacy_dest)
+
+        for algorithm in ('sha256', 'md5'):
+            dest = Path(tmp) / f'single-{algorithm}'
+            utility = BackupUtility(str(source), str(dest), checksum_algorithm=algorithm)
+            timed_pass(f"single-pass {algorithm}", lambda f: single_pass_backup_file(utility, f),
+                       files, args.threads, total)
+            shutil.rmtree(dest)
+
+
+def quiet_run(utility: BackupUtility) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        utility.run()
+    return time.perf_counter() - started
+
+
+def bench_incremental(args):
+    with tempfile.TemporaryDirectory(prefix='backup-bench-') as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        for i in range(args.files):
+            path = source / f"dir{i % 1000}" / f"file{i}.txt"
+            if i < 1000:
+                path.parent.mkdir(parents=True)
+            path.write_bytes(b"x" * (i % 100))
+        print(f"{args.files} files, {args.threads} threads")
+
+        elapsed = quiet_run(BackupUtility(str(source), str(dest), threads=args.threads))
+        print(f"  {'initial full backup':<28} {elapsed:7.2f} s")
+        for name, paranoid in (('no-change, stat index', False), ('no-change, --paranoid', True)):
+            utility = BackupUtility(str(source), str(dest), threads=args.threads, paranoid=paranoid)
+            elapsed = quiet_run(utility)
+            if utility.manifest.files_backed_up:
+                raise AssertionError(f"{utility.manifest.files_backed_up} files backed up again")
+            print(f"  {name:<28} {elapsed:7.2f} s  {args.files / elapsed:10,.0f} files/s")
+
+
+def bench_dedup(args):
+    with tempfile.TemporaryDirectory(prefix='backup-bench-') as tmp:
+        source = Path(tmp) / 'source'
+        (source / 'docs').mkdir(parents=True)
+        large = source / 'disk.img'
+        large.write_bytes(os.urandom(args.large_mb * 1024 * 1024))
+        log = source / 'app.log'
+        log.write_text(''.join(f"{i} INFO request handled in {i % 97} ms\n"
+                               for i in range(args.log_mb * 1024 * 1024 // 40)))
+        for i in range(args.small_files):
+            (source / 'docs' / f"note{i}.txt").write_text(f"note {i}\n" + "lorem ipsum dolor\n" * (i * 10))
+
+        def insert_into_large():
+            data = large.read_bytes()
+            middle = len(data) // 2
+            large.write_bytes(data[:middle] + b"inserted" * 16 + data[middle:])
+
+        def append_to_log():
+            with open(log, 'a') as f:
+                f.write("appended line\n" * (1024 * 1024 // 14))
+
+        def edit_small_files():
+            for i in range(0, args.small_files, args.small_files // 10 or 1):
+                with open(source / 'docs' / f"note{i}.txt", 'a') as f:
+                    f.write("edited\n")
+
+        def copy_directory():
+            shutil.copytree(source / 'docs', source / 'docs-copy')
+
+        steps = [('initial backup', lambda: None), ('insert 128 B into large file', insert_into_large),
+                 ('append 1 MB to log', append_to_log), ('append to 10 small files', edit_small_files),
+                 ('copy a directory', copy_directory)]
+        print(f"{'step':<30} {'changed':>10} {'mirror':>10} {'repository':>11} {'dedup':>7}")
+        for name, change in steps:
+            change()
+            results = {}
+            for repository in (False, True):
+                dest = Path(tmp) / ('repository' if repository else 'mirror')
+                utility = BackupUtility(str(source), str(dest), threads=args.threads, repository=repository)
+                quiet_run(utility)
+                manifest = utility.manifest
+                results[repository] = manifest.bytes_stored if repository else manifest.bytes_transferred
+            changed = manifest.bytes_transferred
+            ratio = changed / results[True] if results[True] else float('inf')
+            print(f"{name:<30} {changed / 1e6:8.2f} MB {results[False] / 1e6:7.2f} MB "
+                  f"{results[True] / 1e6:8.2f} MB {ratio:6.1f}x")
+
+
+def bench_compression(args):
+    with tempfile.TemporaryDirectory(prefix='backup-bench-') as tmp:
+        source = Path(tmp) / 'app.log'
+        rng = random.Random(42)
+        with open(source, 'w') as f:
+            while f.tell() < args.mb * 1024 * 1024:
+                f.write(''.join(f"{rng.randrange(10 ** 9)} INFO user={rng.randrange(5000)} "
+                                f"took {rng.random():.4f}s\n" for _ in range(10000)))
+        size = source.stat().st_size
+        print(f"{size / 1e6:.0f} MB log file, {os.cpu_count()} CPU(s)")
+
+        def report(name, elapsed, output, baseline):
+            print(f"  {name:<28} {elapsed:7.2f} s  {size / elapsed / 1e6:8.1f} MB/s  "
+                  f"ratio {size / output.stat().st_size:5.2f}  speedup {baseline / elapsed:5.2f}x")
+
+        # The original path: one gzip stream, level 6
+        output = Path(tmp) / 'stream.gz'
+        started = time.perf_counter()
+        with open(source, 'rb') as f_in, gzip.open(output, 'wb', compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, BackupUtility.CHUNK_SIZE)
+        baseline = time.perf_counter() - started
+        report("gzip stream (before)", baseline, output, baseline)
+
+        names = ['gzip'] + (['zstd'] if zstandard is not None else [])
+        for name in names:
+            for threads in [int(t) for t in args.threads.split(',')]:
+                utility = BackupUtility(tmp, tmp, compress=True, compression=name, threads=threads)
+                started = time.perf_counter()
+                _, _, output = utility._copy_and_hash(source, Path(tmp) / 'blocks',
+                                                      COMPRESSORS[name].default_level)
+                elapsed = time.perf_counter() - started
+                utility._compress_pool.shutdown()
+                report(f"{name} blocks, {threads} thread(s)", elapsed, output, baseline)
+                output.unlink()
+        if zstandard is None:
+            print("  (zstd skipped: zstandard is not installed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for backup_utility')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pipeline = commands.add_parser('pipeline', help='hash-and-copy throughput')
+    pipeline.add_argument('--small-files', type=int, default=2000)
+    pipeline.add_argument('--small-kb', type=int, default=16)
+    pipeline.add_argument('--large-files', type=int, default=2)
+    pipeline.add_argument('--large-mb', type=int, default=512)
+    pipeline.add_argument('--threads', type=int, default=4)
+    pipeline.set_defaults(run=bench_pipeline)
+
+    incremental = commands.add_parser('incremental', help='no-change backup run time')
+    incremental.add_argument('--files', type=int, default=100000)
+    incremental.add_argument('--threads', type=int, default=4)
+    incremental.set_defaults(run=bench_incremental)
+
+    dedup = commands.add_parser('dedup', help='bytes written per incremental change, mirror vs repository')
+    dedup.add_argument('--large-mb', type=int, default=64)
+    dedup.add_argument('--log-mb', type=int, default=16)
+    dedup.add_argument('--small-files', type=int, default=200)
+    dedup.add_argument('--threads', type=int, default=4)
+    dedup.set_defaults(run=bench_dedup)
+
+    compression = commands.add_parser('compression', help='compression throughput by thread count')
+    compression.add_argument('--mb', type=int, default=64)
+    compression.add_argument('--threads', default='1,2,4,8')
+    compression.set_defaults(run=bench_compression)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
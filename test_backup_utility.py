@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Test script for Backup Utility
+"""
+
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backup_utility import BackupUtility
+
+
+def collect(source: Path, **kwargs):
+    utility = BackupUtility(str(source), str(source.parent / 'dest'), **kwargs)
+    return utility, {os.path.relpath(path, source): stat for path, stat in utility._collect_files()}
+
+
+def quiet_run(utility: BackupUtility):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return utility.run()
+
+
+def test_copy_and_hash():
+    """Test that copying hashes the bytes in the same read, plain and gzip"""
+    print("Testing hash-while-copy...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'data.log'
+        data = b"log line\n" * 300000
+        source.write_bytes(data)
+
+        for algorithm in ('sha256', 'md5'):
+            utility = BackupUtility(tmp, tmp, compress=True, checksum_algorithm=algorithm)
+            expected = hashlib.new(algorithm, data).hexdigest()
+
+            digest, compressor, written = utility._copy_and_hash(source, Path(tmp) / 'plain', None)
+            assert (digest, compressor) == (expected, None)
+            assert written.read_bytes() == data
+            assert os.stat(written).st_mtime_ns == os.stat(source).st_mtime_ns
+
+            digest, compressor, written = utility._copy_and_hash(source, Path(tmp) / 'packed', 6)
+            assert digest == expected
+            assert written.name == 'packed.gz'
+            assert gzip.decompress(written.read_bytes()) == data
+    print("✓ Hash-while-copy test passed!")
+
+
+def test_index_records_configured_algorithm_and_verifies():
+    """Test md5 and sha256 indexes, and that verify catches a corrupted copy"""
+    print("Testing index algorithms and verify...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        source.mkdir()
+        (source / 'a.txt').write_text("alpha")
+        (source / 'b.txt').write_text("bravo" * 1000)
+
+        for algorithm in ('md5', 'sha256'):
+            dest = Path(tmp) / algorithm
+            quiet_run(BackupUtility(str(source), str(dest), compress=True, checksum_algorithm=algorithm))
+            index = json.loads((dest / '.backup_hashes.json').read_text())
+            other = 'sha256' if algorithm == 'md5' else 'md5'
+            assert index['a.txt'][algorithm] == hashlib.new(algorithm, b"alpha").hexdigest()
+            assert index['a.txt'][other] == ''
+
+            manifest_path = str(dest / '.backup_manifest.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert BackupUtility.verify_backup(manifest_path)
+                (dest / 'a.txt').write_text("tampered")
+                assert not BackupUtility.verify_backup(manifest_path)
+    print("✓ Index algorithm and verify test passed!")
+
+
+def test_unchanged_files_are_not_read():
+    """Test that files with unchanged size, mtime and inode are not hashed or copied"""
+    print("Testing stat fast path...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        for i in range(20):
+            (source / f"f{i}.txt").write_text(f"file {i}")
+        quiet_run(BackupUtility(str(source), str(dest)))
+
+        utility = BackupUtility(str(source), str(dest))
+
+        def no_reads(*args):
+            raise AssertionError("unchanged file was read")
+        utility._calculate_hash = no_reads
+        utility._copy_and_hash = no_reads
+        manifest = quiet_run(utility)
+        assert manifest.files_skipped == 20
+        assert manifest.files_backed_up == 0
+        assert not manifest.errors
+    print("✓ Stat fast path test passed!")
+
+
+def test_paranoid_catches_same_stat_change():
+    """Test that --paranoid re-hashes and backs up a change that kept size and mtime"""
+    print("Testing paranoid mode...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        target = source / 'doc.txt'
+        target.write_text("original")
+        quiet_run(BackupUtility(str(source), str(dest)))
+
+        stat = target.stat()
+        with open(target, 'r+') as f:  # Rewritten in place: same inode
+            f.write("ORIGINAL")
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert quiet_run(BackupUtility(str(source), str(dest))).files_backed_up == 0
+        assert quiet_run(BackupUtility(str(source), str(dest), paranoid=True)).files_backed_up == 1
+        assert (dest / 'doc.txt').read_text() == "ORIGINAL"
+    print("✓ Paranoid mode test passed!")
+
+
+def test_old_format_index_loads():
+    """Test that an index without mtime_ns and inode still skips unchanged files"""
+    print("Testing old index format...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        (source / 'kept.txt').write_text("kept")
+        (source / 'edited.txt').write_text("before")
+        quiet_run(BackupUtility(str(source), str(dest)))
+
+        index_path = dest / '.backup_hashes.json'
+        index = json.loads(index_path.read_text())
+        for entry in index.values():
+            del entry['mtime_ns'], entry['inode']
+        index_path.write_text(json.dumps(index, indent=2))
+        (source / 'edited.txt').write_text("after!")
+
+        utility = BackupUtility(str(source), str(dest))
+        manifest = quiet_run(utility)
+        assert set(utility.previous_hashes) == {'kept.txt', 'edited.txt'}
+        assert manifest.files_skipped == 1
+        assert manifest.files_backed_up == 1
+        assert not manifest.errors
+    print("✓ Old index format test passed!")
+
+
+def test_wide_tree():
+    """Test walking one directory with thousands of files"""
+    print("Testing wide tree...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        source.mkdir()
+        for i in range(5000):
+            (source / f"file{i}.dat").write_bytes(b"x" * (i % 7))
+
+        utility, files = collect(source, threads=4)
+        assert len(files) == 5000
+        assert files['file12.dat'].st_size == 5
+        assert utility.manifest.total_size == sum(i % 7 for i in range(5000))
+        assert not utility.manifest.errors
+    print("✓ Wide tree test passed!")
+
+
+def test_deep_tree():
+    """Test walking a chain of directories deeper than the recursion limit"""
+    print("Testing deep tree...")
+    depth = sys.getrecursionlimit() + 200
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        # Built and removed a level at a time: mkdir(parents=True) and
+        # rmtree recurse per level too
+        levels = [str(source)]
+        for i in range(depth):
+            levels.append(os.path.join(levels[-1], 'd'))
+        for level in levels:
+            os.mkdir(level)
+        (Path(levels[-1]) / 'bottom.txt').write_text("deep")
+        (source / 'top.txt').write_text("shallow")
+
+        try:
+            utility, files = collect(source, threads=4)
+            assert sorted(files) == [os.path.join(*['d'] * depth, 'bottom.txt'), 'top.txt']
+            assert utility.manifest.total_size == 11
+        finally:
+            os.remove(os.path.join(levels[-1], 'bottom.txt'))
+            for level in reversed(levels[1:]):
+                os.rmdir(level)
+    print("✓ Deep tree test passed!")
+
+
+def test_wide_and_deep_tree():
+    """Test many directories, each with files, scanned in parallel"""
+    print("Testing wide and deep tree...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        expected = set()
+        for a in range(20):
+            for b in range(20):
+                directory = source / f"a{a}" / f"b{b}" / "c"
+                directory.mkdir(parents=True)
+                for i in range(5):
+                    (directory / f"f{i}").write_text("data")
+                    expected.add(os.path.join(f"a{a}", f"b{b}", "c", f"f{i}"))
+
+        for threads in (1, 8):
+            _, files = collect(source, threads=threads)
+            assert set(files) == expected
+    print("✓ Wide and deep tree test passed!")
+
+
+def test_exclude_patterns():
+    """Test substring and glob excludes, and that excluded directories are not entered"""
+    print("Testing exclude patterns...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        for name in ['keep.txt', 'skip.tmp', 'node_modules/pkg/index.js', 'src/app.log', 'src/main.py']:
+            (source / name).parent.mkdir(parents=True, exist_ok=True)
+            (source / name).write_text(name)
+
+        _, files = collect(source, exclude_patterns=['*.tmp', 'node_modules', '*.log'])
+        assert sorted(files) == ['keep.txt', os.path.join('src', 'main.py')]
+    print("✓ Exclude patterns test passed!")
+
+
+def test_symlinked_directory_not_followed():
+    """Test that symlinks to directories are skipped like os.walk does"""
+    print("Testing symlinked directories...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        (source / 'real').mkdir(parents=True)
+        (source / 'real' / 'file.txt').write_text("data")
+        os.symlink(source / 'real', source / 'link')
+
+        _, files = collect(source)
+        assert list(files) == [os.path.join('real', 'file.txt')]
+    print("✓ Symlinked directory test passed!")
+
+
+def test_single_file_source():
+    """Test backing up a single file rather than a directory"""
+    print("Testing single file source...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'single.txt'
+        dest = Path(tmp) / 'dest'
+        source.write_text("just one file")
+
+        manifest = quiet_run(BackupUtility(str(source), str(dest)))
+        assert manifest.files_backed_up == 1
+        assert not manifest.errors
+        assert (dest / 'single.txt').read_text() == "just one file"
+    print("✓ Single file source test passed!")
+
+
+def test_incremental_run_skips_unchanged_files():
+    """Test that a second run backs up only the changed file"""
+    print("Testing incremental backup...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        for i in range(50):
+            (source / f"d{i % 5}").mkdir(parents=True, exist_ok=True)
+            (source / f"d{i % 5}" / f"f{i}.txt").write_text(f"file {i}")
+
+        first = quiet_run(BackupUtility(str(source), str(dest)))
+        assert first.files_backed_up == 50
+
+        (source / 'd0' / 'f0.txt').write_text("changed")
+        second = quiet_run(BackupUtility(str(source), str(dest)))
+        assert second.files_backed_up == 1
+        assert second.files_skipped == 49
+        assert (dest / 'd0' / 'f0.txt').read_text() == "changed"
+    print("✓ Incremental backup test passed!")
+
+
+def test_repository_restore():
+    """Test that a chunk repository backup verifies and restores byte for byte"""
+    print("Testing repository restore...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        (source / 'sub').mkdir(parents=True)
+        data = os.urandom(3 * 1024 * 1024)
+        (source / 'big.bin').write_bytes(data)
+        (source / 'sub' / 'same.bin').write_bytes(data)
+        (source / 'sub' / 'note.txt').write_text("hello\n" * 1000)
+
+        manifest = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert manifest.chunks_reused > 0
+        assert manifest.bytes_stored < 2 * len(data)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert BackupUtility.verify_backup(str(dest / '.backup_manifest.json'))
+            assert BackupUtility.restore_backup(str(dest / '.backup_manifest.json'), str(Path(tmp) / 'out'))
+        for name in ['big.bin', 'sub/same.bin', 'sub/note.txt']:
+            assert (Path(tmp) / 'out' / name).read_bytes() == (source / name).read_bytes()
+    print("✓ Repository restore test passed!")
+
+
+def test_repository_dedups_after_insert():
+    """Test that an insert into a large file only stores the chunks around it"""
+    print("Testing repository dedup after insert...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        data = os.urandom(8 * 1024 * 1024)
+        (source / 'disk.img').write_bytes(data)
+        first = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert first.chunks_stored > 2
+
+        middle = len(data) // 2
+        (source / 'disk.img').write_bytes(data[:middle] + b"inserted" + data[middle:])
+        second = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert second.files_backed_up == 1
+        assert second.chunks_reused >= first.chunks_stored - 2
+        assert second.bytes_stored < len(data) // 2
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert BackupUtility.restore_backup(str(dest / '.backup_manifest.json'), str(Path(tmp) / 'out'))
+        assert (Path(tmp) / 'out' / 'disk.img').read_bytes() == (source / 'disk.img').read_bytes()
+    print("✓ Repository dedup test passed!")
+
+
+def test_repository_dedups_shifted_binary():
+    """Test that a one-byte insert into binary data without newlines reuses chunks"""
+    print("Testing repository dedup of shifted binary data...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        data = os.urandom(8 * 1024 * 1024).replace(b"\n", b"\x0b")
+        (source / 'blob.bin').write_bytes(data)
+        first = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert first.chunks_stored > 8
+
+        (source / 'blob.bin').write_bytes(b"\x00" + data)
+        second = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert second.chunks_reused >= first.chunks_stored - 2
+        assert second.bytes_stored < BackupUtility.MAX_CHUNK
+    print("✓ Shifted binary dedup test passed!")
+
+def test_restore_mirror_formats():
+    """Test restoring plain and gzip mirror backups, with mtimes"""
+    print("Testing mirror restore...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        (source / 'sub').mkdir(parents=True)
+        (source / 'sub' / 'app.log').write_text("line\n" * 50000)
+        (source / 'tiny.txt').write_text("tiny")
+
+        for compress in (False, True):
+            dest = Path(tmp) / f"dest-{compress}"
+            out = Path(tmp) / f"out-{compress}"
+            quiet_run(BackupUtility(str(source), str(dest), compress=compress))
+            assert (dest / 'sub' / 'app.log.gz').exists() == compress
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert BackupUtility.restore_backup(str(dest / '.backup_manifest.json'), str(out))
+            for name in ['sub/app.log', 'tiny.txt']:
+                assert (out / name).read_bytes() == (source / name).read_bytes()
+                assert (out / name).stat().st_mtime_ns == (source / name).stat().st_mtime_ns
+    print("✓ Mirror restore test passed!")
+
+
+def test_unreferenced_chunks_are_removed():
+    """Test that chunks only a deleted or changed file used are removed, shared ones kept"""
+    print("Testing chunk removal...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        shared = b"shared content\n" * 100
+        (source / 'a.txt').write_bytes(shared)
+        (source / 'b.txt').write_bytes(shared)
+        (source / 'gone.txt').write_text("deleted soon")
+        (source / 'edit.txt').write_text("old version")
+        quiet_run(BackupUtility(str(source), str(dest), repository=True))
+
+        def chunk_names():
+            return {p.name for p in (dest / '.chunks').rglob('*') if p.is_file()}
+
+        def chunk_id(data: bytes) -> str:
+            return hashlib.sha256(data).hexdigest()
+
+        assert len(chunk_names()) == 3
+        (source / 'gone.txt').unlink()
+        (source / 'b.txt').unlink()
+        (source / 'edit.txt').write_text("new version")
+        manifest = quiet_run(BackupUtility(str(source), str(dest), repository=True))
+        assert manifest.files_removed == 2
+        assert chunk_names() == {chunk_id(shared), chunk_id(b"new version")}
+    print("✓ Chunk removal test passed!")
+
+
+def test_failed_store_keeps_previous_version():
+    """Test that a changed file that fails to store keeps its previous version restorable"""
+    print("Testing failed repository store...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        (source / 'doc.txt').write_text("version one\n")
+        (source / 'new.txt').write_text("new file\n")
+        quiet_run(BackupUtility(str(source), str(dest), repository=True, exclude_patterns=['new.txt']))
+
+        (source / 'doc.txt').write_text("version two, longer\n")
+        utility = BackupUtility(str(source), str(dest), repository=True)
+
+        def fail(file_hash, source_file):
+            raise OSError("disk full")
+        utility._store_file = fail
+        manifest = quiet_run(utility)
+        assert manifest.files_backed_up == 0
+        assert len(manifest.errors) == 2
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert BackupUtility.verify_backup(str(dest / '.backup_manifest.json'))
+            assert BackupUtility.restore_backup(str(dest / '.backup_manifest.json'), str(Path(tmp) / 'out'))
+        assert (Path(tmp) / 'out' / 'doc.txt').read_text() == "version one\n"
+        assert not (Path(tmp) / 'out' / 'new.txt').exists()
+    print("✓ Failed repository store test passed!")
+
+
+def test_compressed_backup_restore():
+    """Test per-file compression choices and that gzip backups verify and restore"""
+    print("Testing compressed backup...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'source'
+        dest = Path(tmp) / 'dest'
+        source.mkdir()
+        (source / 'app.log').write_text("request handled\n" * 200000)
+        (source / 'photo.jpg').write_bytes(b"\xff\xd8" + b"x" * 5000)
+        (source / 'random.bin').write_bytes(os.urandom(200000))
+        (source / 'tiny.txt').write_text("tiny")
+
+        quiet_run(BackupUtility(str(source), str(dest), compress=True, threads=4))
+        stored = sorted(p.name for p in dest.iterdir() if not p.name.startswith('.'))
+        assert stored == ['app.log.gz', 'photo.jpg', 'random.bin', 'tiny.txt']
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert BackupUtility.verify_backup(str(dest / '.backup_manifest.json'))
+            assert BackupUtility.restore_backup(str(dest / '.backup_manifest.json'), str(Path(tmp) / 'out'))
+        for name in ['app.log', 'photo.jpg', 'random.bin', 'tiny.txt']:
+            assert (Path(tmp) / 'out' / name).read_bytes() == (source / name).read_bytes()
+    print("✓ Compressed backup test passed!")
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 60)
+    print("BACKUP UTILITY TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        test_copy_and_hash,
+        test_index_records_configured_algorithm_and_verifies,
+        test_unchanged_files_are_not_read,
+        test_paranoid_catches_same_stat_change,
+        test_old_format_index_loads,
+        test_wide_tree,
+        test_deep_tree,
+        test_wide_and_deep_tree,
+        test_exclude_patterns,
+        test_symlinked_directory_not_followed,
+        test_single_file_source,
+        test_incremental_run_skips_unchanged_files,
+        test_repository_restore,
+        test_repository_dedups_after_insert,
+        test_repository_dedups_shifted_binary,
+        test_restore_mirror_formats,
+        test_unreferenced_chunks_are_removed,
+        test_failed_store_keeps_previous_version,
+        test_compressed_backup_restore,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"✗ Test {test.__name__} failed: {e!r}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print("TEST RESULTS")
+    print("=" * 60)
+    print(f"Passed: {passed}/{len(tests)}")
+    print(f"Failed: {failed}/{len(tests)}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,117 @@
+"""Benchmark find_common_availability against the old day-by-day intersection.
+
+Compares the legacy pairwise intersection with the compiled bitmap path,
+both cold (first call) and warm (schedules unchanged, as when the agent
+coordinates several events over the same window).
+
+Usage:
+    python benchmarks/bench_common_availability.py
+"""
+
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from yotei.models.user import AvailabilityBlock
+from yotei.models.schedule import Schedule, TimeSlot, find_common_availability
+
+
+def legacy_find_common_availability(
+    schedules: List[Schedule],
+    start_date: date,
+    end_date: date,
+    min_duration_hours: float = 2.0,
+) -> List[TimeSlot]:
+    """The previous implementation: pairwise TimeSlot intersection per day."""
+    common_slots = []
+    current = start_date
+
+    while current <= end_date:
+        all_slots = [schedule.get_availability_for_date(current) for schedule in schedules]
+
+        if all(slots for slots in all_slots):
+            intersections = all_slots[0]
+            for other_slots in all_slots[1:]:
+                new_intersections = []
+                for slot in intersections:
+                    for other in other_slots:
+                        if slot.overlaps(other):
+                            inter_start = max(slot.start, other.start)
+                            inter_end = min(slot.end, other.end)
+                            if inter_end > inter_start:
+                                new_intersections.append(TimeSlot(start=inter_start, end=inter_end))
+                intersections = new_intersections
+
+            for slot in intersections:
+                if slot.duration_hours >= min_duration_hours:
+                    common_slots.append(slot)
+
+        current += timedelta(days=1)
+
+    return common_slots
+
+
+def cold_find_common_availability(schedules, start_date, end_date, min_duration_hours):
+    for schedule in schedules:
+        schedule.invalidate_availability_cache()
+    return find_common_availability(schedules, start_date, end_date, min_duration_hours)
+
+
+def make_schedule(rng: random.Random, user_id: str, start_date: date, days: int) -> Schedule:
+    """Build a schedule with weekend days, weekday evenings and a few busy slots."""
+    blocks = [
+        AvailabilityBlock(day_of_week=5, start_hour=rng.randint(8, 11), end_hour=rng.randint(19, 23)),
+        AvailabilityBlock(day_of_week=6, start_hour=rng.randint(8, 11), end_hour=rng.randint(19, 23)),
+    ]
+    blocks += [
+        AvailabilityBlock(day_of_week=day, start_hour=rng.randint(17, 19), end_hour=23)
+        for day in range(5)
+    ]
+
+    specific_busy = {}
+    for _ in range(days // 7):
+        busy_date = start_date + timedelta(days=rng.randrange(days))
+        busy_start = datetime.combine(busy_date, datetime.min.time()) + timedelta(hours=rng.randint(12, 20))
+        specific_busy.setdefault(busy_date.isoformat(), []).append(
+            TimeSlot(start=busy_start, end=busy_start + timedelta(hours=1))
+        )
+
+    return Schedule(user_id=user_id, default_availability=blocks, specific_busy=specific_busy)
+
+
+def time_call(func, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    start_date = date.today() + timedelta(days=3)
+    days = 60
+    end_date = start_date + timedelta(days=days)
+
+    print(
+        f"{'participants':>12} {'legacy':>9} {'cold':>9} {'warm':>9} "
+        f"{'speedup':>9} {'slots':>6}   (ms)"
+    )
+    for participants in (2, 5, 10, 20, 50, 100, 200):
+        schedules = [make_schedule(rng, f"U{i}", start_date, days) for i in range(participants)]
+
+        expected = [(s.start, s.end) for s in legacy_find_common_availability(schedules, start_date, end_date, 2.0)]
+        assert [(s.start, s.end) for s in find_common_availability(schedules, start_date, end_date, 2.0)] == expected
+
+        legacy = time_call(legacy_find_common_availability, schedules, start_date, end_date, 2.0)
+        cold = time_call(cold_find_common_availability, schedules, start_date, end_date, 2.0)
+        warm = time_call(find_common_availability, schedules, start_date, end_date, 2.0)
+        print(
+            f"{participants:>12} {legacy * 1000:>9.2f} {cold * 1000:>9.2f} "
+            f"{warm * 1000:>9.2f} {legacy / warm:>8.0f}x {len(expected):>6}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark importing friends and events into the local database.
+
+Compares one commit per save with the old rollback-journal settings, one
+commit per save with WAL, and the bulk save_friends/save_events APIs.
+
+Usage:
+    python benchmarks/bench_database.py [--count 10000]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from yotei.db.local import Database
+from yotei.models.event import Event
+from yotei.models.friend import FriendRelationship
+
+LEGACY_PRAGMAS = [
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = FULL",
+]
+
+
+async def open_db(path: Path, legacy: bool) -> Database:
+    db = Database(path)
+    await db.connect()
+    if legacy:
+        for pragma in LEGACY_PRAGMAS:
+            await db._connection.execute(pragma)
+    return db
+
+
+async def individual(db: Database, friends, events):
+    for friend in friends:
+        await db.save_friend("YT-ME", friend)
+    for event in events:
+        await db.save_event(event)
+
+
+async def bulk(db: Database, friends, events):
+    await db.save_friends("YT-ME", friends)
+    await db.save_events(events)
+
+
+async def main(count: int):
+    friends = [
+        FriendRelationship(friend_id=f"YT-F{i}", friend_name=f"Friend {i}", friend_code=f"YT-F{i}")
+        for i in range(count)
+    ]
+    events = []
+    for i in range(count):
+        event = Event(creator_id="YT-ME", title=f"Event {i}")
+        event.add_participant("YT-ME", "Me", "AGENT-ME")
+        event.add_participant(f"YT-F{i}", f"Friend {i}", f"AGENT-F{i}")
+        events.append(event)
+
+    print(f"Importing {count} friends + {count} events")
+    baseline = None
+    for name, legacy, importer in (
+        ("commit per save, rollback journal", True, individual),
+        ("commit per save, WAL", False, individual),
+        ("bulk save_friends/save_events", False, bulk),
+    ):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = await open_db(Path(tmpdir) / "bench.db", legacy)
+            started = time.perf_counter()
+            await importer(db, friends, events)
+            elapsed = time.perf_counter() - started
+            await db.close()
+
+        baseline = baseline or elapsed
+        rate = 2 * count / elapsed
+        print(f"  {name:<36} {elapsed:>8.2f} s  {rate:>9.0f} rows/s  {baseline / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.count))
@@ -0,0 +1,95 @@
+"""Benchmark per-call httpx clients against the pooled DeepSeek client.
+
+Starts a local stub of the chat completions endpoint and times N calls made
+with a fresh client per call (the old behaviour), sequentially through the
+pooled client, and concurrently through the pooled client.
+
+Usage:
+    python benchmarks/bench_deepseek_client.py [--calls 200] [--latency-ms 5]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from yotei.agent.social_intel import SocialIntelligence, close_http_client
+from yotei.config.settings import get_settings
+
+HOST = "127.0.0.1"
+PORT = 8766
+
+
+def create_stub_app(latency: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions():
+        await asyncio.sleep(latency)
+        return {"choices": [{"message": {"content": json.dumps({"message": "hello"})}}]}
+
+    return stub
+
+
+async def per_call_client(intel: SocialIntelligence, calls: int):
+    for _ in range(calls):
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            intel._client = client
+            await intel._call_deepseek("prompt")
+    intel._client = None
+
+
+async def pooled_sequential(intel: SocialIntelligence, calls: int):
+    for _ in range(calls):
+        await intel._call_deepseek("prompt")
+
+
+async def pooled_concurrent(intel: SocialIntelligence, calls: int):
+    await asyncio.gather(*(intel._call_deepseek("prompt") for _ in range(calls)))
+
+
+async def main(calls: int, latency_ms: float):
+    settings = get_settings()
+    settings.deepseek.base_url = f"http://{HOST}:{PORT}/v1"
+    settings.deepseek.cache_enabled = False  # Measure the transport, not the cache
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_app(latency_ms / 1000), host=HOST, port=PORT, log_level="warning",
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    intel = SocialIntelligence(api_key="bench")
+    await pooled_sequential(intel, 5)  # Warm up
+
+    print(f"{calls} calls, {latency_ms:g} ms stub latency, "
+          f"max_concurrency={settings.deepseek.max_concurrency}")
+    baseline = None
+    for name, runner in (
+        ("client per call", per_call_client),
+        ("pooled, sequential", pooled_sequential),
+        ("pooled, concurrent", pooled_concurrent),
+    ):
+        started = time.perf_counter()
+        await runner(intel, calls)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"  {name:<20} {elapsed * 1000:>9.1f} ms  "
+              f"{elapsed / calls * 1000:>7.2f} ms/call  {baseline / elapsed:>5.1f}x")
+
+    await close_http_client()
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency_ms))
@@ -0,0 +1,93 @@
+"""Benchmark stale connection detection in the relay.
+
+Registers N connections, keeps most of them active and lets a few go
+silent each tick (one reaper_interval), then times one liveness check per
+tick: an O(n) sweep over every connection versus RelayServer.reap_stale's
+heap, which only touches entries older than the cutoff. An active agent's
+heap entry is re-filed once per timeout, so the heap does about
+n / timeout-ticks entry moves per check (90 s / 1 s = 90 by default):
+its total work doesn't grow with how often the reaper runs, a sweep's does.
+
+Usage:
+    python benchmarks/bench_liveness_reaper.py [--agents 50000] [--ticks 60] [--timeout-ticks 90] [--silent 10]
+"""
+
+import argparse
+import asyncio
+import time
+
+from yotei.relay.server import AgentConnection, RelayServer
+
+
+class IdleWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def no_broadcast(data, exclude=None):
+    pass
+
+
+def build_relay(agents: int, timeout: float) -> RelayServer:
+    relay = RelayServer()
+    relay.liveness_timeout = timeout
+    # Departure broadcasts cost the same either way; leave them out
+    relay.broadcast_system = no_broadcast
+    for i in range(agents):
+        agent_id = f"AGENT-{i}"
+        # Register directly; connect() would broadcast N^2 hellos
+        connection = AgentConnection(agent_id, IdleWebSocket(), on_failure=relay._evict)
+        connection.last_activity = 0.0
+        relay.connections[agent_id] = connection
+        relay._track(connection)
+    return relay
+
+
+async def sweep(relay: RelayServer, now: float) -> int:
+    """The obvious check: look at every connection."""
+    cutoff = now - relay.liveness_timeout
+    stale = [c for c in relay.connections.values() if c.last_activity <= cutoff]
+    for connection in stale:
+        await relay._evict(connection, "reaped")
+    return len(stale)
+
+
+async def run(name: str, check, agents: int, ticks: int, timeout: float, silent: int) -> None:
+    relay = build_relay(agents, timeout)
+    connections = list(relay.connections.values())
+    costs = []
+    reaped = 0
+    for tick in range(1, ticks + 1):
+        now = timeout + tick
+        # Everyone but this tick's silent agents was active just now
+        for index, connection in enumerate(connections):
+            if index >= tick * silent and connection.agent_id in relay.connections:
+                connection.last_activity = now - 1
+        started = time.perf_counter()
+        reaped += await check(relay, now)
+        costs.append(time.perf_counter() - started)
+    steady = costs[1:]  # the heap's first check re-files every entry once
+    print(f"  {name:<6} first {costs[0] * 1e3:8.2f} ms  then {sum(steady) / len(steady) * 1e3:8.3f} ms "
+          f"per check  ({reaped} reaped)")
+
+
+async def main(agents: int, ticks: int, timeout_ticks: int, silent: int):
+    print(f"{agents} connections, {ticks} ticks, timeout {timeout_ticks} ticks, {silent} going silent per tick")
+    await run("sweep", sweep, agents, ticks, timeout_ticks, silent)
+    await run("heap", lambda relay, now: relay.reap_stale(now=now), agents, ticks, timeout_ticks, silent)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=50000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--timeout-ticks", type=int, default=90)
+    parser.add_argument("--silent", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.agents, args.ticks, args.timeout_ticks, args.silent))
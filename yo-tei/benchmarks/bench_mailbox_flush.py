@@ -0,0 +1,72 @@
+"""Benchmark the relay mailbox: storing messages and flushing them on reconnect.
+
+Stores N messages for an offline agent, then connects it and times until
+every held message has been written to its socket, for several flush batch
+sizes.
+
+Usage:
+    python benchmarks/bench_mailbox_flush.py [--messages 5000] [--batches 1,10,100,500]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from yotei.relay.mailbox import Mailbox
+from yotei.relay.protocol import create_availability_query
+from yotei.relay.server import RelayServer
+
+
+class CountingWebSocket:
+    """Stand-in client socket that only counts frames."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.frames += 1
+
+    async def close(self):
+        pass
+
+
+async def main(messages: int, batches: list):
+    print(f"{messages} held messages")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for batch in batches:
+            mailbox = Mailbox(Path(tmpdir) / f"mailbox-{batch}.db", max_per_agent=messages)
+            await mailbox.connect()
+            relay = RelayServer(mailbox=mailbox)
+            relay.mailbox_flush_batch = batch
+
+            started = time.perf_counter()
+            for i in range(messages):
+                await relay.route_to_agent(create_availability_query(
+                    "AGENT-A", "AGENT-B", f"EVT-{i % 50}", "2026-11-01", "2026-11-08", "dinner",
+                ))
+            stored = time.perf_counter() - started
+
+            websocket = CountingWebSocket()
+            started = time.perf_counter()
+            connection = await relay.connect("AGENT-B", websocket)
+            await connection.flush()
+            flushed = time.perf_counter() - started
+            assert websocket.frames == messages
+
+            print(f"  batch {batch:>4}  store {messages / stored:>9,.0f} msg/s  "
+                  f"flush {flushed * 1000:>8.1f} ms  {messages / flushed:>9,.0f} msg/s")
+            await relay.disconnect("AGENT-B")
+            await mailbox.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batches", default="1,10,100,500")
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, [int(b) for b in args.batches.split(",")]))
@@ -0,0 +1,80 @@
+"""Benchmark relay message log memory under a sustained message rate.
+
+Pushes --rate messages per simulated second through RelayServer.handle_message
+(no agents connected, so only parsing and logging cost anything) and tracks
+traced memory. Compares the original unbounded list with the ring buffer.
+
+Usage:
+    python benchmarks/bench_message_log.py [--rate 10000] [--seconds 30] [--capacity 10000]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from yotei.relay.protocol import create_nudge_message
+from yotei.relay.server import RelayServer
+
+
+class UnboundedLog:
+    """The original message_log: a list of dicts that is never trimmed."""
+
+    def __init__(self):
+        self.entries = []
+
+    def record(self, message):
+        self.entries.append({
+            "id": message.id,
+            "type": message.type.value,
+            "sender": message.sender_agent_id,
+            "recipient": message.recipient_agent_id,
+            "event_id": message.event_id,
+            "timestamp": message.timestamp.isoformat(),
+        })
+
+    def close(self):
+        pass
+
+
+async def run(name: str, relay: RelayServer, rate: int, seconds: int):
+    wires = [
+        create_nudge_message(f"AGENT-{i % 200}", f"event:EVT-{i % 500}", f"EVT-{i % 500}", "t", "m").to_wire()
+        for i in range(rate)
+    ]
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    samples = []
+    for second in range(1, seconds + 1):
+        for wire in wires:
+            wire["id"] = f"MSG-{second}-{id(wire)}"
+            await relay.handle_message(wire["sender"], wire)
+        samples.append((tracemalloc.get_traced_memory()[0] - baseline) / 1e6)
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    marks = [samples[i - 1] for i in (1, seconds // 4, seconds // 2, seconds) if i > 0]
+    print(f"  {name:<12} {rate * seconds / elapsed:>9,.0f} msg/s handled  "
+          f"memory MB at 1s/25%/50%/100%: " + " / ".join(f"{m:6.1f}" for m in marks))
+
+
+async def main(rate: int, seconds: int, capacity: int):
+    print(f"{rate} msg/s for {seconds} simulated seconds, ring capacity {capacity}")
+
+    legacy = RelayServer()
+    legacy.message_log = UnboundedLog()
+    await run("list", legacy, rate, seconds)
+
+    ring = RelayServer()
+    ring.message_log.capacity = capacity
+    await run("ring buffer", ring, rate, seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=10000)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--capacity", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rate, args.seconds, args.capacity))
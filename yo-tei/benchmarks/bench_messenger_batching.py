@@ -0,0 +1,123 @@
+"""Benchmark Messenger send batching against a live relay.
+
+Runs the relay app in-process under uvicorn and connects a sender and
+several receiver Messengers over real websockets. The sender emits bursts
+(nudges to every friend plus a run of EVENT_UPDATEs for one event, as a
+status change would) with and without batching. Reports websocket frames
+sent, frames/s, delivered messages/s and send-to-handler latency.
+
+Usage:
+    python benchmarks/bench_messenger_batching.py [--bursts 200] [--friends 8] [--updates 4] [--window-ms 2]
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+
+import uvicorn
+
+from yotei.agent.messenger import Messenger
+from yotei.config.settings import get_settings
+from yotei.relay.protocol import AgentMessage, MessageType, create_nudge_message
+from yotei.relay.server import app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(bursts: int, friends: int, updates: int, window_ms: float):
+    settings = get_settings()
+    settings.relay.batch_window_ms = window_ms
+    sender = Messenger("AGENT-SENDER", "Sender")
+    receivers = [Messenger(f"AGENT-FRIEND-{i}", f"Friend {i}") for i in range(friends)]
+
+    sent_at = {}
+    latencies = []
+    delivered = asyncio.Event()
+    expected = {"count": None}  # known once sending ends and coalescing is counted
+
+    def on_message(message: AgentMessage):
+        latencies.append(time.perf_counter() - sent_at[message.id])
+        if expected["count"] is not None and len(latencies) >= expected["count"]:
+            delivered.set()
+
+    for receiver in receivers:
+        await receiver.connect()
+        receiver.register_handler(MessageType.NUDGE, on_message)
+        receiver.register_handler(MessageType.EVENT_UPDATE, on_message)
+    await sender.connect()
+    await sender.flush()
+    frames_before = sender.frames_sent
+    coalesced_before = sender.messages_coalesced
+
+    started = time.perf_counter()
+    for burst in range(bursts):
+        for receiver in receivers:
+            message = create_nudge_message(sender.agent_id, receiver.agent_id, "EVT-1", "dinner", "Friday?")
+            sent_at[message.id] = time.perf_counter()
+            await sender.send(message)
+        for step in range(updates):
+            message = AgentMessage(
+                type=MessageType.EVENT_UPDATE, sender_agent_id=sender.agent_id,
+                recipient_agent_id=receivers[0].agent_id, event_id="EVT-1",
+                payload={"status": "proposed", "step": step},
+            )
+            sent_at[message.id] = time.perf_counter()
+            await sender.send(message)
+        await asyncio.sleep(0.001)  # think time between bursts
+    await sender.flush()
+    coalesced = sender.messages_coalesced - coalesced_before
+    expected["count"] = bursts * (friends + updates) - coalesced
+    if len(latencies) >= expected["count"]:
+        delivered.set()
+    try:
+        await asyncio.wait_for(delivered.wait(), 30)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+
+    frames = sender.frames_sent - frames_before
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    label = f"batch {window_ms:g} ms" if window_ms > 0 else "unbatched"
+    print(f"  {label:<14} {frames:>6} frames  {frames / elapsed:>8,.0f} frames/s  "
+          f"{len(latencies) / elapsed:>8,.0f} msg/s delivered  "
+          f"p50 {statistics.median(latencies) * 1e3:6.2f} ms  p99 {p99 * 1e3:6.2f} ms  "
+          f"coalesced {coalesced}")
+
+    for messenger in [sender, *receivers]:
+        await messenger.disconnect()
+
+
+async def main(bursts: int, friends: int, updates: int, window_ms: float):
+    port = free_port()
+    settings = get_settings()
+    settings.relay.url = f"ws://127.0.0.1:{port}"
+    settings.relay.mailbox_enabled = False
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    print(f"{bursts} bursts of {friends} nudges + {updates} event updates")
+    try:
+        await run(bursts, friends, updates, 0)
+        await run(bursts, friends, updates, window_ms)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=200)
+    parser.add_argument("--friends", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=4)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.bursts, args.friends, args.updates, args.window_ms))
@@ -0,0 +1,112 @@
+"""Benchmark Scheduler.rank_slots against the old per-slot, per-participant loop.
+
+Usage:
+    python benchmarks/bench_rank_slots.py
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from yotei.agent.scheduler import Scheduler, aggregate_preferences
+from yotei.models.event import EventType
+from yotei.models.schedule import TimeSlot
+
+
+def legacy_rank_slots(
+    slots: List[TimeSlot],
+    event_type: EventType,
+    preferences: Dict[str, dict],
+) -> List[Tuple[TimeSlot, float]]:
+    """The previous implementation of Scheduler.rank_slots."""
+    ranked = []
+
+    for slot in slots:
+        score = 100.0
+        if slot.start.weekday() >= 5:
+            score += 10
+        hour = slot.start.hour
+        if 10 <= hour <= 19:
+            score += 5
+        elif hour < 9 or hour > 21:
+            score -= 10
+        if slot.duration_hours >= 4:
+            score += 5
+        if event_type == EventType.DINNER:
+            if 18 <= hour <= 20:
+                score += 15
+        elif event_type == EventType.OUTDOOR:
+            if 10 <= hour <= 14:
+                score += 15
+        elif event_type == EventType.GAME_NIGHT:
+            if 19 <= hour <= 20:
+                score += 15
+        for user_id, prefs in preferences.items():
+            if prefs.get("budget_conscious") and hour >= 18:
+                score -= 5
+            if prefs.get("early_bird") and hour >= 20:
+                score -= 10
+            elif prefs.get("night_owl") and hour <= 10:
+                score -= 10
+        ranked.append((slot, score))
+
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return ranked
+
+
+def time_call(func, *args, repeat: int = 5, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    rng = random.Random(7)
+    base = datetime(2026, 1, 5)
+    slots = []
+    for _ in range(10_000):
+        start = base + timedelta(days=rng.randrange(90), hours=rng.randrange(24))
+        slots.append(TimeSlot(start=start, end=start + timedelta(hours=rng.choice([1, 2, 3, 4, 6]))))
+
+    preferences = {
+        f"U{i}": {
+            "early_bird": rng.random() < 0.3,
+            "night_owl": rng.random() < 0.3,
+            "budget_conscious": rng.random() < 0.4,
+        }
+        for i in range(50)
+    }
+
+    scheduler = Scheduler()
+    event_type = EventType.DINNER
+
+    expected = [score for _, score in legacy_rank_slots(slots, event_type, preferences)]
+    assert [score for _, score in scheduler.rank_slots(slots, event_type, preferences)] == expected
+
+    hours = [slot.start.hour for slot in slots]
+    weekdays = [slot.start.weekday() for slot in slots]
+    durations = [slot.duration_hours for slot in slots]
+    counts = aggregate_preferences(preferences)
+
+    results = [
+        ("legacy rank_slots", time_call(legacy_rank_slots, slots, event_type, preferences)),
+        ("rank_slots", time_call(scheduler.rank_slots, slots, event_type, preferences)),
+        ("rank_slots top_k=10", time_call(scheduler.rank_slots, slots, event_type, preferences, top_k=10)),
+        ("rank_slot_columns", time_call(
+            scheduler.rank_slot_columns, hours, weekdays, durations, event_type, counts)),
+        ("rank_slot_columns top_k=10", time_call(
+            scheduler.rank_slot_columns, hours, weekdays, durations, event_type, counts, top_k=10)),
+    ]
+
+    print(f"10,000 slots x 50 participants ({event_type.value})")
+    legacy = results[0][1]
+    for name, seconds in results:
+        print(f"  {name:<28} {seconds * 1000:>9.2f} ms  {legacy / seconds:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark relay broadcast latency with many connected agents.
+
+Connects N in-process agents whose sockets take a small, jittered time per
+send, plus a few stalled ones. Times how long an event broadcast takes to
+reach every healthy subscriber with the old one-at-a-time loop and with the
+queued fan-out.
+
+Usage:
+    python benchmarks/bench_relay_broadcast.py [--agents 1000] [--latency-ms 1] [--stalled 3]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from yotei.relay.protocol import create_nudge_message
+from yotei.relay.server import AgentConnection, RelayServer
+
+
+class Delivery:
+    """Counts frames delivered to healthy sockets."""
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.count = 0
+        self.done = asyncio.Event()
+
+    def record(self):
+        self.count += 1
+        if self.count >= self.expected:
+            self.done.set()
+
+
+class SimulatedWebSocket:
+    """Stand-in for a client socket with network-like send latency."""
+
+    def __init__(self, latency: float, delivery: Delivery, stalled: bool = False):
+        self.latency = latency
+        self.delivery = delivery
+        self.stalled = stalled
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        self.delivery.record()
+
+    async def close(self):
+        pass
+
+
+async def sequential_broadcast(relay: RelayServer, event_id: str, message, exclude):
+    """The original broadcast_to_event: serialize and await each send in turn."""
+    for agent_id in relay.event_subscriptions.get(event_id, set()):
+        if agent_id not in exclude and agent_id in relay.connections:
+            try:
+                await asyncio.wait_for(
+                    relay.connections[agent_id].websocket.send_text(json.dumps(message.to_wire())),
+                    relay.send_timeout,
+                )
+            except Exception:
+                pass
+
+
+async def build_relay(
+    agents: int, latency: float, stalled: int, send_timeout: float, delivery: Delivery,
+) -> RelayServer:
+    relay = RelayServer(send_timeout=send_timeout)
+    for i in range(agents):
+        agent_id = f"AGENT-{i}"
+        websocket = SimulatedWebSocket(latency, delivery, stalled=i < stalled)
+        # Register directly; connect() would broadcast N^2 hellos
+        connection = AgentConnection(
+            agent_id,
+            websocket,
+            queue_size=relay.queue_size,
+            send_timeout=send_timeout,
+            direct_policy=relay.direct_overflow,
+            on_failure=relay._evict,
+        )
+        relay.connections[agent_id] = connection
+        relay.subscribe_to_event(agent_id, "EVT-BENCH")
+        connection.start()
+    return relay
+
+
+async def main(agents: int, latency_ms: float, stalled: int, rounds: int, send_timeout: float):
+    message = create_nudge_message(
+        f"AGENT-{agents - 1}", "event:EVT-BENCH", "EVT-BENCH", "dinner", "Friday?",
+    )
+    sender = {message.sender_agent_id}
+    print(f"{agents} agents, {latency_ms:g} ms send latency, {stalled} stalled, "
+          f"send_timeout={send_timeout:g}s")
+
+    baseline = None
+    for name, broadcast in (
+        ("sequential", sequential_broadcast),
+        ("queued fan-out", RelayServer.broadcast_to_event),
+    ):
+        samples = []
+        for _ in range(rounds):
+            delivery = Delivery(agents - 1 - stalled)
+            relay = await build_relay(agents, latency_ms / 1000, stalled, send_timeout, delivery)
+            started = time.perf_counter()
+            await broadcast(relay, "EVT-BENCH", message, exclude=sender)
+            await delivery.done.wait()
+            samples.append(time.perf_counter() - started)
+            for connection in list(relay.connections.values()):
+                connection.stop()
+        p50 = statistics.median(samples)
+        baseline = baseline or p50
+        print(f"  {name:<20} p50 {p50 * 1000:>9.1f} ms  max {max(samples) * 1000:>9.1f} ms  "
+              f"{baseline / p50:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--stalled", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--send-timeout", type=float, default=0.25)
+    args = parser.parse_args()
+    asyncio.run(main(args.agents, args.latency_ms, args.stalled, args.rounds, args.send_timeout))
@@ -0,0 +1,143 @@
+"""Benchmark direct-message throughput of the sharded relay by worker count.
+
+Starts N ClusterRelay worker processes joined by the Unix socket bus. Agents
+are spread over the workers by the hash ring; each worker pushes its share
+of pre-built messages through handle_message, addressed to random agents,
+so about (N-1)/N of them cross the bus. Reports aggregate messages/s from a
+common start until every recipient has its frames.
+
+Scaling needs free cores: on a machine with fewer cores than workers the
+processes only take turns and the bus hop shows up as pure overhead. On a
+single CPU, 2 and 4 workers run at about 0.8x of one worker, which is that
+overhead. Scaling past 1x has not been measured on a multi-core machine.
+
+Usage:
+    python benchmarks/bench_relay_cluster.py [--workers 1,2,4] [--agents 400] [--messages 40000]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from yotei.relay.cluster import ClusterRelay, UnixSocketBus
+from yotei.relay.hashring import HashRing
+from yotei.relay.protocol import create_nudge_message
+from yotei.relay.server import AgentConnection
+
+
+class CountingWebSocket:
+    """Stand-in client socket that counts frames and signals when all arrived."""
+
+    def __init__(self, counter: dict):
+        self.counter = counter
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.counter["received"] += 1
+        if self.counter["received"] >= self.counter["expected"]:
+            self.counter["done"].set()
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    async def close(self):
+        pass
+
+
+def build_messages(agents: int, messages: int) -> list:
+    rng = random.Random(42)
+    wire = create_nudge_message("AGENT-0", "AGENT-1", "EVT-BENCH", "dinner", "Friday?").to_wire()
+    plan = []
+    for i in range(messages):
+        sender, recipient = rng.sample(range(agents), 2)
+        plan.append({**wire, "id": f"MSG-{i}", "sender": f"AGENT-{sender}", "recipient": f"AGENT-{recipient}"})
+    return plan
+
+
+async def run_worker(worker_id, workers, agents, messages, socket_dir, barrier, results):
+    ring = HashRing(range(workers))
+    plan = build_messages(agents, messages)
+    mine = [f"AGENT-{i}" for i in range(agents) if ring.node_for(f"AGENT-{i}") == worker_id]
+    outgoing = [wire for wire in plan if ring.node_for(wire["sender"]) == worker_id]
+    counter = {
+        "received": 0,
+        "expected": sum(1 for wire in plan if ring.node_for(wire["recipient"]) == worker_id),
+        "done": asyncio.Event(),
+    }
+
+    relay = ClusterRelay(worker_id, workers, UnixSocketBus(Path(socket_dir), worker_id, workers))
+    await relay.start()
+    for agent_id in mine:
+        # Register directly; connect() would broadcast a hello per agent
+        connection = AgentConnection(
+            agent_id,
+            CountingWebSocket(counter),
+            queue_size=relay.queue_size,
+            send_timeout=relay.send_timeout,
+            direct_policy=relay.direct_overflow,
+            on_failure=relay._evict,
+        )
+        relay.connections[agent_id] = connection
+        connection.start()
+
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    started = time.perf_counter()
+    for i, wire in enumerate(outgoing):
+        await relay.handle_message(wire["sender"], wire)
+        if i % 64 == 0:
+            await asyncio.sleep(0)  # let the bus and writers run
+    if counter["expected"]:
+        await counter["done"].wait()
+    results.put(time.perf_counter() - started)
+    # Stay up until every worker is done so peers can still write to us
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    await relay.stop()
+
+
+def worker_main(*args):
+    asyncio.run(run_worker(*args))
+
+
+def measure(workers: int, agents: int, messages: int) -> float:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    with tempfile.TemporaryDirectory(prefix="yotei-bench-") as socket_dir:
+        processes = [
+            context.Process(
+                target=worker_main,
+                args=(worker_id, workers, agents, messages, socket_dir, barrier, results),
+            )
+            for worker_id in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        elapsed = max(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+    return messages / elapsed
+
+
+def main(worker_counts: list, agents: int, messages: int):
+    print(f"{agents} agents, {messages} direct messages, {os.cpu_count()} CPU(s)")
+    baseline = None
+    for workers in worker_counts:
+        rate = measure(workers, agents, messages)
+        baseline = baseline or rate
+        print(f"  {workers:>2} worker(s) {rate:>10,.0f} msg/s  {rate / baseline:>5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--agents", type=int, default=400)
+    parser.add_argument("--messages", type=int, default=40000)
+    args = parser.parse_args()
+    main([int(w) for w in args.workers.split(",")], args.agents, args.messages)
@@ -0,0 +1,75 @@
+"""Benchmark wire codecs and the relay's routing hop.
+
+Encode/decode: AgentMessage to frame and back through full model
+validation, for JSON and (if installed) msgpack.
+
+Relay hop: what the relay does per message. The original path decodes,
+validates with AgentMessage.from_wire and re-encodes to_wire for the
+recipient. The fast path decodes, reads only the routing header and
+forwards the received frame.
+
+Usage:
+    python benchmarks/bench_wire_codec.py [--iterations 20000]
+"""
+
+import argparse
+import time
+
+from yotei.relay.protocol import (
+    AgentMessage,
+    CODECS,
+    Envelope,
+    create_availability_response,
+)
+
+
+def sample_message() -> AgentMessage:
+    slots = [
+        {"start": f"2026-11-{day:02d}T18:00:00", "end": f"2026-11-{day:02d}T22:00:00", "score": 0.8}
+        for day in range(1, 15)
+    ]
+    return create_availability_response("AGENT-A", "AGENT-B", "EVT-1", "MSG-query", slots)
+
+
+def timed(iterations: int, func) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(iterations: int):
+    message = sample_message()
+    wire = message.to_wire()
+    print(f"{iterations} iterations, availability response with 14 slots")
+
+    print("  encode/decode (us per message)")
+    for name, codec in CODECS.items():
+        frame = codec.encode(wire)
+        encode = timed(iterations, lambda: codec.encode(message.to_wire()))
+        decode = timed(iterations, lambda: AgentMessage.from_wire(codec.decode(frame)))
+        print(f"    {name:<8} {len(frame):>5} bytes  encode {encode:>6.1f}  decode {decode:>6.1f}")
+
+    print("  relay hop (us per message)")
+    baseline = None
+    for name, codec in CODECS.items():
+        frame = codec.encode(wire)
+
+        def validate_and_reencode():
+            message = AgentMessage.from_wire(codec.decode(frame))
+            return codec.encode(message.to_wire())
+
+        def header_only():
+            return Envelope(codec.decode(frame), frame, codec).frame(codec)
+
+        for path, hop in (("validate+re-encode", validate_and_reencode), ("header fast path", header_only)):
+            cost = timed(iterations, hop)
+            baseline = baseline or cost
+            print(f"    {name:<8} {path:<20} {cost:>6.1f}  {baseline / cost:>5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -1,6 +1,7 @@
 """Integration tests for Yo-tei."""
 
 import asyncio
+import json
 import pytest
 from datetime import date, timedelta
 
@@ -74,6 +75,214 @@ class TestDatabase:
         assert len(retrieved.participants) == 1
 
 
+class TestDatabaseSchema:
+    """Tests for schema migrations and list queries."""
+
+    @pytest.mark.asyncio
+    async def test_migrates_legacy_database(self):
+        import sqlite3
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "legacy.db"
+
+            # A database written before migrations existed
+            event = Event(creator_id="YT-ME", title="Ski Trip", event_type=EventType.TRIP)
+            event.add_participant("YT-ME", "Me", "AGENT-ME")
+            event.add_participant("YT-ABBY", "Abby", "AGENT-ABBY")
+            legacy = sqlite3.connect(db_path)
+            legacy.execute("""
+                CREATE TABLE events (
+                    id TEXT PRIMARY KEY, creator_id TEXT NOT NULL, data TEXT NOT NULL,
+                    status TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+                )
+            """)
+            legacy.execute("""
+                CREATE TABLE event_participants (
+                    event_id TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (event_id, user_id)
+                )
+            """)
+            legacy.execute(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                (event.id, event.creator_id, event.model_dump_json(), "planning", "2026-01-01", "2026-01-01"),
+            )
+            legacy.executemany(
+                "INSERT INTO event_participants VALUES (?, ?)",
+                [(event.id, "YT-ME"), (event.id, "YT-ABBY")],
+            )
+            legacy.commit()
+            legacy.close()
+
+            db = Database(db_path)
+            await db.connect()
+
+            async with db._connection.execute("PRAGMA user_version") as cursor:
+                assert (await cursor.fetchone())[0] == len(Database.MIGRATIONS)
+
+            summaries = await db.get_user_event_summaries("YT-ABBY")
+            assert summaries == [event.to_summary()]
+            assert summaries[0].to_display() == event.get_summary()
+            assert (await db.find_user_event("YT-ABBY", "ski trip")).id == event.id
+            await db.close()
+
+            # Reconnecting does not re-run migrations
+            db = Database(db_path)
+            await db.connect()
+            assert len(await db.get_user_events("YT-ME")) == 1
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_status_filter_applies_to_created_events(self):
+        from yotei.models.event import EventStatus
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(Path(tmpdir) / "test.db")
+            await db.connect()
+
+            planning = Event(creator_id="YT-ME", title="Planning")
+            cancelled = Event(creator_id="YT-ME", title="Cancelled", status=EventStatus.CANCELLED)
+            await db.save_event(planning)
+            await db.save_event(cancelled)
+
+            events = await db.get_user_events("YT-ME", status="planning")
+            assert [e.id for e in events] == [planning.id]
+            summaries = await db.get_user_event_summaries("YT-ME", status="cancelled")
+            assert [s.id for s in summaries] == [cancelled.id]
+            await db.close()
+
+
+class TestDatabaseWrites:
+    """Tests for transactions and bulk writes."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_saves_and_transaction_rollback(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(Path(tmpdir) / "test.db")
+            await db.connect()
+
+            async with db._connection.execute("PRAGMA journal_mode") as cursor:
+                assert (await cursor.fetchone())[0] == "wal"
+
+            changes = []
+            db.add_change_listener(lambda table, key: changes.append((table, key)))
+
+            friends = [
+                FriendRelationship(friend_id=f"YT-F{i}", friend_name=f"F{i}", friend_code=f"YT-F{i}")
+                for i in range(50)
+            ]
+            await db.save_friends("YT-ME", friends)
+            assert await db.get_friends_count("YT-ME") == 50
+
+            events = [Event(creator_id="YT-ME", title=f"Event {i}") for i in range(20)]
+            for event in events:
+                event.add_participant("YT-F1", "F1", "AGENT-F1")
+            await db.save_events(events)
+            assert len(await db.get_user_events("YT-F1")) == 20
+            assert len(changes) == 70
+
+            # A failed transaction leaves nothing behind and notifies nobody
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    await db.save_event(Event(creator_id="YT-ME", title="Lost"))
+                    await db.delete_friend("YT-ME", "YT-F0")
+                    raise RuntimeError("boom")
+            assert len(await db.get_user_events("YT-ME")) == 20
+            assert await db.get_friends_count("YT-ME") == 50
+            assert len(changes) == 70
+
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_rollback_keeps_other_tasks_writes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(Path(tmpdir) / "test.db")
+            await db.connect()
+            opened = asyncio.Event()
+
+            async def failing_transaction():
+                async with db.transaction():
+                    await db.save_friend("YT-ME", FriendRelationship(
+                        friend_id="YT-LOST", friend_name="Lost", friend_code="YT-LOST"))
+                    opened.set()
+                    await asyncio.sleep(0.05)  # another task saves meanwhile
+                    raise RuntimeError("boom")
+
+            async def other_save():
+                await opened.wait()
+                await db.save_friend("YT-ME", FriendRelationship(
+                    friend_id="YT-KEPT", friend_name="Kept", friend_code="YT-KEPT"))
+
+            results = await asyncio.gather(failing_transaction(), other_save(), return_exceptions=True)
+            assert isinstance(results[0], RuntimeError)
+            assert await db.get_friend("YT-ME", "YT-LOST") is None
+            assert await db.get_friend("YT-ME", "YT-KEPT") is not None
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_spawned_task_commits_its_own_write(self):
+        import sqlite3
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.db"
+            db = Database(db_path)
+            await db.connect()
+
+            async def late_save():
+                await asyncio.sleep(0.01)
+                await db.save_friend("YT-ME", FriendRelationship(
+                    friend_id="YT-LATE", friend_name="Late", friend_code="YT-LATE"))
+
+            async with db.transaction():
+                await db.save_friend("YT-ME", FriendRelationship(
+                    friend_id="YT-OWN", friend_name="Own", friend_code="YT-OWN"))
+                spawned = asyncio.create_task(late_save())
+            await spawned
+
+            # The spawned save ran in its own transaction and was committed
+            other = sqlite3.connect(db_path)
+            rows = other.execute("SELECT friend_id FROM friends ORDER BY friend_id").fetchall()
+            other.close()
+            assert rows == [("YT-LATE",), ("YT-OWN",)]
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_event_history_is_archived(self):
+        from yotei.models.event import Proposal
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(Path(tmpdir) / "test.db", max_event_notes=3, max_event_proposals=2)
+            await db.connect()
+
+            event = Event(creator_id="YT-ME", title="Long negotiation")
+            for i in range(10):
+                event.add_agent_note("AGENT-ME", "round", f"note {i}")
+            for i in range(5):
+                event.add_proposal(Proposal(proposer_agent_id="AGENT-ME", reasoning=f"proposal {i}"))
+            current = event.current_proposal_id
+            await db.save_event(event)
+            assert len(event.agent_notes) == 10  # the caller's event is not compacted
+
+            stored = await db.get_event(event.id)
+            assert [n.content for n in stored.agent_notes] == ["note 7", "note 8", "note 9"]
+            assert [p.reasoning for p in stored.proposals] == ["proposal 3", "proposal 4"]
+            assert stored.current_proposal_id == current
+
+            full = await db.get_event(event.id, include_history=True)
+            assert [n.content for n in full.agent_notes] == [f"note {i}" for i in range(10)]
+            assert [p.reasoning for p in full.proposals] == [f"proposal {i}" for i in range(5)]
+
+            # Saving it back with its history loaded archives nothing twice
+            full.add_agent_note("AGENT-ME", "round", "note 10")
+            await db.save_event(full)
+            await db.save_event(await db.get_event(event.id, include_history=True))
+            notes, proposals = await db.get_event_history(event.id)
+            assert [n.content for n in notes] == [f"note {i}" for i in range(8)]
+            assert [p.reasoning for p in proposals] == [f"proposal {i}" for i in range(3)]
+
+            await db.delete_event(event.id)
+            assert await db.get_event_history(event.id) == ([], [])
+            await db.close()
+
+
 class TestScheduler:
     """Tests for scheduling logic."""
 
@@ -118,6 +327,229 @@ class TestScheduler:
         assert len(slots) > 0
 
 
+    def test_rank_slots_matches_per_slot_scoring(self):
+        import random
+        from datetime import datetime
+        from yotei.models.schedule import TimeSlot
+
+        def reference_score(slot, event_type, preferences):
+            score = 100.0
+            if slot.start.weekday() >= 5:
+                score += 10
+            hour = slot.start.hour
+            if 10 <= hour <= 19:
+                score += 5
+            elif hour < 9 or hour > 21:
+                score -= 10
+            if slot.duration_hours >= 4:
+                score += 5
+            bonus = {
+                EventType.DINNER: (18, 20),
+                EventType.OUTDOOR: (10, 14),
+                EventType.GAME_NIGHT: (19, 20),
+            }.get(event_type)
+            if bonus and bonus[0] <= hour <= bonus[1]:
+                score += 15
+            for prefs in preferences.values():
+                if prefs.get("budget_conscious") and hour >= 18:
+                    score -= 5
+                if prefs.get("early_bird") and hour >= 20:
+                    score -= 10
+                elif prefs.get("night_owl") and hour <= 10:
+                    score -= 10
+            return score
+
+        rng = random.Random(3)
+        base = datetime(2026, 3, 2)
+        slots = []
+        for _ in range(300):
+            start = base + timedelta(days=rng.randrange(14), hours=rng.randrange(24))
+            slots.append(TimeSlot(start=start, end=start + timedelta(hours=rng.choice([1, 3, 4, 5]))))
+        preferences = {
+            f"U{i}": {
+                "early_bird": rng.random() < 0.5,
+                "night_owl": rng.random() < 0.5,
+                "budget_conscious": rng.random() < 0.5,
+            }
+            for i in range(8)
+        }
+
+        scheduler = Scheduler()
+        for event_type in EventType:
+            expected = sorted(
+                ((slot, reference_score(slot, event_type, preferences)) for slot in slots),
+                key=lambda x: x[1],
+                reverse=True,
+            )
+            ranked = scheduler.rank_slots(slots, event_type, preferences)
+            assert [(id(slot), score) for slot, score in ranked] == [(id(slot), score) for slot, score in expected]
+
+            top = scheduler.rank_slots(slots, event_type, preferences, top_k=5)
+            assert [score for _, score in top] == [score for _, score in expected[:5]]
+
+
+class TestSocialIntelligence:
+    """Tests for the DeepSeek client."""
+
+    @pytest.mark.asyncio
+    async def test_call_deepseek_retries_transient_errors(self):
+        import httpx
+        from yotei.agent.social_intel import SocialIntelligence
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(503 if len(calls) == 1 else 429, text="busy")
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": '{"message": "hi"}'}}],
+            })
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            intel = SocialIntelligence(api_key="test", client=client)
+            intel.cache_enabled = False
+            intel.retry_backoff = 0
+            result = await intel._call_deepseek("prompt")
+
+        assert result == {"message": "hi"}
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_call_deepseek_gives_up_after_max_retries(self):
+        import httpx
+        from yotei.agent.social_intel import SocialIntelligence
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500, text="down")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            intel = SocialIntelligence(api_key="test", client=client)
+            intel.cache_enabled = False
+            intel.retry_backoff = 0
+            intel.max_retries = 2
+            with pytest.raises(Exception, match="DeepSeek API error: 500"):
+                await intel._call_deepseek("prompt")
+
+        assert len(calls) == 3
+
+
+    def test_retry_after_is_capped(self):
+        import httpx
+        from yotei.agent.social_intel import SocialIntelligence
+
+        intel = SocialIntelligence(api_key="test")
+        intel.retry_backoff = 0
+        intel.max_retry_delay = 30
+        assert intel._retry_delay(0, httpx.Response(429, headers={"retry-after": "5"})) == 5
+        assert intel._retry_delay(0, httpx.Response(429, headers={"retry-after": "86400"})) == 30
+
+    def test_pooled_client_from_old_loop_is_closed(self):
+        from yotei.agent import social_intel
+
+        async def client():
+            return social_intel.get_http_client()
+
+        async def replace():
+            new = social_intel.get_http_client()
+            await asyncio.sleep(0)
+            await social_intel.close_http_client()
+            return new
+
+        old = asyncio.run(client())
+        new = asyncio.run(replace())
+        assert new is not old
+        assert old.is_closed
+
+class TestResponseCache:
+    """Tests for the DeepSeek response cache."""
+
+    @pytest.mark.asyncio
+    async def test_identical_prompts_hit_cache(self):
+        import httpx
+        from yotei.agent.social_intel import SocialIntelligence
+        from yotei.agent.response_cache import ResponseCache
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": '{"decision": "accept"}'}}],
+                "usage": {"total_tokens": 120},
+            })
+
+        cache = ResponseCache()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            intel = SocialIntelligence(api_key="test", client=client, cache=cache)
+            first = await intel._call_deepseek("same prompt")
+            second = await intel._call_deepseek("same prompt")
+            await intel._call_deepseek("other prompt")
+
+        assert first == second == {"decision": "accept"}
+        assert len(calls) == 2
+        assert cache.stats() == {"hits": 1, "misses": 2, "tokens_saved": 120, "entries": 2}
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_ttl(self):
+        from yotei.agent.response_cache import ResponseCache
+
+        cache = ResponseCache(max_entries=2)
+        await cache.set("a", {"v": 1})
+        await cache.set("b", {"v": 2})
+        assert await cache.get("a") == {"v": 1}  # "b" is now least recently used
+        await cache.set("c", {"v": 3})
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"v": 1}
+
+        expired = ResponseCache(ttl_seconds=0)
+        await expired.set("a", {"v": 1})
+        assert await expired.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_persistent_cache(self):
+        from yotei.agent.response_cache import ResponseCache
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "llm_cache.db"
+            cache = ResponseCache(db_path=db_path)
+            await cache.connect()
+            await cache.set("key", {"message": "hi"}, tokens=50)
+            await cache.close()
+
+            reopened = ResponseCache(db_path=db_path)
+            await reopened.connect()
+            assert await reopened.get("key") == {"message": "hi"}
+            assert reopened.stats()["tokens_saved"] == 50
+            await reopened.close()
+
+
+    @pytest.mark.asyncio
+    async def test_shared_cache_is_created_once_and_prunes_on_write(self, monkeypatch):
+        from yotei.agent import response_cache
+        from yotei.config.settings import get_settings
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            monkeypatch.setattr(response_cache, "get_cache_path", lambda: Path(tmpdir) / "llm_cache.db")
+            monkeypatch.setattr(get_settings().deepseek, "cache_persist", True)
+            caches = await asyncio.gather(*(response_cache.get_response_cache() for _ in range(5)))
+            cache = caches[0]
+            assert all(c is cache for c in caches)
+
+            await cache._connection.execute(
+                "INSERT INTO responses (key, data, tokens, expires_at) VALUES ('old', '{}', 0, 0)"
+            )
+            await cache.set("new", {"v": 1})
+            async with cache._connection.execute("SELECT key FROM responses") as cursor:
+                assert [row[0] for row in await cursor.fetchall()] == ["new"]
+
+            assert response_cache.response_cache_stats()["entries"] == 1
+            await response_cache.close_response_cache()
+            assert response_cache.response_cache_stats() is None
+
 class TestAgentCoordination:
     """Tests for agent coordination."""
 
@@ -128,6 +560,880 @@ class TestAgentCoordination:
         agent = Agent("YT-TEST-1234", "AGENT-TEST")
         assert agent.user_id == "YT-TEST-1234"
 
+    @pytest.mark.asyncio
+    async def test_participants_evaluated_concurrently(self):
+        import time
+        from yotei.models.event import Proposal
+
+        agent = Agent("YT-CREATOR", "AGENT-CREATOR")
+        agent.config = agent.config.model_copy(update={
+            "max_concurrent_evaluations": 10,
+            "evaluation_timeout": 0.8,
+        })
+
+        event = Event(creator_id="YT-CREATOR", title="Dinner", event_type=EventType.DINNER)
+        event.add_participant("YT-CREATOR", "Creator", "AGENT-CREATOR")
+        for i in range(6):
+            event.add_participant(f"YT-F{i}", f"Friend{i}", f"AGENT-F{i}")
+
+        async def evaluate(event, proposal, participant, friend_ctx):
+            # Later participants answer first; Friend5 never answers in time
+            index = int(participant.user_name[-1])
+            await asyncio.sleep(5 if index == 5 else 0.1 * (5 - index))
+            return {"decision": "decline" if index == 4 else "accept", "enthusiasm_level": 4}
+
+        agent._evaluate_participant = evaluate
+        proposal = Proposal(proposer_agent_id="AGENT-CREATOR")
+
+        started = time.perf_counter()
+        await agent._simulate_agent_responses(event, proposal, {})
+        elapsed = time.perf_counter() - started
+
+        # Bounded by the slowest answer / timeout, not the sum of all of them
+        assert elapsed < 1.5
+        assert list(proposal.responses) == [
+            "AGENT-CREATOR", "AGENT-F0", "AGENT-F1", "AGENT-F2", "AGENT-F3", "AGENT-F4",
+        ]
+        assert proposal.responses["AGENT-F4"] == "decline"
+        assert "AGENT-F5" not in proposal.responses
+        assert not event.check_consensus()
+
+
+
+class TestAgentRunner:
+    """Tests for the change-driven agent runner."""
+
+    @pytest.mark.asyncio
+    async def test_only_changed_events_are_coordinated(self):
+        from yotei.agent.core import AgentRunner
+        from yotei.agent.messenger import Messenger
+        from yotei.relay.protocol import AgentMessage, MessageType
+        from yotei.models.event import EventStatus
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(Path(tmpdir) / "test.db")
+            await db.connect()
+
+            planning = [Event(creator_id="YT-ME", title=f"Plan {i}") for i in range(2)]
+            confirmed = Event(creator_id="YT-ME", title="Done", status=EventStatus.CONFIRMED)
+            for event in planning + [confirmed]:
+                await db.save_event(event)
+
+            messenger = Messenger("AGENT-ME", "Me")
+            runner = AgentRunner("YT-ME", "AGENT-ME", db=db, poll_interval=60, messenger=messenger)
+            coordinated = []
+
+            async def coordinate(event):
+                coordinated.append(event.id)
+                event.add_agent_note("AGENT-ME", "negotiation", "tried")
+                return {"success": True}
+
+            runner.agent.coordinate_event = coordinate
+
+            await runner._check_pending_events()
+            assert sorted(coordinated) == sorted(e.id for e in planning)
+            assert runner.metrics.last_examined == 2
+            assert runner.metrics.last_coordinated == 2
+
+            # Nothing changed: examined but not coordinated again
+            await runner._check_pending_events()
+            assert runner.metrics.last_examined == 2
+            assert runner.metrics.last_coordinated == 0
+
+            # Running, it wakes for outside writes and relay messages about
+            # events, but not for its own saves
+            async def settle(count):
+                for _ in range(100):
+                    if len(coordinated) >= count:
+                        break
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.05)
+                return len(coordinated)
+
+            task = asyncio.create_task(runner.start())
+            try:
+                assert await settle(2) == 2
+                ticks = runner.metrics.ticks
+                event = await db.get_event(planning[0].id)
+                event.description = "Bring snacks"
+                await db.save_event(event)
+                assert await settle(3) == 3
+                assert coordinated[-1] == planning[0].id
+                assert runner.metrics.ticks == ticks + 1  # saving its notes didn't wake it again
+
+                await messenger._handle_message(AgentMessage(
+                    type=MessageType.EVENT_UPDATE, sender_agent_id="AGENT-FRIEND",
+                    recipient_agent_id="AGENT-ME", event_id=planning[1].id,
+                ))
+                assert await settle(4) == 4
+                assert coordinated[-1] == planning[1].id
+            finally:
+                await runner.stop()
+                await task
+                await db.close()
+
+
+class FakeWebSocket:
+    """Records frames; optionally stalls or fails on send."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.frames = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(text)
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClientLink:
+    """Client side of a relay websocket; the test feeds it frames (None drops it)."""
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send(self, frame):
+        self.sent.append(json.loads(frame))
+
+    async def recv(self):
+        from websockets.exceptions import ConnectionClosed
+
+        item = await self.incoming.get()
+        if item is None:
+            raise ConnectionClosed(None, None)
+        return json.dumps(item)
+
+    async def close(self):
+        pass
+
+
+class TestRelayServer:
+    """Tests for relay fan-out and outbound queues."""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_evicts_stuck_and_failed_recipients(self):
+        import time
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import create_nudge_message
+
+        relay = RelayServer(send_timeout=0.2, queue_size=2)
+        sockets = {agent_id: FakeWebSocket() for agent_id in
+                   [f"AGENT-{i}" for i in range(20)] + ["AGENT-SLOW", "AGENT-DEAD"]}
+        for agent_id, websocket in sockets.items():
+            await relay.connect(agent_id, websocket)
+            relay.subscribe_to_event(agent_id, "EVT-1")
+        for connection in relay.connections.values():
+            await connection.flush()
+        for websocket in sockets.values():
+            websocket.frames.clear()
+        sockets["AGENT-SLOW"].delay = 5
+        sockets["AGENT-DEAD"].fail = True
+        dropped_before = relay.connections["AGENT-1"].frames_dropped
+
+        messages = [
+            create_nudge_message("AGENT-0", "event:EVT-1", "EVT-1", "dinner", f"soon {i}?")
+            for i in range(4)
+        ]
+        started = time.perf_counter()
+        for message in messages:
+            await relay.broadcast_to_event("EVT-1", message, exclude={"AGENT-0"})
+        # Only the stuck queue waited, and only once
+        assert time.perf_counter() - started < 1
+
+        assert "AGENT-SLOW" not in relay.connections
+        assert "AGENT-DEAD" not in relay.connections
+        assert sockets["AGENT-SLOW"].closed
+        assert relay.event_subscriptions["EVT-1"] == {f"AGENT-{i}" for i in range(20)}
+
+        await relay.connections["AGENT-1"].flush()
+        frames = [json.loads(f) for f in sockets["AGENT-1"].frames]
+        assert [f for f in frames if "sender" in f] == [m.to_wire() for m in messages]
+        departed = {f["agent_id"] for f in frames if f.get("type") == "agent_disconnected"}
+        # Departure notices are droppable when the queue is full of direct messages
+        dropped = relay.get_agent_status("AGENT-1")["outbound_queue"]["dropped"] - dropped_before
+        assert departed <= {"AGENT-SLOW", "AGENT-DEAD"}
+        assert len(departed) + dropped == 2
+        await relay.connections["AGENT-0"].flush()
+        assert not any("sender" in json.loads(f) for f in sockets["AGENT-0"].frames)
+
+        # A replaced connection is closed and hands over its subscriptions;
+        # its stale socket cannot remove the agent's newer connection
+        stale = relay.connections["AGENT-1"]
+        await relay.connect("AGENT-1", FakeWebSocket())
+        assert sockets["AGENT-1"].closed
+        await relay.disconnect("AGENT-1", stale)
+        assert "AGENT-1" in relay.connections
+        await relay.disconnect("AGENT-1")
+        assert "AGENT-1" not in relay.event_subscriptions["EVT-1"]
+
+    @pytest.mark.asyncio
+    async def test_stalled_write_evicts_without_a_full_queue(self):
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import create_nudge_message
+
+        relay = RelayServer(send_timeout=0.05)
+        stalled = FakeWebSocket()
+        await relay.connect("AGENT-A", stalled)
+        await relay.connections["AGENT-A"].flush()
+        stalled.delay = 5
+
+        # One frame, far below the queue size: the writer's deadline evicts
+        await relay.route_to_agent(create_nudge_message("AGENT-B", "AGENT-A", None, "t", "hi"))
+        await asyncio.sleep(0.2)
+        assert "AGENT-A" not in relay.connections
+        assert stalled.closed
+        assert relay.churn["evicted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reaper_disconnects_silent_agents(self):
+        from yotei.relay.server import RelayServer
+
+        relay = RelayServer()
+        relay.liveness_timeout = 10
+        sockets = {agent_id: FakeWebSocket() for agent_id in ("AGENT-A", "AGENT-B", "AGENT-C")}
+        for agent_id, websocket in sockets.items():
+            await relay.connect(agent_id, websocket)
+            relay.subscribe_to_event(agent_id, "EVT-1")
+        start = max(c.last_activity for c in relay.connections.values())
+        relay.connections["AGENT-A"].last_activity = start + 5
+
+        assert await relay.reap_stale(now=start + 9) == 0
+        assert await relay.reap_stale(now=start + 11) == 2
+        assert list(relay.connections) == ["AGENT-A"]
+        assert relay.event_subscriptions == {"EVT-1": {"AGENT-A"}}
+        assert sockets["AGENT-B"].closed and not sockets["AGENT-A"].closed
+        # A's entry was pushed back with its newer activity time
+        assert len(relay._liveness) == 1
+
+        await relay.disconnect("AGENT-A")
+        assert await relay.reap_stale(now=start + 20) == 0
+        assert relay.churn_stats() == {
+            "connected": 3, "disconnected": 1, "evicted": 0, "reaped": 2,
+            "online": 0, "liveness_tracked": 0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_outbound_queue_overflow_policies(self):
+        from yotei.relay.server import RelayServer, OverflowPolicy
+        from yotei.relay.protocol import create_vibe_check
+
+        relay = RelayServer(send_timeout=0.1, queue_size=2, direct_overflow=OverflowPolicy.ERROR)
+        slow, sender = FakeWebSocket(), FakeWebSocket()
+        await relay.connect("AGENT-A", slow)
+        await relay.connect("AGENT-B", sender)
+        await relay.connections["AGENT-A"].flush()
+        slow.delay = 5
+
+        # One frame stuck in the writer, two queued, the oldest queued one dropped
+        await relay.broadcast_system({"type": "tick", "n": 0})
+        await asyncio.sleep(0)
+        for n in range(1, 4):
+            await relay.broadcast_system({"type": "tick", "n": n})
+
+        # Direct messages are refused rather than dropped, and the sender hears why
+        await relay.connections["AGENT-B"].flush()
+        query = create_vibe_check("AGENT-B", "AGENT-A", "EVT-1")
+        await relay.handle_message("AGENT-B", query.to_wire())
+        assert "AGENT-A" in relay.connections
+
+        stats = relay.get_agent_status("AGENT-A")["outbound_queue"]
+        assert stats["depth"] == 2
+        assert stats["capacity"] == 2
+        assert stats["dropped"] == 1
+        assert stats["rejected"] == 1
+
+        await relay.connections["AGENT-B"].flush()
+        error = json.loads(sender.frames[-1])
+        assert error["payload"]["error_code"] == "AGENT_BUSY"
+        assert error["reply_to"] == query.id
+
+        # Command replies are never dropped: an agent that can't take one is evicted
+        await relay.reply(relay.connections["AGENT-A"], {"cmd": "pong"})
+        assert "AGENT-A" not in relay.connections
+        assert relay.churn["evicted"] == 1
+
+        await relay.disconnect("AGENT-A")
+        await relay.disconnect("AGENT-B")
+
+
+class TestRelayMailbox:
+    """Tests for store-and-forward delivery to offline agents."""
+
+    @pytest.mark.asyncio
+    async def test_offline_messages_are_held_and_flushed(self):
+        from yotei.relay.mailbox import Mailbox
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import AgentMessage, MessageType, create_vibe_check
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mailbox = Mailbox(Path(tmpdir) / "mailbox.db", max_per_agent=3)
+            await mailbox.connect()
+            relay = RelayServer(mailbox=mailbox)
+            relay.mailbox_flush_batch = 2
+            sender = FakeWebSocket()
+            await relay.connect("AGENT-A", sender)
+
+            queries = [create_vibe_check("AGENT-A", "AGENT-B", f"EVT-{i}") for i in range(4)]
+            for query in queries:
+                await relay.handle_message("AGENT-A", query.to_wire())
+            private = AgentMessage(
+                type=MessageType.NUDGE, sender_agent_id="AGENT-A",
+                recipient_agent_id="AGENT-B", shareable=False,
+            )
+            expired = create_vibe_check("AGENT-A", "AGENT-C", "EVT-X")
+            expired.response_timeout_seconds = 0
+            # Both flags travel in the wire header, as from a websocket
+            await relay.handle_message("AGENT-A", private.to_wire())
+            await relay.handle_message("AGENT-A", expired.to_wire())
+            assert private.id not in [m["id"] for m in relay.message_log.query()]
+
+            # Held, so the sender gets no AGENT_OFFLINE error
+            await relay.connections["AGENT-A"].flush()
+            assert not any("payload" in json.loads(f) for f in sender.frames)
+            assert await mailbox.pending("AGENT-B") == 3
+            assert await mailbox.pending("AGENT-C") == 0
+
+            receiver = FakeWebSocket()
+            await relay.connect("AGENT-B", receiver)
+            await relay.connections["AGENT-B"].flush()
+
+            delivered = [json.loads(f)["id"] for f in receiver.frames]
+            assert delivered == [q.id for q in queries[1:]]
+            assert await mailbox.pending("AGENT-B") == 0
+            assert mailbox.stats() == {"stored": 5, "delivered": 3, "dropped": 1}
+
+            await relay.disconnect("AGENT-A")
+            await relay.disconnect("AGENT-B")
+            await mailbox.close()
+
+
+    @pytest.mark.asyncio
+    async def test_messages_survive_a_recipient_dropping_mid_flush(self):
+        from yotei.relay.mailbox import Mailbox
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import create_vibe_check
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mailbox = Mailbox(Path(tmpdir) / "mailbox.db")
+            await mailbox.connect()
+            relay = RelayServer(mailbox=mailbox)
+            queries = [create_vibe_check("AGENT-A", "AGENT-B", f"EVT-{i}") for i in range(3)]
+            for query in queries:
+                await relay.route_to_agent(query)
+
+            # The link dies before anything is written
+            await relay.connect("AGENT-B", FakeWebSocket(fail=True))
+            assert "AGENT-B" not in relay.connections
+            assert await mailbox.pending("AGENT-B") == 3
+
+            receiver = FakeWebSocket()
+            await relay.connect("AGENT-B", receiver)
+            await relay.connections["AGENT-B"].flush()
+            assert [json.loads(f)["id"] for f in receiver.frames] == [q.id for q in queries]
+            assert await mailbox.pending("AGENT-B") == 0
+
+            await relay.disconnect("AGENT-B")
+            await mailbox.close()
+
+class TestMessageLog:
+    """Tests for the relay's bounded message log."""
+
+    def test_ring_buffer_indexes_and_segments(self):
+        from datetime import datetime
+        from yotei.relay.message_log import MessageLog
+        from yotei.relay.protocol import create_nudge_message
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log = MessageLog(capacity=50, log_dir=Path(tmpdir), segment_max_bytes=2000, max_segments=3)
+            messages = []
+            for i in range(200):
+                message = create_nudge_message(f"AGENT-{i % 4}", "AGENT-X", f"EVT-{i % 5}", "t", "m")
+                message.timestamp = datetime(2026, 11, 1, 12, 0, i % 60, i)
+                log.record(message)
+                messages.append(message)
+
+            assert len(log) == 50
+            assert log.stats()["total_logged"] == 200
+            # Indexes only hold what is still buffered
+            assert sum(len(b) for b in log._by_event.values()) == 50
+            assert sum(len(b) for b in log._by_sender.values()) == 50
+
+            recent = messages[150:]
+            assert [e["id"] for e in log.query(event_id="EVT-3")] == \
+                [m.id for m in recent if m.event_id == "EVT-3"]
+            assert [e["id"] for e in log.query(event_id="EVT-3", sender="AGENT-2")] == \
+                [m.id for m in recent if m.event_id == "EVT-3" and m.sender_agent_id == "AGENT-2"]
+            assert [e["id"] for e in log.query(limit=3)] == [m.id for m in recent[-3:]]
+
+            since = messages[190].timestamp.isoformat()
+            assert [e["id"] for e in log.query(since=since)] == \
+                [m.id for m in recent if m.timestamp.isoformat() > since]
+
+            log.close()
+            segments = sorted(Path(tmpdir).glob("segment-*.jsonl"))
+            assert len(segments) == 3
+            last = segments[-1].read_text().splitlines()[-1]
+            assert json.loads(last)["id"] == messages[-1].id
+
+    def test_messages_endpoint(self):
+        from fastapi.testclient import TestClient
+        from yotei.relay import server
+        from yotei.relay.message_log import MessageLog
+        from yotei.relay.protocol import create_nudge_message
+
+        previous = server.relay.message_log
+        server.relay.message_log = MessageLog(capacity=10)
+        try:
+            for event_id in ("EVT-1", "EVT-2", "EVT-1"):
+                server.relay.message_log.record(
+                    create_nudge_message("AGENT-A", "AGENT-B", event_id, "t", "m")
+                )
+            response = TestClient(server.app).get("/messages", params={"event_id": "EVT-1"})
+            assert response.json()["count"] == 2
+            assert {m["event_id"] for m in response.json()["messages"]} == {"EVT-1"}
+        finally:
+            server.relay.message_log = previous
+
+
+class TestWireCodecs:
+    """Tests for codec negotiation and header-only routing."""
+
+    @pytest.mark.asyncio
+    async def test_frames_forwarded_untouched_and_transcoded(self):
+        msgpack = pytest.importorskip("msgpack")
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import CODECS, create_nudge_message
+
+        relay = RelayServer()
+        sender, json_peer, binary_peer = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await relay.connect("AGENT-A", sender, codecs=["cbor", "msgpack", "json"])
+        await relay.connect("AGENT-B", json_peer)
+        await relay.connect("AGENT-C", binary_peer, codecs=["msgpack"])
+        for agent_id in ("AGENT-B", "AGENT-C"):
+            relay.subscribe_to_event(agent_id, "EVT-1")
+        for agent_id in relay.connections:
+            await relay.connections[agent_id].flush()
+        assert json.loads(sender.frames[0]) == {"cmd": "codec", "codec": "msgpack"}
+        json_peer.frames.clear()
+        binary_peer.frames.clear()
+
+        message = create_nudge_message("AGENT-A", "event:EVT-1", "EVT-1", "dinner", "Friday?")
+        wire = message.to_wire()
+        frame = CODECS["msgpack"].encode(wire)
+        await relay.handle_message("AGENT-A", msgpack.unpackb(frame), frame, CODECS["msgpack"])
+        for agent_id in ("AGENT-B", "AGENT-C"):
+            await relay.connections[agent_id].flush()
+
+        assert binary_peer.frames == [frame]
+        assert binary_peer.frames[0] is frame
+        assert json.loads(json_peer.frames[0]) == wire
+        assert relay.message_log.query(event_id="EVT-1")[0]["id"] == message.id
+
+        # Malformed headers are refused in the sender's codec
+        await relay.handle_message("AGENT-A", dict(wire, type="telepathy"))
+        await relay.connections["AGENT-A"].flush()
+        error = msgpack.unpackb(sender.frames[-1])
+        assert error["payload"]["error_code"] == "INVALID_MESSAGE"
+
+        for agent_id in list(relay.connections):
+            await relay.disconnect(agent_id)
+
+    def test_endpoint_negotiates_binary_codec(self):
+        msgpack = pytest.importorskip("msgpack")
+        from fastapi.testclient import TestClient
+        from yotei.relay import server
+
+        client = TestClient(server.app)
+        with client.websocket_connect("/ws/AGENT-CODEC?codecs=msgpack,json") as websocket:
+            assert websocket.receive_json() == {"cmd": "codec", "codec": "msgpack"}
+            websocket.send_bytes(msgpack.packb({"cmd": "ping"}))
+            assert msgpack.unpackb(websocket.receive_bytes()) == {"cmd": "pong"}
+            # JSON text is still understood on a binary connection
+            websocket.send_text(json.dumps({"cmd": "subscribe", "event_id": "EVT-9"}))
+            assert msgpack.unpackb(websocket.receive_bytes())["status"] == "subscribed"
+        assert "AGENT-CODEC" not in server.relay.connections
+
+
+class TestMessengerBatching:
+    """Tests for batched sends and EVENT_UPDATE coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_batch_coalesces_event_updates_and_relay_unpacks(self):
+        from yotei.agent.messenger import Messenger
+        from yotei.relay.protocol import AgentMessage, MessageType, create_nudge_message
+        from yotei.relay.server import RelayServer
+
+        class ClientSocket:
+            def __init__(self):
+                self.frames = []
+
+            async def send(self, frame):
+                self.frames.append(frame)
+
+        messenger = Messenger("AGENT-A", "Alice")
+        messenger.websocket = ClientSocket()
+        messenger.connected = True
+        messenger.batch_window = 0.005
+        messenger.batch_max = 10
+
+        def update(status):
+            return AgentMessage(
+                type=MessageType.EVENT_UPDATE, sender_agent_id="AGENT-A",
+                recipient_agent_id="AGENT-B", event_id="EVT-1", payload={"status": status},
+            )
+
+        sent = [
+            update("proposed"),
+            create_nudge_message("AGENT-A", "AGENT-B", "EVT-1", "t", "one"),
+            update("confirmed"),
+            create_nudge_message("AGENT-A", "AGENT-C", "EVT-1", "t", "two"),
+        ]
+        for message in sent:
+            assert await messenger.send(message)
+        assert messenger.websocket.frames == []
+        await asyncio.sleep(0.05)
+
+        assert messenger.frames_sent == 1
+        assert messenger.messages_coalesced == 1
+        batch = json.loads(messenger.websocket.frames[0])
+        assert batch["cmd"] == "batch"
+        assert [m["id"] for m in batch["messages"]] == [sent[1].id, sent[2].id, sent[3].id]
+
+        # A full batch goes out without waiting for the window
+        for i in range(10):
+            await messenger.send(create_nudge_message("AGENT-A", "AGENT-B", None, "t", str(i)))
+        assert messenger.frames_sent == 2
+
+        relay = RelayServer()
+        sockets = {agent_id: FakeWebSocket() for agent_id in ("AGENT-B", "AGENT-C")}
+        for agent_id, websocket in sockets.items():
+            await relay.connect(agent_id, websocket)
+        for agent_id, websocket in sockets.items():
+            await relay.connections[agent_id].flush()
+            websocket.frames.clear()
+        await relay.handle_batch("AGENT-A", batch["messages"])
+        for connection in relay.connections.values():
+            await connection.flush()
+        assert [json.loads(f)["id"] for f in sockets["AGENT-B"].frames] == [sent[1].id, sent[2].id]
+        assert [json.loads(f)["id"] for f in sockets["AGENT-C"].frames] == [sent[3].id]
+
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_fails_its_waiters(self):
+        from yotei.agent.messenger import Messenger
+        from yotei.relay.protocol import create_vibe_check
+
+        class BrokenSocket:
+            async def send(self, frame):
+                raise OSError("link down")
+
+        messenger = Messenger("AGENT-A", "Alice")
+        messenger.websocket = BrokenSocket()
+        messenger.connected = True
+        messenger.batch_window = 0.005
+        messenger.batch_max = 10
+
+        started = asyncio.get_running_loop().time()
+        # Both requests go out in the same batch frame, which fails
+        waiting = asyncio.create_task(
+            messenger.send_and_wait(create_vibe_check("AGENT-A", "AGENT-B", "EVT-1"), timeout=5)
+        )
+        await asyncio.sleep(0)
+        result = await messenger.gather_responses(
+            [create_vibe_check("AGENT-A", "AGENT-C", "EVT-1")], deadline=5,
+        )
+        assert await waiting is None
+        assert asyncio.get_running_loop().time() - started < 1
+        assert result.replies["AGENT-C"].error == "NOT_SENT"
+        assert not messenger.pending_responses and not messenger._in_flight
+
+class TestSessionResume:
+    """Tests for resumable relay sessions and Messenger reconnects."""
+
+    @pytest.mark.asyncio
+    async def test_relay_replays_messages_after_last_seen(self):
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import create_nudge_message
+
+        relay = RelayServer()
+        first = FakeWebSocket()
+        connection = await relay.connect("AGENT-B", first, session="new")
+        await connection.flush()
+        token = json.loads(first.frames[0])["session"]
+
+        seen = create_nudge_message("AGENT-A", "AGENT-B", None, "t", "seen")
+        await relay.route_to_agent(seen)
+        await connection.flush()
+        # The link dies with a message still on its way
+        first.fail = True
+        lost = create_nudge_message("AGENT-A", "AGENT-B", None, "t", "lost")
+        await relay.route_to_agent(lost)
+        await connection.flush()
+        assert "AGENT-B" not in relay.connections
+
+        second = FakeWebSocket()
+        connection = await relay.connect("AGENT-B", second, session=token, last_seen=seen.id)
+        await connection.flush()
+        assert json.loads(second.frames[0]) == {"cmd": "session", "session": token, "resumed": True}
+        assert [json.loads(f)["id"] for f in second.frames[1:]] == [lost.id]
+
+        # An unknown token starts a fresh session without replay
+        third = FakeWebSocket()
+        connection = await relay.connect("AGENT-B", third, session="stale", last_seen=seen.id)
+        await connection.flush()
+        assert json.loads(third.frames[0])["resumed"] is False
+        assert len(third.frames) == 1
+
+        # A last_seen the session never held replays nothing
+        token = json.loads(third.frames[0])["session"]
+        await relay.route_to_agent(create_nudge_message("AGENT-A", "AGENT-B", None, "t", "kept"))
+        await connection.flush()
+        await relay.disconnect("AGENT-B")
+        fourth = FakeWebSocket()
+        connection = await relay.connect("AGENT-B", fourth, session=token, last_seen="BROADCAST-ID")
+        await connection.flush()
+        assert json.loads(fourth.frames[0])["resumed"] is True
+        assert len(fourth.frames) == 1
+
+    @pytest.mark.asyncio
+    async def test_messenger_reconnects_and_replays_requests(self, monkeypatch):
+        from yotei.agent import messenger as messenger_module
+        from yotei.relay.protocol import MessageType, create_nudge_message, create_vibe_check, create_vibe_response
+
+        links = []
+        failures = [OSError("refused")]
+
+        async def connect(url):
+            if links and failures:
+                raise failures.pop()
+            links.append(FakeClientLink(url))
+            return links[-1]
+
+        monkeypatch.setattr(messenger_module.websockets, "connect", connect)
+        settings = Settings()
+        settings.relay.codecs = "json"
+        settings.relay.reconnect_initial_delay = 0.01
+        settings.relay.reconnect_grace = 0.2
+        messenger = messenger_module.Messenger("AGENT-A", "Alice")
+        messenger.settings = settings
+
+        assert await messenger.connect()
+        assert await messenger.subscribe_to_event("EVT-1")
+        seen = create_nudge_message("AGENT-B", "AGENT-A", None, "t", "hi")
+        links[0].incoming.put_nowait({"cmd": "session", "session": "TOKEN", "resumed": False})
+        links[0].incoming.put_nowait(seen.to_wire())
+        # Broadcasts are not kept for replay, so they don't move last_seen
+        links[0].incoming.put_nowait(create_nudge_message("AGENT-B", "broadcast", None, "t", "all").to_wire())
+        request = create_vibe_check("AGENT-A", "AGENT-B", "EVT-1")
+        waiting = asyncio.create_task(messenger.send_and_wait(request, timeout=5))
+        await asyncio.sleep(0.01)
+        links[0].incoming.put_nowait(None)
+
+        for _ in range(100):
+            if len(links) == 2 and any(m.get("id") == request.id for m in links[1].sent):
+                break
+            await asyncio.sleep(0.01)
+        assert messenger.reconnects == 1
+        assert "session=TOKEN" in links[1].url and f"last_seen={seen.id}" in links[1].url
+        # The relay forgot us: hello and subscriptions go out again first
+        assert links[1].sent[0]["type"] == MessageType.HELLO.value
+        assert links[1].sent[1] == {"cmd": "subscribe", "event_id": "EVT-1"}
+        links[1].incoming.put_nowait(create_vibe_response("AGENT-B", "AGENT-A", "EVT-1", request.id, 8).to_wire())
+        response = await asyncio.wait_for(waiting, 1)
+        assert response.type == MessageType.VIBE_RESPONSE
+
+        # Without a reachable relay, waiters fail after the grace period
+        failures.extend(OSError("refused") for _ in range(100))
+        started = asyncio.get_running_loop().time()
+        waiting = asyncio.create_task(messenger.send_and_wait(create_vibe_check("AGENT-A", "AGENT-B", "EVT-1"), timeout=30))
+        await asyncio.sleep(0.01)
+        links[1].incoming.put_nowait(None)
+        assert await asyncio.wait_for(waiting, 2) is None
+        assert asyncio.get_running_loop().time() - started < 1
+        await messenger.disconnect()
+
+
+class TestScatterGather:
+    """Tests for gather_responses and event request correlation."""
+
+    @staticmethod
+    def connected_messenger():
+        from yotei.agent.messenger import Messenger
+
+        messenger = Messenger("AGENT-A", "Alice")
+        messenger.websocket = FakeClientLink()
+        messenger.connected = True
+        messenger._receive_task = asyncio.create_task(messenger._receive_loop())
+        return messenger
+
+    @pytest.mark.asyncio
+    async def test_gather_direct_requests(self):
+        from yotei.relay.protocol import create_error_message, create_vibe_check, create_vibe_response
+
+        messenger = self.connected_messenger()
+        link = messenger.websocket
+        requests = [create_vibe_check("AGENT-A", agent_id, "EVT-1") for agent_id in ("AGENT-B", "AGENT-C", "AGENT-D")]
+        gathering = asyncio.create_task(messenger.gather_responses(requests, deadline=0.3))
+        await asyncio.sleep(0.01)
+        assert [m["id"] for m in link.sent] == [r.id for r in requests]
+
+        link.incoming.put_nowait(create_vibe_response("AGENT-C", "AGENT-A", "EVT-1", requests[1].id, 7).to_wire())
+        link.incoming.put_nowait(create_error_message(
+            "relay", "AGENT-A", "AGENT_OFFLINE", "offline", reply_to=requests[2].id,
+        ).to_wire())
+        result = await gathering
+
+        assert not result.quorum_reached
+        assert result.replies["AGENT-C"].response.payload["enthusiasm_level"] == 7
+        assert result.replies["AGENT-C"].elapsed < 0.3
+        assert result.replies["AGENT-D"].error == "AGENT_OFFLINE"
+        assert result.replies["AGENT-B"].response is None
+        assert [r.sender_agent_id for r in result.responses] == ["AGENT-C"]
+        assert messenger._gathering == {} and messenger._in_flight == {}
+
+        # A quorum returns as soon as it is met
+        requests = [create_vibe_check("AGENT-A", agent_id, "EVT-1") for agent_id in ("AGENT-B", "AGENT-C")]
+        gathering = asyncio.create_task(messenger.gather_responses(requests, quorum=1, deadline=30))
+        await asyncio.sleep(0.01)
+        link.incoming.put_nowait(create_vibe_response("AGENT-B", "AGENT-A", "EVT-1", requests[0].id, 9).to_wire())
+        result = await asyncio.wait_for(gathering, 1)
+        assert result.quorum_reached
+        assert set(result.replies) == {"AGENT-B", "AGENT-C"}
+        await messenger.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_event_request_fanout_ack(self):
+        from yotei.relay.server import RelayServer
+        from yotei.relay.protocol import create_vibe_check, create_vibe_response
+
+        relay = RelayServer()
+        sockets = {agent_id: FakeWebSocket() for agent_id in ("AGENT-A", "AGENT-B", "AGENT-C")}
+        for agent_id, websocket in sockets.items():
+            await relay.connect(agent_id, websocket)
+            relay.subscribe_to_event(agent_id, "EVT-1")
+        for agent_id, websocket in sockets.items():
+            await relay.connections[agent_id].flush()
+            websocket.frames.clear()
+
+        request = create_vibe_check("AGENT-A", "event:EVT-1", "EVT-1")
+        await relay.handle_message("AGENT-A", request.to_wire())
+        await relay.connections["AGENT-A"].flush()
+        ack = json.loads(sockets["AGENT-A"].frames[0])
+        assert ack["cmd"] == "fanout" and ack["reply_to"] == request.id
+        assert sorted(ack["recipients"]) == ["AGENT-B", "AGENT-C"]
+
+        # The messenger side waits for exactly the acked recipients
+        messenger = self.connected_messenger()
+        link = messenger.websocket
+        gathering = asyncio.create_task(messenger.gather_responses([request], deadline=5))
+        await asyncio.sleep(0.01)
+        link.incoming.put_nowait(ack)
+        for agent_id in ack["recipients"]:
+            link.incoming.put_nowait(create_vibe_response(agent_id, "AGENT-A", "EVT-1", request.id, 5).to_wire())
+        result = await asyncio.wait_for(gathering, 1)
+        assert result.quorum_reached
+        assert sorted(result.replies) == ["AGENT-B", "AGENT-C"]
+        await messenger.disconnect()
+
+
+class TestRelayCluster:
+    """Tests for the sharded relay over the in-memory bus."""
+
+    def test_hash_ring_moves_few_agents(self):
+        from yotei.relay.hashring import HashRing
+
+        agents = [f"AGENT-{i}" for i in range(2000)]
+        three = HashRing(range(3))
+        four = HashRing(range(4))
+        owners = {a: three.node_for(a) for a in agents}
+        assert set(owners.values()) == {0, 1, 2}
+        assert all(HashRing(range(3)).node_for(a) == owners[a] for a in agents[:100])
+
+        moved = [a for a in agents if four.node_for(a) != owners[a]]
+        # Only keys taken over by the new node move (about a quarter)
+        assert all(four.node_for(a) == 3 for a in moved)
+        assert len(moved) < len(agents) * 0.4
+
+    @pytest.mark.asyncio
+    async def test_cross_worker_routing_and_event_interest(self):
+        from yotei.relay.cluster import ClusterRelay, InMemoryBroker
+        from yotei.relay.hashring import HashRing
+        from yotei.relay.protocol import (
+            MessageType, create_availability_query, create_nudge_message, create_vibe_check,
+        )
+
+        ring = HashRing(range(2))
+        ids = [f"AGENT-{i}" for i in range(50)]
+        alice = next(a for a in ids if ring.node_for(a) == 0)
+        bob, carol = [a for a in ids if ring.node_for(a) == 1][:2]
+
+        broker = InMemoryBroker()
+        workers = [ClusterRelay(w, 2, broker.bus(w, 2)) for w in range(2)]
+        for worker in workers:
+            await worker.start()
+
+        async def settle():
+            for _ in range(5):
+                await asyncio.sleep(0)
+            for worker in workers:
+                for connection in worker.connections.values():
+                    await connection.flush()
+
+        alice_ws, bob_ws = FakeWebSocket(), FakeWebSocket()
+        await workers[0].connect(alice, alice_ws)
+        await workers[1].connect(bob, bob_ws)
+        workers[1].subscribe_to_event(bob, "EVT-1")
+        await settle()
+        assert workers[0].remote_interest == {"EVT-1": {1}}
+        alice_ws.frames.clear()
+        bob_ws.frames.clear()
+
+        direct = create_nudge_message(alice, bob, "EVT-1", "t", "direct")
+        event = create_nudge_message(alice, "event:EVT-1", "EVT-1", "t", "event")
+        for message in (direct, event):
+            await workers[0].handle_message(alice, message.to_wire())
+        await settle()
+        assert [json.loads(f)["id"] for f in bob_ws.frames] == [direct.id, event.id]
+
+        # Event requests are acked by every worker that has subscribers
+        request = create_vibe_check(alice, "event:EVT-1", "EVT-1")
+        alice_ws.frames.clear()
+        await workers[0].handle_message(alice, request.to_wire())
+        await settle()
+        acks = [json.loads(f) for f in alice_ws.frames]
+        assert [(a["recipients"], a["more"]) for a in acks] == [([], 1), ([bob], 0)]
+
+        # Errors for offline agents on another worker come back to the sender
+        query = create_availability_query(alice, carol, "EVT-1", "2026-11-01", "2026-11-08", "dinner")
+        await workers[0].handle_message(alice, query.to_wire())
+        await settle()
+        error = json.loads(alice_ws.frames[-1])
+        assert error["type"] == MessageType.ERROR.value
+        assert error["payload"]["error_code"] == "AGENT_OFFLINE"
+
+        await workers[1].disconnect(bob)
+        await settle()
+        assert workers[0].remote_interest == {}
+        assert json.loads(alice_ws.frames[-1])["type"] == "agent_disconnected"
+
+        for worker in workers:
+            await worker.stop()
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
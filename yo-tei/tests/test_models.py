@@ -136,6 +136,22 @@ class TestEvent:
         assert event.consensus_reached
         assert event.status == EventStatus.CONFIRMED
 
+    def test_compact_history_keeps_current_proposal(self):
+        event = Event(creator_id="YT-TEST-1234", title="Dinner")
+        first = Proposal(proposer_agent_id="A1")
+        event.add_proposal(first)
+        for _ in range(3):
+            event.proposals.append(Proposal(proposer_agent_id="A2"))
+        for i in range(4):
+            event.add_agent_note("A1", "round", f"note {i}")
+
+        notes, proposals = event.compact_history(max_notes=1, max_proposals=1)
+
+        assert [n.content for n in notes] == ["note 0", "note 1", "note 2"]
+        assert len(proposals) == 3
+        assert [p.id for p in event.proposals] == [first.id]
+        assert event.to_summary().to_display() == event.get_summary()
+
 
 class TestSchedule:
     """Tests for Schedule model."""
@@ -192,6 +208,73 @@ class TestSchedule:
         assert slot.start.hour == 14
         assert slot.end.hour == 18
 
+    def test_find_common_availability_respects_busy_and_blackout(self):
+        from yotei.models.user import BlackoutDate
+
+        saturday = date.today()
+        while saturday.weekday() != 5:
+            saturday += timedelta(days=1)
+        next_saturday = saturday + timedelta(days=7)
+
+        busy_start = datetime.combine(saturday, datetime.min.time().replace(hour=12))
+        schedule1 = Schedule(
+            user_id="U1",
+            default_availability=[AvailabilityBlock(day_of_week=5, start_hour=10, end_hour=20)],
+            specific_busy={
+                saturday.isoformat(): [TimeSlot(start=busy_start, end=busy_start + timedelta(hours=3))],
+            },
+        )
+        schedule2 = Schedule(
+            user_id="U2",
+            default_availability=[AvailabilityBlock(day_of_week=5, start_hour=9, end_hour=22)],
+            blackout_dates=[BlackoutDate(start_date=next_saturday, end_date=next_saturday)],
+        )
+
+        common = find_common_availability(
+            [schedule1, schedule2],
+            saturday,
+            next_saturday,
+            min_duration_hours=2.0,
+        )
+
+        # 10-12 and 15-20 remain on the first Saturday; the second is blacked out
+        assert [(s.start.hour, s.end.hour) for s in common] == [(10, 12), (15, 20)]
+        assert all(s.start.date() == saturday for s in common)
+
+    def test_compiled_availability_invalidation(self):
+        saturday = date.today()
+        while saturday.weekday() != 5:
+            saturday += timedelta(days=1)
+
+        schedule = Schedule(
+            user_id="U1",
+            default_availability=[AvailabilityBlock(day_of_week=5, start_hour=10, end_hour=20)],
+        )
+        bitmap = schedule.availability_bitmap(saturday, saturday)
+        assert bitmap == ((1 << 600) - 1) << 600
+        assert schedule.availability_bitmap(saturday, saturday) is bitmap
+
+        # In-place additions are picked up
+        busy_start = datetime.combine(saturday, datetime.min.time().replace(hour=12))
+        schedule.specific_busy.setdefault(saturday.isoformat(), []).append(
+            TimeSlot(start=busy_start, end=busy_start + timedelta(hours=1))
+        )
+        assert [(s.start.hour, s.end.hour) for s in schedule.get_availability_for_date(saturday)] == [(10, 12), (13, 20)]
+        assert schedule.availability_bitmap(saturday, saturday) != bitmap
+
+        # So are edits to an existing slot, including in compiled windows
+        schedule.get_availability_range(saturday, saturday)
+        schedule.specific_busy[saturday.isoformat()][0].end = busy_start + timedelta(hours=2)
+        assert [(s.start.hour, s.end.hour) for s in schedule.get_availability_for_date(saturday)] == [(10, 12), (14, 20)]
+        window = schedule.get_availability_range(saturday, saturday)[saturday.isoformat()]
+        assert [(s.start.hour, s.end.hour) for s in window] == [(10, 12), (14, 20)]
+
+        # Reassignment is picked up
+        schedule.default_availability = []
+        schedule.specific_busy = {}
+        assert schedule.get_availability_for_date(saturday) == []
+        assert schedule.availability_bitmap(saturday, saturday) == 0
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -2,16 +2,21 @@
 
 import asyncio
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Set, Any
+
+from pydantic import BaseModel
 
 from ..models.user import User
 from ..models.friend import FriendRelationship
 from ..models.event import Event, Proposal, EventStatus, AgentNote, ParticipantStatus
 from ..models.schedule import Schedule, TimeSlot
-from ..db.local import get_db
+from ..db.local import Database, get_db
 from ..config.settings import get_settings
-from .social_intel import SocialIntelligence
+from .social_intel import SocialIntelligence, close_http_client
+from .response_cache import close_response_cache, response_cache_stats
 from .scheduler import Scheduler, create_scheduler_from_event
+from .messenger import Messenger
+from ..relay.protocol import AgentMessage, MessageType
 
 
 class Agent:
@@ -21,7 +26,10 @@ class Agent:
         self.user_id = user_id
         self.agent_id = agent_id
         self.social_intel = SocialIntelligence()
+        self.config = get_settings().agent
         self.scheduler = Scheduler()
+        # Reused across events so their compiled availability stays warm
+        self._participant_schedules: Dict[str, Schedule] = {}
 
     async def get_user(self) -> Optional[User]:
         """Get the agent's user."""
@@ -67,7 +75,8 @@ class Agent:
         db = await get_db()
         user_schedule = await db.get_schedule(self.user_id)
 
-        # Set up scheduler with user's schedule
+        # Set up scheduler with this event's participants only
+        self.scheduler.clear_schedules()
         if user_schedule:
             self.scheduler.add_schedule(self.user_id, user_schedule)
 
@@ -75,7 +84,10 @@ class Agent:
         for participant in event.participants:
             if participant.user_id != self.user_id:
                 # Create a default schedule (weekend + evenings)
-                default_schedule = self._create_default_schedule(participant.user_id)
+                default_schedule = self._participant_schedules.get(participant.user_id)
+                if default_schedule is None:
+                    default_schedule = self._create_default_schedule(participant.user_id)
+                    self._participant_schedules[participant.user_id] = default_schedule
                 self.scheduler.add_schedule(participant.user_id, default_schedule)
 
         # Find common availability
@@ -178,9 +190,31 @@ class Agent:
         """Simulate responses from other agents (for MVP)."""
 
         # In production, this would send messages to other agents via the relay
-        # and wait for their responses. For now, we use social intelligence
-        # to simulate what their response would likely be.
-
+        # and wait for their responses. For now, we evaluate on their behalf.
+        # Every participant is evaluated concurrently (bounded by the agent
+        # config) and a participant that times out or fails is left without a
+        # response instead of holding up everyone else.
+
+        semaphore = asyncio.Semaphore(self.config.max_concurrent_evaluations)
+
+        async def evaluate(participant: ParticipantStatus) -> Optional[dict]:
+            friend_ctx = friend_context.get(participant.user_name, {})
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self._evaluate_participant(event, proposal, participant, friend_ctx),
+                        timeout=self.config.evaluation_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    return {"decision": None, "error": "timed out"}
+                except Exception as e:
+                    return {"decision": None, "error": str(e)}
+
+        others = [p for p in event.participants if p.user_id != self.user_id]
+        results = await asyncio.gather(*(evaluate(p) for p in others))
+        results_by_agent = {p.agent_id: result for p, result in zip(others, results)}
+
+        # Record responses in participant order so the outcome is deterministic
         for participant in event.participants:
             if participant.user_id == self.user_id:
                 # Creator auto-accepts
@@ -188,38 +222,74 @@ class Agent:
                 participant.confirmed = True
                 continue
 
-            # Simulate other participant's agent evaluating the proposal
             friend_name = participant.user_name
-            friend_ctx = friend_context.get(friend_name, {})
-
-            # Simple heuristic: accept if enthusiasm baseline is 3+ and no blocking issues
-            enthusiasm = friend_ctx.get("enthusiasm_baseline", 3)
-            sensitivities = friend_ctx.get("sensitivities", [])
-
-            # Check if proposal conflicts with sensitivities
-            has_conflict = any(
-                sens.lower() in (proposal.reasoning or "").lower()
-                for sens in sensitivities
-            )
+            result = results_by_agent[participant.agent_id]
+            decision = result.get("decision")
 
-            if enthusiasm >= 3 and not has_conflict:
+            if decision == "accept":
                 proposal.responses[participant.agent_id] = "accept"
                 participant.confirmed = True
-                participant.enthusiasm_level = enthusiasm
+                participant.enthusiasm_level = result.get("enthusiasm_level", participant.enthusiasm_level)
                 event.add_agent_note(
                     participant.agent_id,
                     "decision",
                     f"{friend_name}'s agent accepted the proposal",
                     private=False
                 )
-            else:
-                proposal.responses[participant.agent_id] = "modify"
+            elif decision in ("modify", "decline"):
+                proposal.responses[participant.agent_id] = decision
+                proposal.modifications_requested.extend(result.get("modifications_requested", []))
                 event.add_agent_note(
                     participant.agent_id,
                     "concern",
-                    f"{friend_name}'s agent requested modifications",
+                    f"{friend_name}'s agent "
+                    + ("requested modifications" if decision == "modify" else "declined the proposal"),
                     private=False
                 )
+            else:
+                event.add_agent_note(
+                    participant.agent_id,
+                    "concern",
+                    f"No response from {friend_name}'s agent yet ({result.get('error', 'unknown decision')})",
+                    private=True
+                )
+
+    async def _evaluate_participant(
+        self,
+        event: Event,
+        proposal: Proposal,
+        participant: ParticipantStatus,
+        friend_ctx: dict,
+    ) -> dict:
+        """Evaluate a proposal the way a participant's agent would."""
+
+        enthusiasm = friend_ctx.get("enthusiasm_baseline", 3)
+        sensitivities = friend_ctx.get("sensitivities", [])
+
+        if self.config.llm_evaluation:
+            return await self.social_intel.evaluate_proposal(
+                event=event,
+                proposal=proposal,
+                user_name=participant.user_name,
+                user_preferences={
+                    "relationship": friend_ctx.get("relationship"),
+                    "enthusiasm_baseline": enthusiasm,
+                },
+                private_notes={
+                    "notes": friend_ctx.get("private_notes", ""),
+                    "sensitivities": sensitivities,
+                },
+            )
+
+        # Simple heuristic: accept if enthusiasm baseline is 3+ and no blocking issues
+        has_conflict = any(
+            sens.lower() in (proposal.reasoning or "").lower()
+            for sens in sensitivities
+        )
+
+        if enthusiasm >= 3 and not has_conflict:
+            return {"decision": "accept", "enthusiasm_level": enthusiasm}
+        return {"decision": "modify", "enthusiasm_level": enthusiasm}
 
     def _create_default_schedule(self, user_id: str) -> Schedule:
         """Create a default schedule for participants without one."""
@@ -283,30 +353,137 @@ class Agent:
         )
 
 
+class RunnerMetrics(BaseModel):
+    """Counters for the agent runner."""
+
+    ticks: int = 0
+    events_examined: int = 0
+    events_coordinated: int = 0
+    last_examined: int = 0
+    last_coordinated: int = 0
+    llm_cache: Optional[Dict[str, int]] = None  # response cache hits, misses and tokens saved
+
+
+# Tables whose changes can affect every event's coordination
+RUNNER_INPUT_TABLES = {"users", "friends", "schedules"}
+
+# Relay messages that mean an event should be coordinated again
+RUNNER_WAKE_MESSAGES = (
+    MessageType.PROPOSAL,
+    MessageType.PROPOSAL_RESPONSE,
+    MessageType.AVAILABILITY_RESPONSE,
+    MessageType.EVENT_UPDATE,
+    MessageType.EVENT_CANCELLED,
+)
+
+
 class AgentRunner:
-    """Runs the agent as a background service."""
+    """Runs the agent as a background service.
 
-    def __init__(self, user_id: str, agent_id: str):
+    Only events whose stored ``updated_at`` moved since the runner last
+    coordinated them are loaded and coordinated. The runner sleeps until a
+    database write, a relay message about an event (with a messenger) or a
+    ``wake()`` call wakes it, falling back to polling every
+    ``poll_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        agent_id: str,
+        db: Optional[Database] = None,
+        poll_interval: Optional[float] = None,
+        messenger: Optional[Messenger] = None,
+    ):
         self.agent = Agent(user_id, agent_id)
         self.running = False
+        self.poll_interval = poll_interval or self.agent.config.poll_interval
+        self.metrics = RunnerMetrics()
+        self._db = db
+        self._watermarks: Dict[str, str] = {}  # event_id -> updated_at when last coordinated
+        self._wakeup = asyncio.Event()
+        self._saving: Set[str] = set()  # events the runner itself is saving
+        if messenger is not None:
+            for message_type in RUNNER_WAKE_MESSAGES:
+                messenger.register_handler(message_type, self._on_relay_message)
+
+    async def _get_db(self) -> Database:
+        return self._db or await get_db()
 
     async def start(self):
         """Start the agent runner."""
         self.running = True
-        while self.running:
-            await self._check_pending_events()
-            await asyncio.sleep(60)  # Check every minute
+        db = await self._get_db()
+        db.add_change_listener(self._on_db_change)
+
+        try:
+            while self.running:
+                self._wakeup.clear()
+                await self._check_pending_events()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            db.remove_change_listener(self._on_db_change)
 
     async def stop(self):
         """Stop the agent runner."""
         self.running = False
+        self.wake()
+        self.metrics.llm_cache = response_cache_stats()
+        if self.metrics.llm_cache is not None:
+            print(f"LLM response cache: {self.metrics.llm_cache}")
+        await close_http_client()
+        await close_response_cache()
+
+    def wake(self):
+        """Run the next check now instead of waiting for the poll interval."""
+        self._wakeup.set()
+
+    def _on_relay_message(self, message: AgentMessage):
+        # Other agents' changes don't touch our updated_at, so forget the watermark
+        if message.event_id:
+            self._watermarks.pop(message.event_id, None)
+        self.wake()
+
+    def _on_db_change(self, table: str, key: str):
+        if table == "events" and key in self._saving:
+            return  # Our own save after coordinating
+        if table in RUNNER_INPUT_TABLES:
+            self._watermarks.clear()
+        self.wake()
 
     async def _check_pending_events(self):
-        """Check for events needing coordination."""
-        db = await get_db()
-        events = await db.get_active_events(self.agent.user_id)
+        """Coordinate planning events that changed since they were last coordinated."""
+        db = await self._get_db()
+        watermarks = await db.get_event_watermarks(self.agent.user_id, EventStatus.PLANNING.value)
+
+        # Forget events that left the planning state
+        for event_id in list(self._watermarks):
+            if event_id not in watermarks:
+                del self._watermarks[event_id]
+
+        coordinated = 0
+        for event_id, updated_at in watermarks.items():
+            if self._watermarks.get(event_id) == updated_at:
+                continue
+
+            event = await db.get_event(event_id)
+            if event is None or event.status != EventStatus.PLANNING:
+                continue
 
-        for event in events:
-            if event.status == EventStatus.PLANNING:
-                await self.agent.coordinate_event(event)
-                await db.save_event(event)
+            await self.agent.coordinate_event(event)
+            self._saving.add(event_id)
+            try:
+                self._watermarks[event_id] = await db.save_event(event)
+            finally:
+                self._saving.discard(event_id)
+            coordinated += 1
+
+        self.metrics.ticks += 1
+        self.metrics.last_examined = len(watermarks)
+        self.metrics.last_coordinated = coordinated
+        self.metrics.events_examined += len(watermarks)
+        self.metrics.events_coordinated += coordinated
+        self.metrics.llm_cache = response_cache_stats()
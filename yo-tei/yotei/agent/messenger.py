@@ -1,16 +1,22 @@
 """Agent messenger for communicating with other agents via the relay."""
 
 import asyncio
-import json
+import random
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Callable, Any
+from typing import Optional, Dict, List, Set, Callable, Any, Tuple, NamedTuple
+from urllib.parse import urlencode
 import websockets
 from websockets.exceptions import ConnectionClosed
 
 from ..config.settings import get_settings
+from ..relay.hashring import HashRing
 from ..relay.protocol import (
     AgentMessage,
     MessageType,
+    CODECS,
+    JSON_CODEC,
+    codec_for_frame,
     create_hello_message,
     create_availability_query,
     create_availability_response,
@@ -19,9 +25,34 @@ from ..relay.protocol import (
     create_nudge_message,
     create_vibe_check,
     create_vibe_response,
+    create_error_message,
 )
 
 
+class GatheredReply(NamedTuple):
+    """One agent's part of a gather_responses call."""
+
+    agent_id: str
+    request_id: str
+    response: Optional[AgentMessage]  # None if the agent did not answer in time
+    elapsed: Optional[float]  # seconds from sending the requests to this reply
+    error: Optional[str] = None  # relay error code (e.g. AGENT_OFFLINE) or NOT_SENT
+
+
+class GatherResult(NamedTuple):
+    """Replies collected by gather_responses, keyed by agent ID."""
+
+    replies: Dict[str, GatheredReply]
+    quorum_reached: bool
+    elapsed: float
+
+    @property
+    def responses(self) -> List[AgentMessage]:
+        """Successful replies, in arrival order."""
+        answered = [r for r in self.replies.values() if r.response is not None and r.error is None]
+        return [r.response for r in sorted(answered, key=lambda r: r.elapsed)]
+
+
 class Messenger:
     """Handles agent-to-agent communication via the relay server."""
 
@@ -33,32 +64,147 @@ class Messenger:
         self.connected = False
         self.message_handlers: Dict[MessageType, List[Callable]] = {}
         self.pending_responses: Dict[str, asyncio.Future] = {}
+        self._gathering: Dict[str, asyncio.Queue] = {}  # request_id -> inbox of a gather_responses call
         self._receive_task = None
+        # JSON until the relay confirms a codec from those we offered
+        self.codec = JSON_CODEC
+
+        # Opt-in batching: outgoing messages wait up to batch_window seconds
+        # and go out as one {"cmd": "batch"} frame
+        self.batch_window = self.settings.relay.batch_window_ms / 1000
+        self.batch_max = self.settings.relay.batch_max_messages
+        self._batch: List[Optional[dict]] = []  # wires; None where one was coalesced away
+        self._batch_size = 0
+        self._pending_updates: Dict[Tuple[str, Optional[str]], int] = {}  # (recipient, event) -> batch index
+        self._batch_timer: Optional[asyncio.Task] = None
+        self.frames_sent = 0
+        self.messages_coalesced = 0
+
+        # Dropped links are reopened with backoff; the relay resumes our
+        # session from last_seen_id (the last direct message we got), then
+        # the hello, event subscriptions and unanswered requests are sent again
+        self.auto_reconnect = True
+        self.session_token: Optional[str] = None
+        self.last_seen_id: Optional[str] = None
+        self.subscriptions: Set[str] = set()
+        self._said_hello = False
+        self._in_flight: Dict[str, AgentMessage] = {}
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def relay_url(self) -> str:
+        """Get the relay URL, or this agent's worker in a sharded relay."""
+        workers = [u.strip() for u in self.settings.relay.cluster_urls.split(",") if u.strip()]
+        if not workers:
+            return self.settings.relay.url
+        return workers[HashRing(range(len(workers))).node_for(self.agent_id)]
 
     async def connect(self) -> bool:
         """Connect to the relay server."""
         try:
-            self.websocket = await websockets.connect(
-                f"{self.settings.relay.url}/ws/{self.agent_id}"
-            )
-            self.connected = True
-
-            # Start receiving messages
-            self._receive_task = asyncio.create_task(self._receive_loop())
-
-            # Send hello message
-            hello = create_hello_message(self.agent_id, self.user_name)
-            await self.send(hello)
-
-            return True
+            await self._open()
         except Exception as e:
             print(f"Failed to connect to relay: {e}")
             self.connected = False
             return False
+        self.auto_reconnect = True
+
+        # Send hello message
+        self._said_hello = True
+        await self._send_hello()
+
+        return True
+
+    async def _send_hello(self):
+        await self.send(create_hello_message(self.agent_id, self.user_name))
+
+    async def _open(self):
+        """Open the websocket and start receiving, resuming our session if any."""
+        params = {"session": self.session_token or "new"}
+        offered = [c for c in self.settings.relay.codecs.split(",") if c.strip() in CODECS]
+        if offered:
+            params["codecs"] = ",".join(offered)
+        if self.last_seen_id:
+            params["last_seen"] = self.last_seen_id
+        self.codec = JSON_CODEC
+        self.websocket = await websockets.connect(f"{self.relay_url()}/ws/{self.agent_id}?{urlencode(params)}")
+        self.connected = True
+
+        # Start receiving messages
+        self._receive_task = asyncio.create_task(self._receive_loop())
+        self._stop_heartbeat()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        """Ping the relay while idle so it doesn't reap us as stale."""
+        while self.connected:
+            await asyncio.sleep(self.settings.relay.heartbeat_interval)
+            await self.ping()
+
+    def _stop_heartbeat(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    def _link_lost(self):
+        """Start reconnecting, or fail waiting requests if we won't."""
+        self.connected = False
+        self._stop_heartbeat()
+        if not self.auto_reconnect:
+            self._fail_pending("Connection to relay lost")
+        elif self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        """Reopen the link with exponential backoff, then restore our state.
+
+        The relay forgets a dropped agent's hello and subscriptions, so
+        both are sent again before the unanswered requests.
+
+        Requests still waiting after reconnect_grace fail instead of running
+        out their full timeout; new requests fail while the link is down.
+        """
+        config = self.settings.relay
+        delay = config.reconnect_initial_delay
+        grace_ends = time.monotonic() + config.reconnect_grace
+        while self.auto_reconnect:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                await self._open()
+            except Exception:
+                if time.monotonic() >= grace_ends:
+                    self._fail_pending("Relay unreachable")
+                delay = min(delay * 2, config.reconnect_interval)
+                continue
+            self.reconnects += 1
+            if self._said_hello:
+                await self._send_hello()
+            for event_id in list(self.subscriptions):
+                await self._send_command({"cmd": "subscribe", "event_id": event_id})
+            for message in list(self._in_flight.values()):
+                await self.send(message)
+            return
+
+    def _fail_pending(self, reason: str):
+        for future in self.pending_responses.values():
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+        for inbox in set(self._gathering.values()):
+            inbox.put_nowait(ConnectionError(reason))
 
     async def disconnect(self):
         """Disconnect from the relay server."""
+        if self.connected:
+            await self.flush()
         self.connected = False
+        self.auto_reconnect = False
+        self.subscriptions.clear()
+        self._stop_heartbeat()
+
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
 
         if self._receive_task:
             self._receive_task.cancel()
@@ -70,14 +216,82 @@ class Messenger:
         if self.websocket:
             await self.websocket.close()
             self.websocket = None
+        self._fail_pending("Disconnected from relay")
 
     async def send(self, message: AgentMessage) -> bool:
-        """Send a message through the relay."""
+        """Send a message through the relay.
+
+        With batching on, the message is queued and True means it was
+        accepted; it goes out within batch_window. If that batch can't be
+        sent, a send_and_wait or gather_responses waiting on the message
+        fails then.
+        """
         if not self.connected or not self.websocket:
             return False
 
+        if self.batch_window <= 0:
+            return await self._send_frame(message.to_wire())
+
+        self._add_to_batch(message)
+        if self._batch_size >= self.batch_max:
+            return await self.flush()
+        if self._batch_timer is None:
+            self._batch_timer = asyncio.create_task(self._flush_after_window())
+        return True
+
+    def _add_to_batch(self, message: AgentMessage):
+        """Queue a message, replacing an EVENT_UPDATE it supersedes."""
+        if message.type == MessageType.EVENT_UPDATE and not message.requires_response:
+            key = (message.recipient_agent_id, message.event_id)
+            previous = self._pending_updates.get(key)
+            if previous is not None:
+                # Later messages keep their place after the ones queued before
+                self._batch[previous] = None
+                self._batch_size -= 1
+                self.messages_coalesced += 1
+            self._pending_updates[key] = len(self._batch)
+        self._batch.append(message.to_wire())
+        self._batch_size += 1
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.batch_window)
+        self._batch_timer = None
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Send batched messages now."""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        wires = [wire for wire in self._batch if wire is not None]
+        self._batch = []
+        self._batch_size = 0
+        self._pending_updates.clear()
+
+        if not wires:
+            return True
+        frame = wires[0] if len(wires) == 1 else {"cmd": "batch", "messages": wires}
+        if await self._send_frame(frame):
+            return True
+        self._fail_unsent(wires)
+        return False
+
+    def _fail_unsent(self, wires: List[dict]):
+        """Fail the requests waiting on batched messages that were never sent."""
+        for wire in wires:
+            future = self.pending_responses.get(wire["id"])
+            if future is not None and not future.done():
+                future.set_exception(ConnectionError("Batch could not be sent"))
+            inbox = self._gathering.get(wire["id"])
+            if inbox is not None:
+                inbox.put_nowait(create_error_message(
+                    "relay", self.agent_id, "NOT_SENT", "Batch could not be sent", reply_to=wire["id"],
+                ))
+
+    async def _send_frame(self, data: dict) -> bool:
         try:
-            await self.websocket.send(json.dumps(message.to_wire()))
+            await self.websocket.send(self.codec.encode(data))
+            self.frames_sent += 1
             return True
         except Exception as e:
             print(f"Failed to send message: {e}")
@@ -95,10 +309,12 @@ class Messenger:
         # Create a future for the response
         future = asyncio.get_event_loop().create_future()
         self.pending_responses[message.id] = future
+        self._in_flight[message.id] = message
 
-        # Send the message
-        if not await self.send(message):
+        # Send the message; if a batch flush already failed it, the wait below says so
+        if not await self.send(message) and not future.done():
             del self.pending_responses[message.id]
+            del self._in_flight[message.id]
             return None
 
         try:
@@ -108,19 +324,124 @@ class Messenger:
         except asyncio.TimeoutError:
             print(f"Timeout waiting for response to {message.id}")
             return None
+        except ConnectionError as e:
+            print(f"No response to {message.id}: {e}")
+            return None
         finally:
             self.pending_responses.pop(message.id, None)
+            self._in_flight.pop(message.id, None)
+
+    async def gather_responses(
+        self,
+        messages: List[AgentMessage],
+        quorum: Optional[int] = None,
+        deadline: float = 60.0,
+    ) -> GatherResult:
+        """Send requests all at once and collect the replies as they arrive.
+
+        Returns when quorum agents have answered (all of them if quorum is
+        None), when every request is answered or has failed, or after
+        deadline seconds, whichever comes first. Send at most one request
+        per agent. A request to "event:<id>" goes to every subscriber; the
+        relay's fanout ack tells us whom to wait for.
+        """
+        started = time.monotonic()
+        inbox: asyncio.Queue = asyncio.Queue()
+        targets: Dict[str, str] = {}  # request_id -> recipient of a direct request
+        acks_due: Dict[str, int] = {}  # event request_id -> fanout acks still expected
+        waiting: Dict[str, str] = {}  # agent_id -> request_id not answered yet
+        replies: Dict[str, GatheredReply] = {}
+
+        def answered() -> int:
+            return sum(1 for reply in replies.values() if reply.error is None)
+
+        for message in messages:
+            message.requires_response = True
+            self._gathering[message.id] = inbox
+            self._in_flight[message.id] = message
+            if message.recipient_agent_id.startswith("event:"):
+                acks_due[message.id] = 1
+            else:
+                targets[message.id] = message.recipient_agent_id
+                waiting[message.recipient_agent_id] = message.id
+
+        try:
+            for message in messages:
+                if await self.send(message):
+                    continue
+                acks_due.pop(message.id, None)
+                if message.id in targets:
+                    del waiting[message.recipient_agent_id]
+                    replies[message.recipient_agent_id] = GatheredReply(
+                        message.recipient_agent_id, message.id, None, None, "NOT_SENT",
+                    )
+
+            while waiting or acks_due:
+                if quorum is not None and answered() >= quorum:
+                    break
+                remaining = deadline - (time.monotonic() - started)
+                try:
+                    item = await asyncio.wait_for(inbox.get(), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(item, Exception):
+                    break
+
+                if isinstance(item, dict):
+                    # Fanout ack for an event request
+                    request_id = item["reply_to"]
+                    if request_id in acks_due:
+                        acks_due[request_id] += item.get("more", 0) - 1
+                        if acks_due[request_id] <= 0:
+                            del acks_due[request_id]
+                    for agent_id in item["recipients"]:
+                        if agent_id not in replies:
+                            waiting.setdefault(agent_id, request_id)
+                    continue
+
+                if item.type == MessageType.ERROR and item.sender_agent_id == "relay":
+                    agent_id = targets.get(item.reply_to)
+                    error = item.payload.get("error_code", "ERROR")
+                else:
+                    agent_id = item.sender_agent_id
+                    error = None
+                if agent_id is None or agent_id in replies:
+                    continue
+                replies[agent_id] = GatheredReply(
+                    agent_id, item.reply_to, item, time.monotonic() - started, error,
+                )
+                waiting.pop(agent_id, None)
+        finally:
+            for message in messages:
+                self._gathering.pop(message.id, None)
+                self._in_flight.pop(message.id, None)
+
+        for agent_id, request_id in waiting.items():
+            replies[agent_id] = GatheredReply(agent_id, request_id, None, None)
+        needed = quorum if quorum is not None else len(replies)
+        return GatherResult(replies, answered() >= needed, time.monotonic() - started)
 
     async def _receive_loop(self):
         """Background loop for receiving messages."""
         while self.connected and self.websocket:
             try:
                 raw = await self.websocket.recv()
-                data = json.loads(raw)
+                data = codec_for_frame(raw).decode(raw)
 
                 # Handle system messages
                 if "cmd" in data:
-                    if data["cmd"] == "pong":
+                    if data["cmd"] == "codec":
+                        self.codec = CODECS.get(data["codec"], JSON_CODEC)
+                        continue
+                    elif data["cmd"] == "session":
+                        self.session_token = data["session"]
+                        continue
+                    elif data["cmd"] == "fanout":
+                        inbox = self._gathering.get(data.get("reply_to"))
+                        if inbox is not None:
+                            inbox.put_nowait(data)
+                        continue
+                    elif data["cmd"] == "pong":
                         continue
                     elif data.get("type") == "agent_connected":
                         print(f"Agent connected: {data.get('agent_id')}")
@@ -134,17 +455,27 @@ class Messenger:
                     message = AgentMessage.from_wire(data)
                 except Exception:
                     continue
+                # The relay only keeps direct messages for replay
+                if message.recipient_agent_id == self.agent_id:
+                    self.last_seen_id = message.id
+
+                # Replies to a gather_responses call go to its inbox
+                if message.reply_to and message.reply_to in self._gathering:
+                    self._gathering[message.reply_to].put_nowait(message)
+                    continue
 
                 # Check if this is a response to a pending request
                 if message.reply_to and message.reply_to in self.pending_responses:
-                    self.pending_responses[message.reply_to].set_result(message)
+                    future = self.pending_responses[message.reply_to]
+                    if not future.done():
+                        future.set_result(message)
                     continue
 
                 # Call registered handlers
                 await self._handle_message(message)
 
             except ConnectionClosed:
-                self.connected = False
+                self._link_lost()
                 break
             except asyncio.CancelledError:
                 break
@@ -179,28 +510,26 @@ class Messenger:
 
     async def subscribe_to_event(self, event_id: str) -> bool:
         """Subscribe to updates for an event."""
-        if not self.connected or not self.websocket:
-            return False
-
-        try:
-            await self.websocket.send(json.dumps({
-                "cmd": "subscribe",
-                "event_id": event_id,
-            }))
-            return True
-        except Exception:
+        if not await self._send_command({"cmd": "subscribe", "event_id": event_id}):
             return False
+        self.subscriptions.add(event_id)
+        return True
 
     async def unsubscribe_from_event(self, event_id: str) -> bool:
         """Unsubscribe from event updates."""
+        if not await self._send_command({"cmd": "unsubscribe", "event_id": event_id}):
+            return False
+        self.subscriptions.discard(event_id)
+        return True
+
+    async def _send_command(self, command: dict) -> bool:
+        """Send a relay command after any batched messages."""
         if not self.connected or not self.websocket:
             return False
 
         try:
-            await self.websocket.send(json.dumps({
-                "cmd": "unsubscribe",
-                "event_id": event_id,
-            }))
+            await self.flush()
+            await self.websocket.send(self.codec.encode(command))
             return True
         except Exception:
             return False
@@ -211,7 +540,7 @@ class Messenger:
             return False
 
         try:
-            await self.websocket.send(json.dumps({"cmd": "ping"}))
+            await self.websocket.send(self.codec.encode({"cmd": "ping"}))
             return True
         except Exception:
             return False
@@ -241,6 +570,24 @@ class Messenger:
             return response.payload
         return None
 
+    async def gather_availability(
+        self,
+        recipient_ids: List[str],
+        event_id: str,
+        start_date: str,
+        end_date: str,
+        event_type: str,
+        quorum: Optional[int] = None,
+        deadline: float = 60.0,
+    ) -> GatherResult:
+        """Query several agents for availability in one round trip."""
+        return await self.gather_responses([
+            create_availability_query(
+                self.agent_id, recipient_id, event_id, start_date, end_date, event_type,
+            )
+            for recipient_id in recipient_ids
+        ], quorum=quorum, deadline=deadline)
+
     async def send_availability(
         self,
         recipient_id: str,
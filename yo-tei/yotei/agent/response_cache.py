@@ -0,0 +1,182 @@
+"""Response cache for DeepSeek calls."""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+import aiosqlite
+
+from ..config.settings import get_settings
+from ..db.local import get_db_path
+
+
+def get_cache_path() -> Path:
+    """Get the persistent cache file path (next to the main database)."""
+    return get_db_path().with_name("llm_cache.db")
+
+
+class ResponseCache:
+    """Content-addressed cache of parsed DeepSeek responses.
+
+    Entries live in memory with LRU eviction and expire after ``ttl_seconds``.
+    With a ``db_path`` they are also written to SQLite so they survive
+    restarts of the agent.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        db_path: Optional[Path] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()  # key -> (json, expires_at, tokens)
+        self._connection: Optional[aiosqlite.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, system_prompt: str, prompt: str) -> str:
+        """Hash the inputs that determine a response."""
+        material = json.dumps([model, temperature, system_prompt, prompt], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def connect(self):
+        """Open the persistent store, if one is configured."""
+        if self.db_path is None or self._connection is not None:
+            return
+        self._connection = await aiosqlite.connect(self.db_path)
+        await self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        await self._connection.execute("""
+            CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires_at)
+        """)
+        await self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        await self._connection.commit()
+
+    async def close(self):
+        """Close the persistent store."""
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+
+    def _remember(self, key: str, data: str, expires_at: float, tokens: int):
+        self._entries[key] = (data, expires_at, tokens)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Get a cached response, or None on a miss."""
+        now = time.time()
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[1] <= now:
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self._connection is not None:
+            async with self._connection.execute(
+                "SELECT data, expires_at, tokens FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row:
+                entry = (row[0], row[1], row[2])
+                self._remember(key, *entry)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.tokens_saved += entry[2]
+        return json.loads(entry[0])
+
+    async def set(self, key: str, response: dict, tokens: int = 0):
+        """Store a response; ``tokens`` is what the call cost, for stats."""
+        if self.ttl_seconds <= 0:
+            return
+        data = json.dumps(response)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, data, expires_at, tokens)
+
+        if self._connection is not None:
+            # Prune expired rows as we go so the file doesn't grow between restarts
+            await self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            await self._connection.execute("""
+                INSERT OR REPLACE INTO responses (key, data, tokens, expires_at)
+                VALUES (?, ?, ?, ?)
+            """, (key, data, tokens, expires_at))
+            await self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and the tokens hits have saved."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+            "entries": len(self._entries),
+        }
+
+
+# Singleton instance, and the lock (per event loop) that guards creating it
+_cache: Optional[ResponseCache] = None
+_cache_lock: Optional[asyncio.Lock] = None
+_cache_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_cache_lock() -> asyncio.Lock:
+    global _cache_lock, _cache_lock_loop
+    loop = asyncio.get_running_loop()
+    if _cache_lock is None or _cache_lock_loop is not loop:
+        _cache_lock = asyncio.Lock()
+        _cache_lock_loop = loop
+    return _cache_lock
+
+
+async def get_response_cache() -> ResponseCache:
+    """Get the response cache singleton, configured from settings."""
+    global _cache
+    if _cache is not None:
+        return _cache
+    async with _get_cache_lock():
+        # Concurrent first callers wait here and share one connected cache
+        if _cache is None:
+            config = get_settings().deepseek
+            cache = ResponseCache(
+                max_entries=config.cache_max_entries,
+                ttl_seconds=config.cache_ttl_seconds,
+                db_path=get_cache_path() if config.cache_persist else None,
+            )
+            await cache.connect()
+            _cache = cache
+    return _cache
+
+
+def response_cache_stats() -> Optional[Dict[str, int]]:
+    """Stats of the response cache singleton, or None if it isn't in use."""
+    return _cache.stats() if _cache is not None else None
+
+
+async def close_response_cache() -> None:
+    """Close the response cache."""
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
@@ -1,7 +1,8 @@
 """Scheduling logic for Yo-tei agents."""
 
+import heapq
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, NamedTuple, Sequence
 from ..models.schedule import Schedule, TimeSlot, find_common_availability
 from ..models.event import Event, EventType
 
@@ -31,6 +32,35 @@ EVENT_PREFERRED_TIMES = {
 }
 
 
+# Hours that get a bonus for specific event types when ranking slots
+EVENT_BONUS_HOURS = {
+    EventType.DINNER: (18, 20),
+    EventType.OUTDOOR: (10, 14),
+    EventType.GAME_NIGHT: (19, 20),
+}
+
+
+class PreferenceCounts(NamedTuple):
+    """Participant preferences aggregated for slot ranking."""
+
+    early_birds: int = 0
+    night_owls: int = 0
+    budget_conscious: int = 0
+
+
+def aggregate_preferences(preferences: Dict[str, dict]) -> PreferenceCounts:
+    """Count how many participants have each timing preference."""
+    early_birds = night_owls = budget_conscious = 0
+    for prefs in preferences.values():
+        if prefs.get("early_bird"):
+            early_birds += 1
+        if prefs.get("night_owl"):
+            night_owls += 1
+        if prefs.get("budget_conscious"):
+            budget_conscious += 1
+    return PreferenceCounts(early_birds, night_owls, budget_conscious)
+
+
 class Scheduler:
     """Schedule coordination for events."""
 
@@ -41,6 +71,10 @@ class Scheduler:
         """Add a participant's schedule."""
         self.schedules[user_id] = schedule
 
+    def clear_schedules(self):
+        """Remove all participants' schedules."""
+        self.schedules.clear()
+
     def find_common_slots(
         self,
         event_type: EventType,
@@ -84,57 +118,76 @@ class Scheduler:
         slots: List[TimeSlot],
         event_type: EventType,
         preferences: Dict[str, dict],
+        top_k: Optional[int] = None,
     ) -> List[Tuple[TimeSlot, float]]:
         """Rank time slots by desirability."""
 
-        ranked = []
+        ranked = self.rank_slot_columns(
+            [slot.start.hour for slot in slots],
+            [slot.start.weekday() for slot in slots],
+            [slot.duration_hours for slot in slots],
+            event_type,
+            aggregate_preferences(preferences),
+            top_k=top_k,
+        )
+        return [(slots[index], score) for index, score in ranked]
 
-        for slot in slots:
+    def rank_slot_columns(
+        self,
+        hours: Sequence[int],
+        weekdays: Sequence[int],
+        durations: Sequence[float],
+        event_type: EventType,
+        counts: PreferenceCounts,
+        top_k: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Score slots given as columns and return (index, score), best first.
+
+        A slot's score only depends on its start hour, whether it falls on a
+        weekend and whether it lasts 4+ hours, so participant preferences are
+        folded into a 24-entry table once and each slot is a table lookup.
+        With ``top_k`` only the best slots are selected, without a full sort.
+        """
+
+        hour_scores = []
+        bonus_hours = EVENT_BONUS_HOURS.get(event_type)
+        for hour in range(24):
             score = 100.0  # Start with perfect score
 
-            # Prefer weekends for social events
-            if slot.start.weekday() >= 5:
-                score += 10
-
             # Prefer not too early, not too late
-            hour = slot.start.hour
             if 10 <= hour <= 19:
                 score += 5
             elif hour < 9 or hour > 21:
                 score -= 10
 
-            # Prefer longer slots (more flexibility)
-            if slot.duration_hours >= 4:
-                score += 5
-
             # Event-specific preferences
-            if event_type == EventType.DINNER:
-                if 18 <= hour <= 20:
-                    score += 15
-            elif event_type == EventType.OUTDOOR:
-                if 10 <= hour <= 14:
-                    score += 15
-            elif event_type == EventType.GAME_NIGHT:
-                if 19 <= hour <= 20:
-                    score += 15
-
-            # Check against participant preferences
-            for user_id, prefs in preferences.items():
-                # Budget timing preference (e.g., lunch vs dinner prices)
-                if prefs.get("budget_conscious") and hour >= 18:
-                    score -= 5  # Dinner tends to be pricier
-
-                # Early bird vs night owl
-                if prefs.get("early_bird") and hour >= 20:
-                    score -= 10
-                elif prefs.get("night_owl") and hour <= 10:
-                    score -= 10
-
-            ranked.append((slot, score))
-
-        # Sort by score descending
-        ranked.sort(key=lambda x: x[1], reverse=True)
-        return ranked
+            if bonus_hours and bonus_hours[0] <= hour <= bonus_hours[1]:
+                score += 15
+
+            # Budget timing preference (e.g., lunch vs dinner prices)
+            if hour >= 18:
+                score -= 5 * counts.budget_conscious  # Dinner tends to be pricier
+
+            # Early bird vs night owl
+            if hour >= 20:
+                score -= 10 * counts.early_birds
+            elif hour <= 10:
+                score -= 10 * counts.night_owls
+
+            hour_scores.append(score)
+
+        # Prefer weekends for social events, and longer slots (more flexibility)
+        weekday_bonus = [0, 0, 0, 0, 0, 10, 10]
+        scores = [
+            hour_scores[hour] + weekday_bonus[weekday] + (5 if duration >= 4 else 0)
+            for hour, weekday, duration in zip(hours, weekdays, durations)
+        ]
+
+        if top_k is not None and top_k < len(scores):
+            order = heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__)
+        else:
+            order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        return [(index, scores[index]) for index in order]
 
     def suggest_date_range(
         self,
@@ -1,7 +1,9 @@
 """DeepSeek-powered social intelligence for Yo-tei."""
 
+import asyncio
 import json
-from typing import Optional, List, Dict, Any
+import random
+from typing import Optional, List, Dict, Set, Any
 from datetime import datetime
 import httpx
 
@@ -9,10 +11,14 @@ from ..config.settings import get_settings
 from ..models.event import Event, Proposal, Location, DateRange
 from ..models.friend import FriendRelationship
 from ..models.schedule import TimeSlot
+from .response_cache import ResponseCache, get_response_cache
 
 
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 
+# Responses worth retrying (rate limited or server-side errors)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
 # Social reasoning system prompt
 SOCIAL_SYSTEM_PROMPT = """You are a social coordination agent for event planning. Your role is to:
 
@@ -134,42 +140,185 @@ Respond with a JSON object:
 """
 
 
+# Shared HTTP client and concurrency limit for every SocialIntelligence
+# in this process. Both belong to the event loop that created them.
+_http_client: Optional[httpx.AsyncClient] = None
+_request_semaphore: Optional[asyncio.Semaphore] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_closing: Set[asyncio.Task] = set()  # Clients from a previous loop being closed
+
+
+def _http2_available() -> bool:
+    """Check whether httpx can speak HTTP/2 (needs the h2 package)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _close_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:
+        pass  # Its loop is gone; the sockets go with the client
+
+
+def _discard_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a client left behind by another event loop, on that loop if it still runs."""
+    if loop is not None and loop.is_running():
+        loop.call_soon_threadsafe(loop.create_task, _close_quietly(client))
+    else:
+        task = asyncio.get_running_loop().create_task(_close_quietly(client))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+def _check_pool_loop() -> None:
+    """Replace pooled objects that belong to a different event loop."""
+    global _http_client, _request_semaphore, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool_loop is not loop:
+        if _http_client is not None and not _http_client.is_closed:
+            _discard_client(_http_client, _pool_loop)
+        _http_client = None
+        _request_semaphore = None
+        _pool_loop = loop
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client, creating it on first use."""
+    global _http_client
+    _check_pool_loop()
+
+    if _http_client is None or _http_client.is_closed:
+        config = get_settings().deepseek
+        _http_client = httpx.AsyncClient(
+            timeout=config.timeout,
+            http2=config.http2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=config.max_concurrency,
+                max_keepalive_connections=config.max_concurrency,
+            ),
+        )
+
+    return _http_client
+
+
+def get_request_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent DeepSeek requests."""
+    global _request_semaphore
+    _check_pool_loop()
+
+    if _request_semaphore is None:
+        _request_semaphore = asyncio.Semaphore(get_settings().deepseek.max_concurrency)
+
+    return _request_semaphore
+
+
+async def close_http_client() -> None:
+    """Close the pooled HTTP client."""
+    global _http_client
+    _check_pool_loop()
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 class SocialIntelligence:
     """DeepSeek-powered social reasoning for event planning."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         settings = get_settings()
         self.api_key = api_key or settings.deepseek.api_key
         self.base_url = settings.deepseek.base_url
         self.model = settings.deepseek.model
         self.temperature = settings.deepseek.temperature
+        self.max_retries = settings.deepseek.max_retries
+        self.retry_backoff = settings.deepseek.retry_backoff
+        self.max_retry_delay = settings.deepseek.max_retry_delay
+        self._client = client  # Defaults to the shared pooled client
+        self.cache_enabled = settings.deepseek.cache_enabled
+        self._cache = cache  # Defaults to the shared response cache
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After up to max_retry_delay."""
+        delay = random.uniform(0, self.retry_backoff * (2 ** attempt))
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return min(delay, self.max_retry_delay)
+
+    async def _post(self, body: dict) -> httpx.Response:
+        """POST to the chat completions endpoint, retrying transient failures."""
+        client = self._client or get_http_client()
+        semaphore = get_request_semaphore()
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with semaphore:
+                    response = await client.post(
+                        f"{self.base_url}/chat/completions",
+                        headers={
+                            "Authorization": f"Bearer {self.api_key}",
+                            "Content-Type": "application/json",
+                        },
+                        json=body,
+                    )
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def _get_cache(self) -> Optional[ResponseCache]:
+        if self._cache is None and self.cache_enabled:
+            self._cache = await get_response_cache()
+        return self._cache
 
     async def _call_deepseek(self, prompt: str, system_prompt: str = SOCIAL_SYSTEM_PROMPT) -> dict:
         """Make a request to DeepSeek API."""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": self.temperature,
-                    "response_format": {"type": "json_object"},
-                },
-            )
-
-            if response.status_code != 200:
-                raise Exception(f"DeepSeek API error: {response.status_code} - {response.text}")
-
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            return json.loads(content)
+        cache = await self._get_cache()
+        if cache is not None:
+            cache_key = ResponseCache.make_key(self.model, self.temperature, system_prompt, prompt)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await self._post({
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"},
+        })
+
+        if response.status_code != 200:
+            raise Exception(f"DeepSeek API error: {response.status_code} - {response.text}")
+
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        result = json.loads(content)
+
+        if cache is not None:
+            tokens = (data.get("usage") or {}).get("total_tokens", 0)
+            await cache.set(cache_key, result, tokens=tokens)
+
+        return result
 
     async def create_proposal(
         self,
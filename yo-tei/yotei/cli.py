@@ -452,10 +452,10 @@ def events():
             await close_db()
             raise typer.Exit(1)
 
-        event_list = await db.get_user_events(user.id)
+        summaries = [s.to_display() for s in await db.get_user_event_summaries(user.id)]
         await close_db()
 
-        if not event_list:
+        if not summaries:
             console.print("\n[yellow]No events yet![/yellow]")
             console.print("Plan one with: [cyan]yotei plan \"Event name\"[/cyan]\n")
             return
@@ -467,8 +467,7 @@ def events():
         table.add_column("Date")
         table.add_column("Status", style="yellow")
 
-        for event in event_list:
-            summary = event.get_summary()
+        for summary in summaries:
             status_color = {
                 "planning": "yellow",
                 "proposed": "blue",
@@ -504,8 +503,7 @@ def status(title: str):
             await close_db()
             raise typer.Exit(1)
 
-        events_list = await db.get_user_events(user.id)
-        event = next((e for e in events_list if e.title.lower() == title.lower()), None)
+        event = await db.find_user_event(user.id, title)
         await close_db()
 
         if not event:
@@ -26,13 +26,57 @@ class DeepSeekConfig(BaseModel):
     model: str = "deepseek-chat"
     temperature: float = 0.7
     max_tokens: int = 2000
+    timeout: float = 60.0  # seconds per request
+    http2: bool = True  # Used when the h2 package is installed
+    max_concurrency: int = 8  # Concurrent requests per agent process
+    max_retries: int = 3  # Retries on 429/5xx and connection errors
+    retry_backoff: float = 0.5  # seconds, doubled on each retry
+    max_retry_delay: float = 30.0  # longest wait between retries, even if Retry-After asks for more
+    cache_enabled: bool = False  # Opt in to reusing responses to identical prompts
+    cache_max_entries: int = 512
+    cache_ttl_seconds: int = 3600
+    cache_persist: bool = False  # Also keep the cache in ~/.yotei/llm_cache.db
 
 
 class RelayConfig(BaseModel):
     """Relay server configuration."""
     url: str = "ws://localhost:8765"
-    reconnect_interval: int = 5  # seconds
-    heartbeat_interval: int = 30  # seconds
+    reconnect_interval: int = 5  # seconds; longest wait between reconnect attempts
+    reconnect_initial_delay: float = 0.1  # seconds before the first reconnect attempt; doubles each try
+    reconnect_grace: float = 5.0  # seconds pending requests wait for a reconnect before failing
+    heartbeat_interval: int = 30  # seconds between messenger pings
+    liveness_timeout: float = 90.0  # seconds without any frame before the relay drops an agent (0 = never)
+    reaper_interval: float = 1.0  # seconds between relay checks for silent agents
+    send_timeout: float = 5.0  # seconds a send may wait on a full queue before the recipient is evicted
+    outbound_queue_size: int = 256  # frames buffered per connection
+    direct_overflow: str = "block"  # "block" or "error" when a direct message finds the queue full
+    mailbox_enabled: bool = True  # Hold messages for offline agents until they expire
+    mailbox_max_messages: int = 500  # per agent; the oldest are dropped beyond this
+    mailbox_flush_batch: int = 100  # messages read per batch when an agent reconnects
+    message_log_capacity: int = 10000  # recent messages kept in memory for /messages
+    message_log_dir: Optional[str] = None  # also append the log to rotating files here
+    message_log_segment_bytes: int = 4_000_000
+    message_log_segments: int = 8  # rotated files kept
+    codecs: str = "msgpack,json"  # wire codecs to offer the relay, best first
+    batch_window_ms: float = 0.0  # > 0: messengers collect outgoing messages this long into one frame
+    batch_max_messages: int = 32  # send a batch early once it holds this many
+    session_ttl: float = 300.0  # seconds the relay keeps a disconnected agent's session
+    session_replay_size: int = 256  # recent direct messages per session, replayed on resume
+    cluster_urls: str = ""  # comma-separated worker URLs of a sharded relay, in worker order
+
+
+class AgentConfig(BaseModel):
+    """Agent coordination configuration."""
+    llm_evaluation: bool = False  # Evaluate proposals for participants with DeepSeek
+    max_concurrent_evaluations: int = 8
+    evaluation_timeout: float = 30.0  # seconds per participant
+    poll_interval: float = 60.0  # seconds between runner checks when nothing wakes it
+
+
+class StorageConfig(BaseModel):
+    """Local storage configuration."""
+    max_event_notes: int = 200  # Older agent notes move to the event history table
+    max_event_proposals: int = 20  # Older proposals move to the event history table
 
 
 class StripeConfig(BaseModel):
@@ -51,6 +95,8 @@ class Settings(BaseModel):
     # API configurations
     deepseek: DeepSeekConfig = Field(default_factory=DeepSeekConfig)
     relay: RelayConfig = Field(default_factory=RelayConfig)
+    agent: AgentConfig = Field(default_factory=AgentConfig)
+    storage: StorageConfig = Field(default_factory=StorageConfig)
     stripe: StripeConfig = Field(default_factory=StripeConfig)
 
     # App settings
@@ -1,15 +1,19 @@
 """SQLite database operations for Yo-tei."""
 
+import asyncio
+import hashlib
 import json
 import aiosqlite
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Callable, Tuple
 from datetime import datetime
 
 from ..models.user import User
 from ..models.friend import FriendRelationship, SocialGraph
-from ..models.event import Event
+from ..models.event import Event, EventSummary, AgentNote, Proposal
 from ..models.schedule import Schedule
+from ..config.settings import get_settings
 
 
 def get_db_path() -> Path:
@@ -19,17 +23,66 @@ def get_db_path() -> Path:
     return data_dir / "yotei.db"
 
 
+# Applied to every connection
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # Safe with WAL; skips an fsync per commit
+    "PRAGMA cache_size = -16000",  # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Event fields stored in their own columns so list views skip the JSON
+EVENT_COLUMNS = [
+    "title TEXT",
+    "event_type TEXT",
+    "start_at TEXT",
+    "end_at TEXT",
+    "location_name TEXT",
+    "current_proposal_id TEXT",
+    "consensus_reached INTEGER NOT NULL DEFAULT 0",
+]
+
+# Events a user created or takes part in (binds user_id twice; wrap in parentheses)
+USER_EVENTS_FILTER = """
+    creator_id = ? OR id IN (SELECT event_id FROM event_participants WHERE user_id = ?)
+"""
+
+
+def note_history_key(data: str) -> str:
+    """Identify an archived note by its content (notes have no id)."""
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
 class Database:
     """SQLite database for Yo-tei local storage."""
 
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_event_notes: Optional[int] = None,
+        max_event_proposals: Optional[int] = None,
+    ):
+        storage = get_settings().storage
         self.db_path = db_path or get_db_path()
+        self.max_event_notes = max_event_notes if max_event_notes is not None else storage.max_event_notes
+        self.max_event_proposals = (
+            max_event_proposals if max_event_proposals is not None else storage.max_event_proposals
+        )
         self._connection: Optional[aiosqlite.Connection] = None
+        self._change_listeners: List[Callable[[str, str], None]] = []
+        # One transaction at a time on the shared connection; only the task
+        # that holds it joins it, not tasks spawned inside the block
+        self._write_lock = asyncio.Lock()
+        self._transaction_owner: Optional[asyncio.Task] = None
+        self._pending_changes: List[Tuple[str, str]] = []
 
     async def connect(self):
         """Connect to the database."""
         self._connection = await aiosqlite.connect(self.db_path)
-        await self._create_tables()
+        for pragma in CONNECTION_PRAGMAS:
+            await self._connection.execute(pragma)
+        await self._migrate()
 
     async def close(self):
         """Close the database connection."""
@@ -37,6 +90,54 @@ class Database:
             await self._connection.close()
             self._connection = None
 
+    def add_change_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Call ``listener(table, key)`` after every committed write."""
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Stop notifying a change listener."""
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def _notify_change(self, table: str, key: str) -> None:
+        for listener in list(self._change_listeners):
+            listener(table, key)
+
+    def _record_change(self, table: str, key: str) -> None:
+        """Notify listeners of a write once the enclosing transaction commits."""
+        self._pending_changes.append((table, key))
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Group several saves into a single commit.
+
+        Every write runs in one. Nested blocks in the same task join the
+        outermost one; other tasks, including ones spawned inside the block,
+        wait until it commits or rolls back, so a rollback only ever discards
+        the owner's writes. Change listeners are notified once it commits;
+        nothing is notified if it rolls back.
+        """
+        task = asyncio.current_task()
+        if self._transaction_owner is task:
+            yield self
+            return
+
+        async with self._write_lock:
+            self._transaction_owner = task
+            try:
+                yield self
+            except BaseException:
+                await self._connection.rollback()
+                self._pending_changes.clear()
+                raise
+            else:
+                await self._connection.commit()
+                changes, self._pending_changes = self._pending_changes, []
+                for table, key in changes:
+                    self._notify_change(table, key)
+            finally:
+                self._transaction_owner = None
+
     async def _create_tables(self):
         """Create database tables if they don't exist."""
         async with self._connection.cursor() as cursor:
@@ -103,18 +204,120 @@ class Database:
                 )
             """)
 
-            await self._connection.commit()
+    async def _add_indexes(self):
+        """Index the columns used to look up events."""
+        async with self._connection.cursor() as cursor:
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_event_participants_user
+                ON event_participants (user_id)
+            """)
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_status
+                ON events (status, updated_at)
+            """)
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_creator
+                ON events (creator_id, updated_at)
+            """)
+
+    async def _add_event_columns(self):
+        """Split the fields list views need out of the event JSON."""
+        async with self._connection.cursor() as cursor:
+            for column in EVENT_COLUMNS:
+                await cursor.execute(f"ALTER TABLE events ADD COLUMN {column}")
+            await cursor.execute("ALTER TABLE event_participants ADD COLUMN user_name TEXT")
+            await cursor.execute("ALTER TABLE event_participants ADD COLUMN position INTEGER")
+
+            await cursor.execute("""
+                UPDATE events SET
+                    title = json_extract(data, '$.title'),
+                    event_type = json_extract(data, '$.event_type'),
+                    start_at = json_extract(data, '$.date_range.start'),
+                    end_at = json_extract(data, '$.date_range.end'),
+                    location_name = json_extract(data, '$.location.name'),
+                    current_proposal_id = json_extract(data, '$.current_proposal_id'),
+                    consensus_reached = json_extract(data, '$.consensus_reached')
+            """)
+            await cursor.execute("""
+                UPDATE event_participants SET (user_name, position) = (
+                    SELECT json_extract(p.value, '$.user_name'), p.key
+                    FROM events e, json_each(e.data, '$.participants') p
+                    WHERE e.id = event_participants.event_id
+                      AND json_extract(p.value, '$.user_id') = event_participants.user_id
+                )
+            """)
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_events_title
+                ON events (title COLLATE NOCASE)
+            """)
+
+    async def _add_event_history(self):
+        """Archive table for agent notes and proposals compacted out of events."""
+        async with self._connection.cursor() as cursor:
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS event_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            await cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_event_history_event
+                ON event_history (event_id, kind, id)
+            """)
+
+    async def _add_event_history_keys(self):
+        """Key archived items so saving an event loaded with its history archives nothing twice."""
+        async with self._connection.cursor() as cursor:
+            await cursor.execute("ALTER TABLE event_history ADD COLUMN item_key TEXT")
+            await cursor.execute("SELECT id, kind, data FROM event_history")
+            await cursor.executemany(
+                "UPDATE event_history SET item_key = ? WHERE id = ?",
+                [
+                    (json.loads(data)["id"] if kind == "proposal" else note_history_key(data), row_id)
+                    for row_id, kind, data in await cursor.fetchall()
+                ],
+            )
+            await cursor.execute("""
+                DELETE FROM event_history WHERE id NOT IN (
+                    SELECT MIN(id) FROM event_history GROUP BY event_id, kind, item_key
+                )
+            """)
+            await cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_event_history_item
+                ON event_history (event_id, kind, item_key)
+            """)
+
+    # Applied in order; PRAGMA user_version records how many have run.
+    # Only ever append to this list.
+    MIGRATIONS = [_create_tables, _add_indexes, _add_event_columns, _add_event_history, _add_event_history_keys]
+
+    async def _migrate(self):
+        """Bring the schema up to date."""
+        async with self._connection.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+
+        for number, migration in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            await self._connection.execute("BEGIN")
+            try:
+                await migration(self)
+                await self._connection.execute(f"PRAGMA user_version = {number}")
+                await self._connection.commit()
+            except Exception:
+                await self._connection.rollback()
+                raise
 
     # User operations
     async def save_user(self, user: User) -> None:
         """Save or update a user."""
         now = datetime.utcnow().isoformat()
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute("""
                 INSERT OR REPLACE INTO users (id, data, created_at, updated_at)
                 VALUES (?, ?, ?, ?)
             """, (user.id, user.model_dump_json(), user.created_at.isoformat(), now))
-            await self._connection.commit()
+            self._record_change("users", user.id)
 
     async def get_user(self, user_id: str) -> Optional[User]:
         """Get a user by ID."""
@@ -136,23 +339,38 @@ class Database:
 
     async def delete_user(self, user_id: str) -> None:
         """Delete a user and all related data."""
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
             await cursor.execute("DELETE FROM friends WHERE user_id = ?", (user_id,))
             await cursor.execute("DELETE FROM schedules WHERE user_id = ?", (user_id,))
             await cursor.execute("DELETE FROM group_dynamics WHERE user_id = ?", (user_id,))
-            await self._connection.commit()
+            self._record_change("users", user_id)
 
     # Friend operations
     async def save_friend(self, user_id: str, friend: FriendRelationship) -> None:
         """Save or update a friend relationship."""
         now = datetime.utcnow().isoformat()
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute("""
                 INSERT OR REPLACE INTO friends (user_id, friend_id, data, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?)
             """, (user_id, friend.friend_id, friend.model_dump_json(), friend.connected_at.isoformat(), now))
-            await self._connection.commit()
+            self._record_change("friends", friend.friend_id)
+
+    async def save_friends(self, user_id: str, friends: List[FriendRelationship]) -> None:
+        """Save or update many friend relationships in one commit."""
+        now = datetime.utcnow().isoformat()
+        async with self.transaction():
+            async with self._connection.cursor() as cursor:
+                await cursor.executemany("""
+                    INSERT OR REPLACE INTO friends (user_id, friend_id, data, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (user_id, friend.friend_id, friend.model_dump_json(), friend.connected_at.isoformat(), now)
+                    for friend in friends
+                ])
+            for friend in friends:
+                self._record_change("friends", friend.friend_id)
 
     async def get_friend(self, user_id: str, friend_id: str) -> Optional[FriendRelationship]:
         """Get a specific friend relationship."""
@@ -178,12 +396,12 @@ class Database:
 
     async def delete_friend(self, user_id: str, friend_id: str) -> None:
         """Delete a friend relationship."""
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute(
                 "DELETE FROM friends WHERE user_id = ? AND friend_id = ?",
                 (user_id, friend_id)
             )
-            await self._connection.commit()
+            self._record_change("friends", friend_id)
 
     async def get_friends_count(self, user_id: str) -> int:
         """Get the number of friends for a user."""
@@ -196,50 +414,136 @@ class Database:
             return row[0] if row else 0
 
     # Event operations
-    async def save_event(self, event: Event) -> None:
-        """Save or update an event."""
+    async def _write_events(self, cursor: aiosqlite.Cursor, events: List[Event], now: str) -> None:
+        """Write event rows and their participants (no commit).
+
+        Copies of the events are compacted, leaving the caller's objects
+        alone; trimmed notes and proposals go to event_history unless
+        already archived (an event loaded with include_history carries
+        them again).
+        """
+        archived = []
+        compacted = []
+        for event in events:
+            event = event.model_copy()  # compact_history rebinds the lists, so shallow is enough
+            notes, proposals = event.compact_history(self.max_event_notes, self.max_event_proposals)
+            for note in notes:
+                data = note.model_dump_json()
+                archived.append((event.id, "note", data, note_history_key(data)))
+            archived.extend(
+                (event.id, "proposal", proposal.model_dump_json(), proposal.id) for proposal in proposals
+            )
+            compacted.append(event)
+        events = compacted
+        if archived:
+            await cursor.executemany(
+                "INSERT OR IGNORE INTO event_history (event_id, kind, data, item_key) VALUES (?, ?, ?, ?)",
+                archived,
+            )
+
+        await cursor.executemany("""
+            INSERT OR REPLACE INTO events (
+                id, creator_id, data, status, created_at, updated_at,
+                title, event_type, start_at, end_at, location_name,
+                current_proposal_id, consensus_reached
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                event.id, event.creator_id, event.model_dump_json(), event.status.value,
+                event.created_at.isoformat(), now,
+                event.title,
+                event.event_type.value,
+                event.date_range.start.isoformat() if event.date_range else None,
+                event.date_range.end.isoformat() if event.date_range else None,
+                event.location.name if event.location else None,
+                event.current_proposal_id,
+                int(event.consensus_reached),
+            )
+            for event in events
+        ])
+
+        # Update participants
+        await cursor.executemany(
+            "DELETE FROM event_participants WHERE event_id = ?",
+            [(event.id,) for event in events],
+        )
+        await cursor.executemany(
+            "INSERT INTO event_participants (event_id, user_id, user_name, position) VALUES (?, ?, ?, ?)",
+            [
+                (event.id, participant.user_id, participant.user_name, position)
+                for event in events
+                for position, participant in enumerate(event.participants)
+            ],
+        )
+
+    async def save_event(self, event: Event) -> str:
+        """Save or update an event. Returns the stored updated_at watermark."""
         now = datetime.utcnow().isoformat()
-        async with self._connection.cursor() as cursor:
-            await cursor.execute("""
-                INSERT OR REPLACE INTO events (id, creator_id, data, status, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (event.id, event.creator_id, event.model_dump_json(), event.status.value, event.created_at.isoformat(), now))
-
-            # Update participants
-            await cursor.execute("DELETE FROM event_participants WHERE event_id = ?", (event.id,))
-            for participant in event.participants:
-                await cursor.execute(
-                    "INSERT INTO event_participants (event_id, user_id) VALUES (?, ?)",
-                    (event.id, participant.user_id)
-                )
+        async with self.transaction(), self._connection.cursor() as cursor:
+            await self._write_events(cursor, [event], now)
+            self._record_change("events", event.id)
 
-            await self._connection.commit()
+        return now
 
-    async def get_event(self, event_id: str) -> Optional[Event]:
-        """Get an event by ID."""
+    async def save_events(self, events: List[Event]) -> str:
+        """Save or update many events in one commit. Returns the watermark."""
+        now = datetime.utcnow().isoformat()
+        async with self.transaction():
+            async with self._connection.cursor() as cursor:
+                await self._write_events(cursor, events, now)
+            for event in events:
+                self._record_change("events", event.id)
+
+        return now
+
+    async def get_event(self, event_id: str, include_history: bool = False) -> Optional[Event]:
+        """Get an event by ID.
+
+        With include_history, archived notes and proposals are put back in
+        front of the event's own lists.
+        """
         async with self._connection.cursor() as cursor:
             await cursor.execute("SELECT data FROM events WHERE id = ?", (event_id,))
             row = await cursor.fetchone()
-            if row:
-                return Event.model_validate_json(row[0])
-        return None
+        if not row:
+            return None
+
+        event = Event.model_validate_json(row[0])
+        if include_history:
+            notes, proposals = await self.get_event_history(event_id)
+            event.agent_notes = notes + event.agent_notes
+            event.proposals = proposals + event.proposals
+        return event
+
+    async def get_event_history(self, event_id: str) -> Tuple[List[AgentNote], List[Proposal]]:
+        """Get the notes and proposals archived from an event, oldest first."""
+        notes: List[AgentNote] = []
+        proposals: List[Proposal] = []
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(
+                "SELECT kind, data FROM event_history WHERE event_id = ? ORDER BY id",
+                (event_id,),
+            )
+            for kind, data in await cursor.fetchall():
+                if kind == "note":
+                    notes.append(AgentNote.model_validate_json(data))
+                else:
+                    proposals.append(Proposal.model_validate_json(data))
+        return notes, proposals
 
     async def get_user_events(self, user_id: str, status: Optional[str] = None) -> List[Event]:
         """Get all events for a user (as creator or participant)."""
         events = []
         async with self._connection.cursor() as cursor:
-            query = """
-                SELECT DISTINCT e.data FROM events e
-                LEFT JOIN event_participants ep ON e.id = ep.event_id
-                WHERE e.creator_id = ? OR ep.user_id = ?
-            """
+            query = f"SELECT data FROM events WHERE ({USER_EVENTS_FILTER})"
             params = [user_id, user_id]
 
             if status:
-                query += " AND e.status = ?"
+                query += " AND status = ?"
                 params.append(status)
 
-            query += " ORDER BY e.updated_at DESC"
+            query += " ORDER BY updated_at DESC"
 
             await cursor.execute(query, params)
             rows = await cursor.fetchall()
@@ -247,27 +551,111 @@ class Database:
                 events.append(Event.model_validate_json(row[0]))
         return events
 
+    async def get_user_event_summaries(self, user_id: str, status: Optional[str] = None) -> List[EventSummary]:
+        """Get summaries of a user's events without parsing event bodies."""
+        async with self._connection.cursor() as cursor:
+            query = f"""
+                SELECT id, title, event_type, status, start_at, location_name, consensus_reached
+                FROM events WHERE ({USER_EVENTS_FILTER})
+            """
+            params = [user_id, user_id]
+
+            if status:
+                query += " AND status = ?"
+                params.append(status)
+
+            query += " ORDER BY updated_at DESC"
+
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+
+            participants: Dict[str, List[str]] = {row[0]: [] for row in rows}
+            if participants:
+                placeholders = ", ".join("?" for _ in participants)
+                await cursor.execute(f"""
+                    SELECT event_id, user_name FROM event_participants
+                    WHERE event_id IN ({placeholders})
+                    ORDER BY event_id, position
+                """, list(participants))
+                for event_id, user_name in await cursor.fetchall():
+                    participants[event_id].append(user_name)
+
+        return [
+            EventSummary(
+                id=event_id,
+                title=title,
+                event_type=event_type,
+                status=event_status,
+                participants=participants[event_id],
+                start=start_at,
+                location_name=location_name,
+                consensus_reached=bool(consensus_reached),
+            )
+            for event_id, title, event_type, event_status, start_at, location_name, consensus_reached in rows
+        ]
+
+    async def find_user_event(self, user_id: str, title: str) -> Optional[Event]:
+        """Find one of a user's events by title (case-insensitive)."""
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT data FROM events
+                WHERE title = ? COLLATE NOCASE AND ({USER_EVENTS_FILTER})
+                ORDER BY updated_at DESC
+                LIMIT 1
+            """, (title, user_id, user_id))
+            row = await cursor.fetchone()
+            if row:
+                return Event.model_validate_json(row[0])
+        return None
+
     async def get_active_events(self, user_id: str) -> List[Event]:
         """Get all active (planning/proposed/confirmed) events."""
-        return await self.get_user_events(user_id)
+        events = []
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT data FROM events
+                WHERE status IN ('planning', 'proposed', 'confirmed')
+                  AND ({USER_EVENTS_FILTER})
+                ORDER BY updated_at DESC
+            """, (user_id, user_id))
+            rows = await cursor.fetchall()
+            for row in rows:
+                events.append(Event.model_validate_json(row[0]))
+        return events
+
+    async def get_event_watermarks(self, user_id: str, status: str) -> Dict[str, str]:
+        """Get {event_id: updated_at} for a user's events in a status.
+
+        Only reads indexed columns, so callers can tell which events changed
+        without deserializing any of them.
+        """
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT id, updated_at FROM events
+                WHERE status = ?
+                  AND ({USER_EVENTS_FILTER})
+            """, (status, user_id, user_id))
+            rows = await cursor.fetchall()
+        return {row[0]: row[1] for row in rows}
 
     async def delete_event(self, event_id: str) -> None:
         """Delete an event."""
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
             await cursor.execute("DELETE FROM event_participants WHERE event_id = ?", (event_id,))
-            await self._connection.commit()
+            await cursor.execute("DELETE FROM event_history WHERE event_id = ?", (event_id,))
+            self._record_change("events", event_id)
 
     # Schedule operations
     async def save_schedule(self, schedule: Schedule) -> None:
         """Save or update a user's schedule."""
         now = datetime.utcnow().isoformat()
-        async with self._connection.cursor() as cursor:
+        async with self.transaction(), self._connection.cursor() as cursor:
             await cursor.execute("""
                 INSERT OR REPLACE INTO schedules (user_id, data, updated_at)
                 VALUES (?, ?, ?)
             """, (schedule.user_id, schedule.model_dump_json(), now))
-            await self._connection.commit()
+            self._record_change("schedules", schedule.user_id)
 
     async def get_schedule(self, user_id: str) -> Optional[Schedule]:
         """Get a user's schedule."""
@@ -2,7 +2,7 @@
 
 from .user import User, AvailabilityBlock, BudgetRange
 from .friend import FriendRelationship, GroupDynamic
-from .event import Event, Proposal, EventStatus, EventType
+from .event import Event, EventSummary, Proposal, EventStatus, EventType
 from .schedule import Schedule, TimeSlot
 
 __all__ = [
@@ -12,6 +12,7 @@ __all__ = [
     "FriendRelationship",
     "GroupDynamic",
     "Event",
+    "EventSummary",
     "Proposal",
     "EventStatus",
     "EventType",
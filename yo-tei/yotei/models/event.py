@@ -2,7 +2,7 @@
 
 from datetime import datetime, date
 from enum import Enum
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel, Field
 import shortuuid
 
@@ -98,6 +98,32 @@ class ParticipantStatus(BaseModel):
     last_response_at: Optional[datetime] = None
 
 
+class EventSummary(BaseModel):
+    """Lightweight projection of an event for list views."""
+
+    id: str
+    title: str
+    event_type: EventType
+    status: EventStatus
+    participants: List[str] = Field(default_factory=list)  # Participant names
+    start: Optional[datetime] = None
+    location_name: Optional[str] = None
+    consensus_reached: bool = False
+
+    def to_display(self) -> dict:
+        """Get the summary in the format shown by the CLI."""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "type": self.event_type.value,
+            "status": self.status.value,
+            "participants": self.participants,
+            "date": self.start.strftime("%b %d, %Y") if self.start else "TBD",
+            "location": self.location_name or "TBD",
+            "consensus": self.consensus_reached,
+        }
+
+
 class Event(BaseModel):
     """An event being planned by agents."""
 
@@ -187,15 +213,49 @@ class Event(BaseModel):
         self.updated_at = datetime.utcnow()
         return True
 
+    def compact_history(
+        self,
+        max_notes: int,
+        max_proposals: int,
+    ) -> Tuple[List[AgentNote], List[Proposal]]:
+        """Trim the oldest notes and proposals so the event stays bounded.
+
+        The current proposal is always kept. Returns what was removed, oldest
+        first, so it can be archived.
+        """
+        archived_notes: List[AgentNote] = []
+        if len(self.agent_notes) > max_notes:
+            cut = len(self.agent_notes) - max_notes
+            archived_notes = self.agent_notes[:cut]
+            self.agent_notes = self.agent_notes[cut:]
+
+        archived_proposals: List[Proposal] = []
+        excess = len(self.proposals) - max_proposals
+        if excess > 0:
+            kept = []
+            for proposal in self.proposals:
+                if excess > 0 and proposal.id != self.current_proposal_id:
+                    archived_proposals.append(proposal)
+                    excess -= 1
+                else:
+                    kept.append(proposal)
+            self.proposals = kept
+
+        return archived_notes, archived_proposals
+
+    def to_summary(self) -> EventSummary:
+        """Get the lightweight summary projection."""
+        return EventSummary(
+            id=self.id,
+            title=self.title,
+            event_type=self.event_type,
+            status=self.status,
+            participants=[p.user_name for p in self.participants],
+            start=self.date_range.start if self.date_range else None,
+            location_name=self.location.name if self.location else None,
+            consensus_reached=self.consensus_reached,
+        )
+
     def get_summary(self) -> dict:
         """Get a summary of the event for display."""
-        return {
-            "id": self.id,
-            "title": self.title,
-            "type": self.event_type.value,
-            "status": self.status.value,
-            "participants": [p.user_name for p in self.participants],
-            "date": self.date_range.start.strftime("%b %d, %Y") if self.date_range else "TBD",
-            "location": self.location.name if self.location else "TBD",
-            "consensus": self.consensus_reached,
-        }
+        return self.to_summary().to_display()
@@ -1,11 +1,27 @@
 """Schedule model for Yo-tei."""
 
+import math
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict
-from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 from .user import AvailabilityBlock, BlackoutDate
 
 
+MINUTES_PER_DAY = 24 * 60
+
+# Fields that feed into a schedule's compiled availability
+AVAILABILITY_FIELDS = frozenset({
+    "default_availability",
+    "blackout_dates",
+    "specific_availability",
+    "specific_busy",
+})
+
+# Number of compiled date windows and days kept per schedule
+MAX_COMPILED_WINDOWS = 16
+MAX_COMPILED_DAYS = 366
+
+
 class TimeSlot(BaseModel):
     """A specific time slot for scheduling."""
 
@@ -67,8 +83,67 @@ class Schedule(BaseModel):
     specific_availability: Dict[str, List[TimeSlot]] = Field(default_factory=dict)  # date_str -> slots
     specific_busy: Dict[str, List[TimeSlot]] = Field(default_factory=dict)  # date_str -> slots (private)
 
+    # Compiled availability for window queries, rebuilt when the fields
+    # above change. The fingerprint is checked once per window, not per day.
+    _day_cache: Dict[date, List[TimeSlot]] = PrivateAttr(default_factory=dict)
+    _bitmap_cache: Dict[Tuple[date, date], int] = PrivateAttr(default_factory=dict)
+    _cache_signature: Optional[tuple] = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in AVAILABILITY_FIELDS:
+            self.invalidate_availability_cache()
+
+    def invalidate_availability_cache(self) -> None:
+        """Drop compiled availability.
+
+        Changes to the availability fields, including slots edited in
+        place, are detected automatically; this just frees the memory.
+        """
+        self._day_cache.clear()
+        self._bitmap_cache.clear()
+        self._cache_signature = None
+
+    def _availability_signature(self) -> tuple:
+        """Content of the availability fields, to catch in-place edits."""
+        return (
+            tuple((b.day_of_week, b.start_hour, b.end_hour) for b in self.default_availability),
+            tuple((b.start_date, b.end_date) for b in self.blackout_dates),
+            tuple(
+                (date_str, tuple((slot.start, slot.end) for slot in slots))
+                for date_str, slots in self.specific_availability.items()
+            ),
+            tuple(
+                (date_str, tuple((slot.start, slot.end) for slot in slots))
+                for date_str, slots in self.specific_busy.items()
+            ),
+        )
+
+    def _validate_cache(self) -> None:
+        signature = self._availability_signature()
+        if signature != self._cache_signature:
+            self._day_cache.clear()
+            self._bitmap_cache.clear()
+            self._cache_signature = signature
+
     def get_availability_for_date(self, target_date: date) -> List[TimeSlot]:
         """Get available time slots for a specific date."""
+        # Building one day is as cheap as fingerprinting the schedule
+        return list(self._compute_availability_for_date(target_date))
+
+    def _compiled_day(self, target_date: date) -> List[TimeSlot]:
+        """A day's slots from the cache; call _validate_cache first."""
+        slots = self._day_cache.get(target_date)
+        if slots is None:
+            slots = self._compute_availability_for_date(target_date)
+            if len(self._day_cache) >= MAX_COMPILED_DAYS:
+                self._day_cache.pop(next(iter(self._day_cache)))
+            self._day_cache[target_date] = slots
+
+        return slots
+
+    def _compute_availability_for_date(self, target_date: date) -> List[TimeSlot]:
+        """Build available time slots for a specific date."""
         date_str = target_date.isoformat()
 
         # Check blackout dates
@@ -124,19 +199,107 @@ class Schedule(BaseModel):
 
         return result
 
+    def get_availability_minutes(
+        self,
+        start_date: date,
+        end_date: date,
+    ) -> List[Tuple[int, int]]:
+        """Get availability for a date range as merged minute offsets.
+
+        Offsets are minutes from midnight of ``start_date``. Overlapping and
+        back-to-back slots are merged, and the result is sorted. Mirrors
+        ``get_availability_for_date`` without building any ``TimeSlot``.
+        """
+        origin = datetime.combine(start_date, datetime.min.time())
+
+        def to_minutes(dt: datetime) -> int:
+            return int((dt - origin).total_seconds() // 60)
+
+        blocks_by_weekday: Dict[int, List[Tuple[int, int]]] = {}
+        for block in self.default_availability:
+            blocks_by_weekday.setdefault(block.day_of_week, []).append(
+                (block.start_hour * 60, block.end_hour * 60)
+            )
+
+        blackouts = [
+            (blackout.start_date.toordinal(), blackout.end_date.toordinal())
+            for blackout in self.blackout_dates
+        ]
+
+        intervals: List[Tuple[int, int]] = []
+        first_ordinal = start_date.toordinal()
+
+        for ordinal in range(first_ordinal, end_date.toordinal() + 1):
+            if any(first <= ordinal <= last for first, last in blackouts):
+                continue
+
+            current = date.fromordinal(ordinal)
+            date_str = current.isoformat()
+
+            if date_str in self.specific_availability:
+                intervals.extend(
+                    (to_minutes(slot.start), to_minutes(slot.end))
+                    for slot in self.specific_availability[date_str]
+                )
+                continue
+
+            blocks = blocks_by_weekday.get(current.weekday())
+            if not blocks:
+                continue
+
+            day_offset = (ordinal - first_ordinal) * MINUTES_PER_DAY
+            day_intervals = [(day_offset + start, day_offset + end) for start, end in blocks]
+
+            if date_str in self.specific_busy:
+                busy = sorted(
+                    (to_minutes(slot.start), to_minutes(slot.end))
+                    for slot in self.specific_busy[date_str]
+                )
+                day_intervals = _subtract_intervals(day_intervals, busy)
+
+            intervals.extend(day_intervals)
+
+        return _merge_intervals(intervals)
+
+    def availability_bitmap(self, start_date: date, end_date: date) -> int:
+        """Get availability for a date range as a minute bitmap.
+
+        Bit ``i`` is set when minute ``i`` after midnight of ``start_date`` is
+        free. The bitmap is compiled once per window and reused until the
+        schedule changes, so intersecting schedules is a bitwise AND.
+        """
+        self._validate_cache()
+
+        key = (start_date, end_date)
+        bitmap = self._bitmap_cache.get(key)
+        if bitmap is None:
+            window = ((end_date - start_date).days + 1) * MINUTES_PER_DAY
+            bitmap = 0
+            for start, end in self.get_availability_minutes(start_date, end_date):
+                start, end = max(start, 0), min(end, window)
+                if end > start:
+                    bitmap |= ((1 << (end - start)) - 1) << start
+
+            if len(self._bitmap_cache) >= MAX_COMPILED_WINDOWS:
+                self._bitmap_cache.pop(next(iter(self._bitmap_cache)))
+            self._bitmap_cache[key] = bitmap
+
+        return bitmap
+
     def get_availability_range(
         self,
         start_date: date,
         end_date: date
     ) -> Dict[str, List[TimeSlot]]:
         """Get availability for a date range."""
+        self._validate_cache()
         result = {}
         current = start_date
 
         while current <= end_date:
-            slots = self.get_availability_for_date(current)
+            slots = self._compiled_day(current)
             if slots:
-                result[current.isoformat()] = slots
+                result[current.isoformat()] = list(slots)
             current += timedelta(days=1)
 
         return result
@@ -158,49 +321,90 @@ class Schedule(BaseModel):
         }
 
 
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_intervals(
+    available: List[Tuple[int, int]],
+    busy: List[Tuple[int, int]],
+) -> List[Tuple[int, int]]:
+    """Remove sorted busy intervals from available intervals."""
+    result = []
+    for start, end in available:
+        for busy_start, busy_end in busy:
+            if busy_end <= start:
+                continue
+            if busy_start >= end:
+                break
+            if busy_start > start:
+                result.append((start, busy_start))
+            start = max(start, busy_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def bitmap_runs(bitmap: int, min_length: int = 0) -> List[Tuple[int, int]]:
+    """Split a minute bitmap into (start, end) runs of set bits."""
+    min_length = max(min_length, 1)
+    runs = []
+    starts = bitmap & ~(bitmap << 1)
+    ends = bitmap & ~(bitmap >> 1)
+
+    while starts:
+        start_bit = starts & -starts
+        end_bit = ends & -ends
+        start = start_bit.bit_length() - 1
+        end = end_bit.bit_length()
+        if end - start >= min_length:
+            runs.append((start, end))
+        starts ^= start_bit
+        ends ^= end_bit
+
+    return runs
+
+
 def find_common_availability(
     schedules: List[Schedule],
     start_date: date,
     end_date: date,
     min_duration_hours: float = 2.0
 ) -> List[TimeSlot]:
-    """Find time slots when all participants are available."""
+    """Find time slots when all participants are available.
+
+    Each schedule's compiled minute bitmap for the range is ANDed together;
+    ``TimeSlot`` objects are only built for the final results.
+    """
 
     if not schedules:
         return []
 
-    common_slots = []
-    current = start_date
-
-    while current <= end_date:
-        # Get each person's availability for this date
-        all_slots = [
-            schedule.get_availability_for_date(current)
-            for schedule in schedules
-        ]
-
-        # Find intersections
-        if all(slots for slots in all_slots):  # Everyone has some availability
-            # Start with first person's slots
-            intersections = all_slots[0]
-
-            for other_slots in all_slots[1:]:
-                new_intersections = []
-                for slot in intersections:
-                    for other in other_slots:
-                        if slot.overlaps(other):
-                            # Find the intersection
-                            inter_start = max(slot.start, other.start)
-                            inter_end = min(slot.end, other.end)
-                            if inter_end > inter_start:
-                                new_intersections.append(TimeSlot(start=inter_start, end=inter_end))
-                intersections = new_intersections
-
-            # Filter by minimum duration
-            for slot in intersections:
-                if slot.duration_hours >= min_duration_hours:
-                    common_slots.append(slot)
-
-        current += timedelta(days=1)
-
-    return common_slots
+    origin = datetime.combine(start_date, datetime.min.time())
+    min_minutes = math.ceil(min_duration_hours * 60)
+
+    common = schedules[0].availability_bitmap(start_date, end_date)
+    for schedule in schedules[1:]:
+        if not common:
+            return []
+        common &= schedule.availability_bitmap(start_date, end_date)
+
+    return [
+        TimeSlot(
+            start=origin + timedelta(minutes=start),
+            end=origin + timedelta(minutes=end),
+        )
+        for start, end in bitmap_runs(common, min_minutes)
+    ]
@@ -0,0 +1,422 @@
+"""Sharded relay: N worker processes with a consistent-hash agent directory.
+
+Each agent belongs to one worker, chosen by hashing its agent ID onto a
+ring of workers, and connects there (see ``HashRing.node_for``). Workers
+exchange messages over a local bus: Unix domain sockets between processes,
+or an in-memory broker when all workers share one event loop (tests).
+
+Bus packets:
+    direct     route a message to an agent owned by the receiving worker
+    broadcast  deliver a message to the receiving worker's agents
+    event      deliver a message to the receiving worker's event subscribers
+    system     deliver a system frame to the receiving worker's agents
+    fanout     pass an event request's recipient ack to its sender
+    interest   the sender worker gained or lost local subscribers of an event
+    hello      the sender worker started; reply with our interests
+"""
+
+import argparse
+import asyncio
+from abc import ABC, abstractmethod
+import json
+import multiprocessing
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import uvicorn
+
+from . import server
+from .hashring import HashRing
+from .protocol import AgentMessage, Envelope, create_error_message
+
+try:
+    import msgpack
+except ImportError:  # Bus packets fall back to JSON
+    msgpack = None
+
+
+PacketHandler = Callable[[dict], Awaitable[None]]
+
+
+class RelayBus(ABC):
+    """Carries packets between relay workers.
+
+    ``send`` never blocks: packets are queued per peer and written in order
+    by a background task.
+    """
+
+    def __init__(self, worker_id: int, workers: int):
+        self.worker_id = worker_id
+        self.peers = [w for w in range(workers) if w != worker_id]
+        self.packets_sent = 0
+        self.packets_received = 0
+
+    @abstractmethod
+    async def start(self, handler: PacketHandler):
+        """Start delivering received packets to handler."""
+
+    @abstractmethod
+    def send(self, peer: int, packet: dict):
+        """Queue a packet for a peer worker."""
+
+    def broadcast(self, packet: dict, peers: Optional[Iterable[int]] = None):
+        """Send a packet to every peer (or the given ones)."""
+        for peer in self.peers if peers is None else peers:
+            if peer != self.worker_id:
+                self.send(peer, packet)
+
+    @abstractmethod
+    async def close(self):
+        """Stop sending and receiving."""
+
+
+class InMemoryBroker:
+    """In-process stand-in for the bus transport, for tests and benchmarks."""
+
+    def __init__(self):
+        self.queues: Dict[int, asyncio.Queue] = {}
+
+    def bus(self, worker_id: int, workers: int) -> "InMemoryBus":
+        return InMemoryBus(self, worker_id, workers)
+
+
+class InMemoryBus(RelayBus):
+    """Bus endpoint backed by an InMemoryBroker."""
+
+    def __init__(self, broker: InMemoryBroker, worker_id: int, workers: int):
+        super().__init__(worker_id, workers)
+        self.broker = broker
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self, handler: PacketHandler):
+        queue = self.broker.queues.setdefault(self.worker_id, asyncio.Queue())
+
+        async def read_loop():
+            while True:
+                packet = await queue.get()
+                self.packets_received += 1
+                await handler(packet)
+
+        self._reader = asyncio.create_task(read_loop())
+
+    def send(self, peer: int, packet: dict):
+        self.broker.queues.setdefault(peer, asyncio.Queue()).put_nowait(packet)
+        self.packets_sent += 1
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+
+
+class UnixSocketBus(RelayBus):
+    """Bus over Unix domain sockets, one listening socket per worker.
+
+    Packets are length-prefixed (4 bytes, big-endian) msgpack, or JSON
+    without msgpack.
+    """
+
+    def __init__(self, socket_dir: Path, worker_id: int, workers: int):
+        super().__init__(worker_id, workers)
+        self.socket_dir = Path(socket_dir)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._writers: List[asyncio.Task] = []
+        self._incoming: Set[asyncio.StreamWriter] = set()
+
+    def socket_path(self, worker_id: int) -> Path:
+        return self.socket_dir / f"relay-{worker_id}.sock"
+
+    @staticmethod
+    def _encode(packet: dict) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(packet, use_bin_type=True)
+        return json.dumps(packet).encode("utf-8")
+
+    @staticmethod
+    def _decode(data: bytes) -> dict:
+        if msgpack is not None:
+            return msgpack.unpackb(data, raw=False)
+        return json.loads(data)
+
+    async def start(self, handler: PacketHandler):
+        async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            self._incoming.add(writer)
+            buffer = bytearray()
+            try:
+                # Read whatever has arrived and handle every whole packet in it,
+                # rather than two reads per packet
+                while data := await reader.read(1 << 16):
+                    buffer += data
+                    offset = 0
+                    while len(buffer) - offset >= 4:
+                        size = int.from_bytes(buffer[offset:offset + 4], "big")
+                        if len(buffer) - offset - 4 < size:
+                            break
+                        packet = self._decode(bytes(buffer[offset + 4:offset + 4 + size]))
+                        offset += 4 + size
+                        self.packets_received += 1
+                        await handler(packet)
+                    del buffer[:offset]
+            except ConnectionError:
+                pass
+            finally:
+                self._incoming.discard(writer)
+                writer.close()
+
+        path = self.socket_path(self.worker_id)
+        path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(serve, path=str(path))
+        for peer in self.peers:
+            self._queues[peer] = asyncio.Queue()
+            self._writers.append(asyncio.create_task(self._write_loop(peer)))
+
+    async def _connect(self, peer: int) -> asyncio.StreamWriter:
+        """Connect to a peer, waiting for it to come up."""
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(str(self.socket_path(peer)))
+                return writer
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.05)
+
+    async def _write_loop(self, peer: int):
+        queue = self._queues[peer]
+        writer: Optional[asyncio.StreamWriter] = None
+        while True:
+            packets = [await queue.get()]
+            while not queue.empty():
+                packets.append(queue.get_nowait())
+            frames = []
+            for packet in packets:
+                data = self._encode(packet)
+                frames += (len(data).to_bytes(4, "big"), data)
+            if writer is None:
+                writer = await self._connect(peer)
+            try:
+                # Everything queued goes out in one write
+                writer.write(b"".join(frames))
+                await writer.drain()
+            except (ConnectionError, OSError):
+                # Peer restarted; reconnect for the next packet
+                writer.close()
+                writer = None
+
+    def send(self, peer: int, packet: dict):
+        self._queues[peer].put_nowait(packet)
+        self.packets_sent += 1
+
+    async def close(self):
+        for task in self._writers:
+            task.cancel()
+        self._writers.clear()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self._incoming):
+            writer.close()
+        await asyncio.sleep(0)  # let readers see EOF and finish
+        self.socket_path(self.worker_id).unlink(missing_ok=True)
+
+
+class ClusterRelay(server.RelayServer):
+    """A RelayServer worker that shares agents and events with its peers.
+
+    Agents owned by other workers are reached over the bus; event broadcasts
+    go only to workers that have told us they have subscribers.
+    """
+
+    def __init__(self, worker_id: int, workers: int, bus: RelayBus, **kwargs):
+        super().__init__(**kwargs)
+        self.worker_id = worker_id
+        self.ring = HashRing(range(workers))
+        self.bus = bus
+        self.remote_interest: Dict[str, Set[int]] = {}  # event_id -> {worker_ids}
+
+    async def start(self):
+        await super().start()
+        await self.bus.start(self._on_packet)
+        self.bus.broadcast({"kind": "hello", "from": self.worker_id})
+
+    async def stop(self):
+        await self.bus.close()
+        await super().stop()
+
+    def owner(self, agent_id: str) -> int:
+        """Get the worker an agent belongs to."""
+        return self.ring.node_for(agent_id)
+
+    @staticmethod
+    def _packet(kind: str, envelope: Envelope, **fields) -> dict:
+        return {
+            "kind": kind,
+            "wire": envelope.wire,
+            **fields,
+        }
+
+    @staticmethod
+    def _envelope(packet: dict) -> Envelope:
+        return Envelope(packet["wire"])
+
+    async def _on_packet(self, packet: dict):
+        kind = packet["kind"]
+        if kind == "direct":
+            await server.RelayServer.route_to_agent(self, self._envelope(packet))
+        elif kind == "broadcast":
+            await server.RelayServer.broadcast(self, self._envelope(packet), set(packet["exclude"]))
+        elif kind == "event":
+            await server.RelayServer.broadcast_to_event(
+                self, packet["event_id"], self._envelope(packet), set(packet["exclude"]),
+            )
+        elif kind == "system":
+            await server.RelayServer.broadcast_system(self, packet["data"], set(packet["exclude"]))
+        elif kind == "fanout":
+            await self._send_ack(packet["sender"], packet["ack"])
+        elif kind == "interest":
+            workers = self.remote_interest.setdefault(packet["event_id"], set())
+            if packet["interested"]:
+                workers.add(packet["from"])
+            else:
+                workers.discard(packet["from"])
+                if not workers:
+                    del self.remote_interest[packet["event_id"]]
+        elif kind == "hello":
+            for event_id in self.event_subscriptions:
+                self.bus.send(packet["from"], self._interest(event_id, True))
+
+    def _interest(self, event_id: str, interested: bool) -> dict:
+        return {"kind": "interest", "from": self.worker_id, "event_id": event_id, "interested": interested}
+
+    # Routing
+
+    async def route_to_agent(self, message: Union[AgentMessage, Envelope]):
+        """Route locally, or to the worker that owns the recipient."""
+        envelope = Envelope.of(message)
+        recipient_id = envelope.header.recipient
+        owner = self.owner(recipient_id)
+        if owner == self.worker_id or recipient_id in self.connections:
+            await super().route_to_agent(envelope)
+        else:
+            self.bus.send(owner, self._packet("direct", envelope))
+
+    async def _reply_error(self, envelope: Envelope, error_code: str, error_message: str):
+        sender_id = envelope.header.sender
+        if sender_id in self.connections:
+            await super()._reply_error(envelope, error_code, error_message)
+        else:
+            await self.route_to_agent(create_error_message(
+                "relay", sender_id, error_code, error_message, reply_to=envelope.header.id,
+            ))
+
+    async def broadcast(self, message: Union[AgentMessage, Envelope], exclude: Set[str] = None):
+        envelope = Envelope.of(message)
+        exclude = exclude or set()
+        self.bus.broadcast(self._packet("broadcast", envelope, exclude=list(exclude)))
+        await super().broadcast(envelope, exclude)
+
+    async def broadcast_to_event(
+        self,
+        event_id: str,
+        message: Union[AgentMessage, Envelope],
+        exclude: Set[str] = None,
+    ):
+        envelope = Envelope.of(message)
+        exclude = exclude or set()
+        workers = self.remote_interest.get(event_id, set())
+        if workers:
+            self.bus.broadcast(
+                self._packet("event", envelope, event_id=event_id, exclude=list(exclude)), workers,
+            )
+        recipients = self._event_recipients(event_id, exclude)
+        if envelope.header.requires_response:
+            # Each interested worker acks its own recipients
+            await self._send_ack(envelope.header.sender, self._fanout_ack(envelope, recipients, len(workers)))
+        await self.fan_out(recipients, envelope, self.direct_overflow)
+
+    async def _announce_fanout(self, envelope: Envelope, recipients: List[str]):
+        sender_id = envelope.header.sender
+        if sender_id in self.connections:
+            await super()._announce_fanout(envelope, recipients)
+        else:
+            self.bus.send(self.owner(sender_id), {
+                "kind": "fanout", "sender": sender_id, "ack": self._fanout_ack(envelope, recipients),
+            })
+
+    async def broadcast_system(self, data: dict, exclude: Set[str] = None):
+        exclude = exclude or set()
+        self.bus.broadcast({"kind": "system", "data": data, "exclude": list(exclude)})
+        await super().broadcast_system(data, exclude)
+
+    # Subscriptions
+
+    def subscribe_to_event(self, agent_id: str, event_id: str):
+        first = event_id not in self.event_subscriptions
+        super().subscribe_to_event(agent_id, event_id)
+        if first:
+            self.bus.broadcast(self._interest(event_id, True))
+
+    def unsubscribe_from_event(self, agent_id: str, event_id: str):
+        super().unsubscribe_from_event(agent_id, event_id)
+        subscribers = self.event_subscriptions.get(event_id)
+        if subscribers is not None and not subscribers:
+            del self.event_subscriptions[event_id]
+            self.bus.broadcast(self._interest(event_id, False))
+
+    def _remove(self, agent_id: str, connection: Optional[server.AgentConnection] = None) -> bool:
+        current = self.connections.get(agent_id)
+        events = set(current.subscribed_events) if current is not None else set()
+        removed = super()._remove(agent_id, connection)
+        if removed:
+            for event_id in events - self.event_subscriptions.keys():
+                self.bus.broadcast(self._interest(event_id, False))
+        return removed
+
+    def get_agent_status(self, agent_id: str) -> Optional[dict]:
+        status = super().get_agent_status(agent_id)
+        if status is not None:
+            status["worker"] = self.worker_id
+        return status
+
+
+def run_worker(worker_id: int, workers: int, host: str, port: int, socket_dir: str):
+    """Run one relay worker process."""
+    server.relay = ClusterRelay(worker_id, workers, UnixSocketBus(Path(socket_dir), worker_id, workers))
+    uvicorn.run(server.app, host=host, port=port, log_level="warning")
+
+
+def run_cluster(
+    workers: int,
+    host: str = "0.0.0.0",
+    port: int = 8765,
+    socket_dir: Optional[str] = None,
+) -> List[multiprocessing.Process]:
+    """Start N relay workers on consecutive ports. Returns the processes.
+
+    Worker i listens on port + i; agents connect to the worker given by
+    HashRing(range(workers)).node_for(agent_id).
+    """
+    socket_dir = socket_dir or tempfile.mkdtemp(prefix="yotei-relay-")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(worker_id, workers, host, port + worker_id, socket_dir),
+            daemon=True,
+        )
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    return processes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a sharded Yo-tei relay")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket-dir")
+    args = parser.parse_args()
+    for process in run_cluster(args.workers, args.host, args.port, args.socket_dir):
+        process.join()
@@ -0,0 +1,45 @@
+"""Consistent hashing of agents onto relay workers."""
+
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes.
+
+    Each node gets ``replicas`` points on the ring so keys spread evenly and
+    adding or removing a node only moves about 1/N of them.
+    """
+
+    def __init__(self, nodes: Iterable[int] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, int] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, node: int):
+        """Add a node to the ring."""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}:{replica}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: int):
+        """Remove a node from the ring."""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}:{replica}")
+            if self._owners.pop(point, None) is not None:
+                self._points.remove(point)
+
+    def node_for(self, key: str) -> int:
+        """Get the node that owns a key."""
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
@@ -0,0 +1,133 @@
+"""Store-and-forward mailbox for agents that are offline."""
+
+import time
+from pathlib import Path
+from typing import Optional, List, Tuple, Union
+
+import aiosqlite
+
+from ..db.local import get_db_path
+from .protocol import AgentMessage, Envelope, JSON_CODEC
+
+
+def get_mailbox_path() -> Path:
+    """Get the mailbox file path (next to the main database)."""
+    return get_db_path().with_name("relay_mailbox.db")
+
+
+class Mailbox:
+    """Durable per-agent queue of messages waiting for their recipient.
+
+    Messages are kept until their ``response_timeout_seconds`` runs out. Each
+    agent holds at most ``max_per_agent`` messages; storing another drops the
+    oldest. Delivery is two-step (``fetch`` then ``ack``), so messages
+    survive if the recipient drops mid-flush.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, max_per_agent: int = 500):
+        self.db_path = db_path or get_mailbox_path()
+        self.max_per_agent = max_per_agent
+        self._connection: Optional[aiosqlite.Connection] = None
+
+        self.stored = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def connect(self):
+        """Open the mailbox store."""
+        if self._connection is not None:
+            return
+        self._connection = await aiosqlite.connect(self.db_path)
+        await self._connection.execute("PRAGMA journal_mode = WAL")
+        await self._connection.execute("PRAGMA synchronous = NORMAL")
+        await self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS mailbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT NOT NULL,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        await self._connection.execute("""
+            CREATE INDEX IF NOT EXISTS idx_mailbox_recipient
+            ON mailbox (recipient, seq)
+        """)
+        await self.purge_expired()
+
+    async def close(self):
+        """Close the mailbox store."""
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+
+    async def put(self, message: Union[AgentMessage, Envelope]) -> bool:
+        """Store a message (as JSON) for its offline recipient.
+
+        Returns False for messages that must not be stored (not shareable).
+        """
+        envelope = Envelope.of(message)
+        if not envelope.shareable:
+            return False
+
+        recipient = envelope.header.recipient
+        expires_at = time.time() + envelope.response_timeout_seconds
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO mailbox (recipient, data, expires_at) VALUES (?, ?, ?)",
+                (recipient, envelope.frame(JSON_CODEC), expires_at),
+            )
+            # Keep only the newest max_per_agent messages
+            await cursor.execute("""
+                DELETE FROM mailbox WHERE recipient = ? AND seq <= (
+                    SELECT seq FROM mailbox WHERE recipient = ?
+                    ORDER BY seq DESC LIMIT 1 OFFSET ?
+                )
+            """, (recipient, recipient, self.max_per_agent))
+            self.dropped += cursor.rowcount
+        await self._connection.commit()
+        self.stored += 1
+        return True
+
+    async def fetch(self, agent_id: str, limit: int = 100) -> List[Tuple[int, str]]:
+        """Get up to limit unexpired (seq, frame) pairs for an agent, oldest first."""
+        async with self._connection.execute("""
+            SELECT seq, data FROM mailbox
+            WHERE recipient = ? AND expires_at > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (agent_id, time.time(), limit)) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+    async def ack(self, agent_id: str, up_to_seq: int, count: int = 0):
+        """Remove an agent's messages up to and including up_to_seq."""
+        await self._connection.execute(
+            "DELETE FROM mailbox WHERE recipient = ? AND seq <= ?",
+            (agent_id, up_to_seq),
+        )
+        await self._connection.commit()
+        self.delivered += count
+
+    async def purge_expired(self) -> int:
+        """Delete expired messages. Returns how many were removed."""
+        async with self._connection.execute(
+            "DELETE FROM mailbox WHERE expires_at <= ?", (time.time(),)
+        ) as cursor:
+            removed = cursor.rowcount
+        await self._connection.commit()
+        return removed
+
+    async def pending(self, agent_id: str) -> int:
+        """Count unexpired messages waiting for an agent."""
+        async with self._connection.execute(
+            "SELECT COUNT(*) FROM mailbox WHERE recipient = ? AND expires_at > ?",
+            (agent_id, time.time()),
+        ) as cursor:
+            return (await cursor.fetchone())[0]
+
+    def stats(self) -> dict:
+        """Stored/delivered/dropped counters."""
+        return {
+            "stored": self.stored,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,171 @@
+"""Bounded log of relayed message metadata."""
+
+import json
+from collections import deque
+from pathlib import Path
+from typing import Optional, List, Dict, Deque, NamedTuple, TextIO
+
+from .protocol import AgentMessage, RoutingHeader
+
+
+class LogEntry(NamedTuple):
+    """Metadata of one relayed message (never the payload)."""
+
+    id: str
+    type: str
+    sender: str
+    recipient: str
+    event_id: Optional[str]
+    timestamp: str  # ISO format, so strings compare in time order
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+class MessageLog:
+    """Ring buffer of recent shareable messages, indexed by event and sender.
+
+    Holds at most ``capacity`` entries; the oldest are forgotten first. With
+    a ``log_dir`` every entry is also appended to JSON-lines segment files
+    that rotate at ``segment_max_bytes``, keeping the newest ``max_segments``.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        log_dir: Optional[Path] = None,
+        segment_max_bytes: int = 4_000_000,
+        max_segments: int = 8,
+    ):
+        self.capacity = capacity
+        self._entries: Deque[LogEntry] = deque()
+        self._by_event: Dict[str, Deque[LogEntry]] = {}
+        self._by_sender: Dict[str, Deque[LogEntry]] = {}
+        self.total_logged = 0
+
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self._segment: Optional[TextIO] = None
+        self._segment_number = 0
+        if log_dir is not None:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            existing = self._segment_paths()
+            if existing:
+                self._segment_number = int(existing[-1].stem.split("-")[1])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, message: AgentMessage):
+        """Log a message's routing metadata."""
+        self.append(LogEntry(
+            id=message.id,
+            type=message.type.value,
+            sender=message.sender_agent_id,
+            recipient=message.recipient_agent_id,
+            event_id=message.event_id,
+            timestamp=message.timestamp.isoformat(),
+        ))
+
+    def record_header(self, header: RoutingHeader):
+        """Log a routed message by its header."""
+        self.append(LogEntry(
+            id=header.id,
+            type=header.type,
+            sender=header.sender,
+            recipient=header.recipient,
+            event_id=header.event_id,
+            timestamp=header.timestamp,
+        ))
+
+    def append(self, entry: LogEntry):
+        """Add an entry, forgetting the oldest one if the buffer is full."""
+        if len(self._entries) >= self.capacity:
+            oldest = self._entries.popleft()
+            # The globally oldest entry is also the oldest in its buckets
+            self._unindex(self._by_event, oldest.event_id)
+            self._unindex(self._by_sender, oldest.sender)
+
+        self._entries.append(entry)
+        if entry.event_id is not None:
+            self._by_event.setdefault(entry.event_id, deque()).append(entry)
+        self._by_sender.setdefault(entry.sender, deque()).append(entry)
+        self.total_logged += 1
+
+        if self.log_dir is not None:
+            self._write(entry)
+
+    @staticmethod
+    def _unindex(index: Dict[str, Deque[LogEntry]], key: Optional[str]):
+        if key is None:
+            return
+        bucket = index[key]
+        bucket.popleft()
+        if not bucket:
+            del index[key]
+
+    def query(
+        self,
+        event_id: Optional[str] = None,
+        sender: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        """Get the newest matching entries (up to limit), oldest first.
+
+        since is an ISO timestamp; only messages stamped after it match.
+        """
+        if event_id is not None:
+            source = self._by_event.get(event_id, ())
+        elif sender is not None:
+            source = self._by_sender.get(sender, ())
+        else:
+            source = self._entries
+
+        matches: List[dict] = []
+        for entry in reversed(source):
+            if len(matches) >= limit:
+                break
+            if sender is not None and entry.sender != sender:
+                continue
+            if since is not None and entry.timestamp <= since:
+                continue
+            matches.append(entry.to_dict())
+        matches.reverse()
+        return matches
+
+    def _segment_paths(self) -> List[Path]:
+        return sorted(self.log_dir.glob("segment-*.jsonl"))
+
+    def _write(self, entry: LogEntry):
+        if self._segment is None or self._segment.tell() >= self.segment_max_bytes:
+            self._rotate()
+        self._segment.write(json.dumps(entry.to_dict()) + "\n")
+
+    def _rotate(self):
+        """Start a new segment and delete the oldest beyond max_segments."""
+        if self._segment is not None:
+            self._segment.close()
+        self._segment_number += 1
+        path = self.log_dir / f"segment-{self._segment_number:06d}.jsonl"
+        self._segment = open(path, "a", encoding="utf-8")
+
+        for old in self._segment_paths()[:-self.max_segments]:
+            old.unlink()
+
+    def close(self):
+        """Flush and close the current segment file."""
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def stats(self) -> dict:
+        """Buffer occupancy and index sizes."""
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "total_logged": self.total_logged,
+            "events_indexed": len(self._by_event),
+            "senders_indexed": len(self._by_sender),
+        }
@@ -1,11 +1,18 @@
 """Agent-to-Agent communication protocol for Yo-tei."""
 
+import json
+from abc import ABC, abstractmethod
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, NamedTuple, Union
 from pydantic import BaseModel, Field
 import shortuuid
 
+try:
+    import msgpack
+except ImportError:  # Optional: enables the binary wire codec
+    msgpack = None
+
 
 class MessageType(str, Enum):
     """Types of messages agents can send to each other."""
@@ -85,6 +92,8 @@ class AgentMessage(BaseModel):
             "payload": self.payload,
             "reply_to": self.reply_to,
             "requires_response": self.requires_response,
+            "shareable": self.shareable,
+            "response_timeout_seconds": self.response_timeout_seconds,
         }
 
     @classmethod
@@ -100,9 +109,171 @@ class AgentMessage(BaseModel):
             payload=data.get("payload", {}),
             reply_to=data.get("reply_to"),
             requires_response=data.get("requires_response", False),
+            shareable=data.get("shareable", True),
+            response_timeout_seconds=data.get("response_timeout_seconds", 300),
         )
 
 
+MESSAGE_TYPE_VALUES = frozenset(t.value for t in MessageType)
+
+# A websocket frame: text for JSON, bytes for binary codecs
+Frame = Union[str, bytes]
+
+
+class Codec(ABC):
+    """A wire encoding for message dicts."""
+
+    name = ""
+    binary = False
+
+    @abstractmethod
+    def encode(self, data: dict) -> Frame:
+        """Encode a dict as a websocket frame."""
+
+    @abstractmethod
+    def decode(self, frame: Frame) -> dict:
+        """Decode a websocket frame into a dict."""
+
+
+class JsonCodec(Codec):
+    """JSON text frames; every client understands these."""
+
+    name = "json"
+
+    def encode(self, data: dict) -> Frame:
+        return json.dumps(data)
+
+    def decode(self, frame: Frame) -> dict:
+        return json.loads(frame)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack binary frames (needs the msgpack package)."""
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, data: dict) -> Frame:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, frame: Frame) -> dict:
+        return msgpack.unpackb(frame, raw=False)
+
+
+JSON_CODEC = JsonCodec()
+
+# Codecs this process can speak, by name
+CODECS: Dict[str, Codec] = {"json": JSON_CODEC}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+
+def negotiate_codec(offered: Iterable[str]) -> Codec:
+    """Pick the first offered codec we support, falling back to JSON."""
+    for name in offered:
+        codec = CODECS.get(name.strip())
+        if codec is not None:
+            return codec
+    return JSON_CODEC
+
+
+def codec_for_frame(frame: Frame) -> Codec:
+    """Get the codec a received frame was encoded with."""
+    if isinstance(frame, str):
+        return JSON_CODEC
+    if "msgpack" not in CODECS:
+        raise ValueError("Binary frames need the msgpack package")
+    return CODECS["msgpack"]
+
+
+class RoutingHeader(NamedTuple):
+    """The fields the relay routes on, read without validating the payload."""
+
+    id: str
+    type: str
+    sender: str
+    recipient: str
+    event_id: Optional[str]
+    reply_to: Optional[str]
+    timestamp: str
+    requires_response: bool
+
+    @classmethod
+    def read(cls, data: dict) -> "RoutingHeader":
+        """Read the header from a wire dict. Raises ValueError if it is malformed."""
+        try:
+            header = cls(
+                id=data["id"],
+                type=data["type"],
+                sender=data["sender"],
+                recipient=data["recipient"],
+                event_id=data.get("event_id"),
+                reply_to=data.get("reply_to"),
+                timestamp=data["timestamp"],
+                requires_response=bool(data.get("requires_response", False)),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Missing message field: {e}") from None
+        if header.type not in MESSAGE_TYPE_VALUES:
+            raise ValueError(f"Unknown message type: {header.type!r}")
+        if not (isinstance(header.id, str) and isinstance(header.sender, str)
+                and isinstance(header.recipient, str) and isinstance(header.timestamp, str)):
+            raise ValueError("Message id, sender, recipient and timestamp must be strings")
+        return header
+
+
+class WireFrame:
+    """A wire dict that is encoded at most once per codec."""
+
+    __slots__ = ("wire", "_frames")
+
+    def __init__(self, wire: dict, frame: Optional[Frame] = None, codec: Optional[Codec] = None):
+        self.wire = wire
+        self._frames: Dict[str, Frame] = {}
+        if frame is not None and codec is not None:
+            self._frames[codec.name] = frame
+
+    def frame(self, codec: Codec) -> Frame:
+        """Get the encoding for a codec, reusing the received bytes when possible."""
+        frame = self._frames.get(codec.name)
+        if frame is None:
+            frame = self._frames[codec.name] = codec.encode(self.wire)
+        return frame
+
+
+class Envelope(WireFrame):
+    """An agent message as the relay handles it: routing header plus wire dict.
+
+    The payload is never validated or re-encoded for recipients using the
+    codec the message arrived in.
+    """
+
+    __slots__ = ("header", "shareable", "response_timeout_seconds")
+
+    def __init__(
+        self,
+        wire: dict,
+        frame: Optional[Frame] = None,
+        codec: Optional[Codec] = None,
+    ):
+        super().__init__(wire, frame, codec)
+        self.header = RoutingHeader.read(wire)
+        try:
+            self.shareable = bool(wire.get("shareable", True))
+            self.response_timeout_seconds = int(wire.get("response_timeout_seconds", 300))
+        except (TypeError, ValueError):
+            raise ValueError("response_timeout_seconds must be an integer") from None
+
+    @classmethod
+    def from_message(cls, message: "AgentMessage") -> "Envelope":
+        return cls(message.to_wire())
+
+    @classmethod
+    def of(cls, message: Union["AgentMessage", "Envelope"]) -> "Envelope":
+        """Wrap an AgentMessage; envelopes are returned as is."""
+        return message if isinstance(message, Envelope) else cls.from_message(message)
+
+
 # Message factory functions for common message types
 
 def create_hello_message(agent_id: str, user_name: str) -> AgentMessage:
@@ -1,50 +1,366 @@
 """WebSocket relay server for agent-to-agent communication."""
 
 import asyncio
-import json
+import heapq
+import itertools
+import secrets
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, Set, Optional
+from pathlib import Path
+from enum import Enum
+from typing import Dict, Set, Optional, Iterable, Callable, Awaitable, Deque, Tuple, Union, List
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from .protocol import AgentMessage, MessageType, create_error_message
+from ..config.settings import get_settings
+from .mailbox import Mailbox
+from .message_log import MessageLog
+from .protocol import (
+    AgentMessage,
+    MessageType,
+    Codec,
+    Envelope,
+    Frame,
+    JSON_CODEC,
+    WireFrame,
+    codec_for_frame,
+    create_error_message,
+    negotiate_codec,
+)
+
+
+class OverflowPolicy(str, Enum):
+    """What to do when an agent's outbound queue is full."""
+
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued frame (system broadcasts)
+    BLOCK = "block"  # Wait up to the send timeout for room
+    ERROR = "error"  # Refuse the frame straight away
+
+
+class OutboundQueueFull(Exception):
+    """A frame could not be queued for an agent."""
 
 
 class AgentConnection:
-    """Represents a connected agent."""
+    """Represents a connected agent.
 
-    def __init__(self, agent_id: str, websocket: WebSocket):
+    Frames are queued and written by a per-connection writer task, so a slow
+    consumer only ever holds up its own queue. A write that takes longer
+    than send_timeout fails the connection.
+    """
+
+    def __init__(
+        self,
+        agent_id: str,
+        websocket: WebSocket,
+        queue_size: int = 256,
+        send_timeout: float = 5.0,
+        direct_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        on_failure: Optional[Callable[["AgentConnection"], Awaitable[None]]] = None,
+        codec: Codec = JSON_CODEC,
+    ):
         self.agent_id = agent_id
         self.websocket = websocket
+        self.codec = codec
         self.connected_at = datetime.utcnow()
         self.last_ping = datetime.utcnow()
+        self.last_activity = time.monotonic()  # when the agent last sent any frame
         self.subscribed_events: Set[str] = set()
 
-    async def send(self, message: AgentMessage):
+        self.send_timeout = send_timeout
+        self.direct_policy = direct_policy
+        self.on_failure = on_failure
+        self.queue_size = queue_size
+        self._frames: Deque[Tuple[Frame, bool]] = deque()  # (frame, droppable)
+        self._changed = asyncio.Condition()
+        self._sending = False
+        self._failed = False
+        self._writer: Optional[asyncio.Task] = None
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_rejected = 0
+
+    def touch(self):
+        """Record that the agent is alive."""
+        self.last_activity = time.monotonic()
+
+    def start(self):
+        """Start the writer task."""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def stop(self):
+        """Stop the writer task and discard anything still queued."""
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._writer = None
+        self._frames.clear()
+
+    async def _write_loop(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._frames)
+                frame, _ = self._frames.popleft()
+                self._sending = True
+                self._changed.notify_all()
+            try:
+                # A peer that stops reading fails here rather than holding the writer
+                send = self.websocket.send_bytes if isinstance(frame, bytes) else self.websocket.send_text
+                await asyncio.wait_for(send(frame), self.send_timeout)
+                self.frames_sent += 1
+            except Exception:
+                self._failed = True
+                self._sending = False
+                if self.on_failure:
+                    await self.on_failure(self)
+                return
+            async with self._changed:
+                self._sending = False
+                self._changed.notify_all()
+
+    @property
+    def queue_full(self) -> bool:
+        return len(self._frames) >= self.queue_size
+
+    async def enqueue(self, frame: Frame, policy: OverflowPolicy):
+        """Queue an encoded frame, applying policy if the queue is full.
+
+        DROP_OLDEST frames only ever displace other DROP_OLDEST frames; if
+        none are queued the new frame is dropped instead. Raises
+        OutboundQueueFull if the frame was refused or no room opened up
+        within send_timeout.
+        """
+        droppable = policy is OverflowPolicy.DROP_OLDEST
+        async with self._changed:
+            if self.queue_full:
+                if droppable:
+                    self.frames_dropped += 1
+                    oldest = next((i for i, (_, d) in enumerate(self._frames) if d), None)
+                    if oldest is None:
+                        return
+                    del self._frames[oldest]
+                elif policy is OverflowPolicy.ERROR:
+                    self.frames_rejected += 1
+                    raise OutboundQueueFull(f"Outbound queue for {self.agent_id} is full")
+                else:
+                    try:
+                        await asyncio.wait_for(
+                            self._changed.wait_for(lambda: not self.queue_full),
+                            self.send_timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        self.frames_rejected += 1
+                        raise OutboundQueueFull(
+                            f"Outbound queue for {self.agent_id} stayed full"
+                        ) from None
+            self._frames.append((frame, droppable))
+            self._changed.notify_all()
+
+    async def flush(self) -> bool:
+        """Wait until everything queued so far has been written.
+
+        Returns False if the writer failed or was stopped first.
+        """
+        writer = self._writer
+        if writer is None or writer.done():
+            return not self._frames and not self._failed
+
+        async def drained():
+            async with self._changed:
+                await self._changed.wait_for(lambda: not self._frames and not self._sending)
+
+        waiter = asyncio.ensure_future(drained())
+        done, _ = await asyncio.wait({waiter, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if waiter not in done:
+            waiter.cancel()
+            return False
+        return not self._failed
+
+    async def send(self, message: Union[AgentMessage, Envelope]):
         """Send a message to this agent."""
-        await self.websocket.send_json(message.to_wire())
+        await self.enqueue(Envelope.of(message).frame(self.codec), self.direct_policy)
 
-    async def send_json(self, data: dict):
-        """Send raw JSON to this agent."""
-        await self.websocket.send_json(data)
+    async def send_json(self, data: dict, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        """Send a system frame to this agent; by default the oldest is dropped on overflow."""
+        await self.enqueue(self.codec.encode(data), policy)
+
+    async def close(self):
+        """Stop writing and close the websocket, ignoring errors from a dead peer."""
+        self.stop()
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+    def queue_stats(self) -> dict:
+        """Outbound queue depth and counters."""
+        return {
+            "depth": len(self._frames),
+            "capacity": self.queue_size,
+            "sent": self.frames_sent,
+            "dropped": self.frames_dropped,
+            "rejected": self.frames_rejected,
+        }
+
+
+class AgentSession:
+    """An agent's recent direct messages, kept so a dropped link can resume.
+
+    Outlives the connection by the relay's session TTL; an agent that
+    reconnects with the token gets whatever came after the last message
+    it saw.
+    """
+
+    def __init__(self, replay_size: int):
+        self.token = secrets.token_urlsafe(16)
+        self.recent: Deque[Envelope] = deque(maxlen=replay_size)
+        self.expires_at: Optional[float] = None  # Set while the agent is disconnected
+
+    def after(self, last_seen: Optional[str]) -> List[Envelope]:
+        """Messages sent after last_seen, or all kept ones if it is None.
+
+        An id we don't hold gets nothing: the agent may already have the
+        kept messages, and sending them again would duplicate them.
+        """
+        recent = list(self.recent)
+        if last_seen is None:
+            return recent
+        for index in range(len(recent) - 1, -1, -1):
+            if recent[index].header.id == last_seen:
+                return recent[index + 1:]
+        return []
 
 
 class RelayServer:
     """WebSocket relay server for routing messages between agents."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: Optional[float] = None,
+        queue_size: Optional[int] = None,
+        direct_overflow: Optional[OverflowPolicy] = None,
+        mailbox: Optional[Mailbox] = None,
+    ):
+        config = get_settings().relay
+        self.mailbox = mailbox
+        self.mailbox_flush_batch = config.mailbox_flush_batch
+        self.send_timeout = send_timeout or config.send_timeout
+        self.queue_size = queue_size or config.outbound_queue_size
+        self.direct_overflow = OverflowPolicy(direct_overflow or config.direct_overflow)
         self.connections: Dict[str, AgentConnection] = {}
         self.event_subscriptions: Dict[str, Set[str]] = {}  # event_id -> {agent_ids}
-        self.message_log: list = []  # In production, use proper storage
+        self.sessions: Dict[str, AgentSession] = {}  # agent_id -> session
+        self.session_ttl = config.session_ttl
+        self.session_replay_size = config.session_replay_size
+        self.liveness_timeout = config.liveness_timeout
+        self.reaper_interval = config.reaper_interval
+        # Min-heap of (last_activity, seq, connection), one entry per connection;
+        # entries are refreshed lazily when they reach the top
+        self._liveness: List[Tuple[float, int, AgentConnection]] = []
+        self._liveness_seq = itertools.count()
+        self._reaper: Optional[asyncio.Task] = None
+        self.churn = {"connected": 0, "disconnected": 0, "evicted": 0, "reaped": 0}
+        self.message_log = MessageLog(
+            capacity=config.message_log_capacity,
+            log_dir=Path(config.message_log_dir).expanduser() if config.message_log_dir else None,
+            segment_max_bytes=config.message_log_segment_bytes,
+            max_segments=config.message_log_segments,
+        )
+
+    async def start(self):
+        """Start background work: the stale connection reaper."""
+        if self.liveness_timeout > 0 and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        """Stop background work started by start()."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reaper_interval)
+            await self.reap_stale()
+
+    def _track(self, connection: AgentConnection):
+        heapq.heappush(self._liveness, (connection.last_activity, next(self._liveness_seq), connection))
+
+    async def reap_stale(self, now: Optional[float] = None) -> int:
+        """Disconnect agents silent for longer than liveness_timeout.
+
+        Only heap entries older than the cutoff are looked at. One whose
+        connection has been active since goes back with its newer time;
+        one whose connection is gone is dropped. Returns how many were reaped.
+        """
+        cutoff = (now or time.monotonic()) - self.liveness_timeout
+        reaped = 0
+        while self._liveness and self._liveness[0][0] <= cutoff:
+            connection = self._liveness[0][2]
+            if self.connections.get(connection.agent_id) is not connection:
+                heapq.heappop(self._liveness)
+            elif connection.last_activity > cutoff:
+                heapq.heapreplace(
+                    self._liveness, (connection.last_activity, next(self._liveness_seq), connection),
+                )
+            else:
+                heapq.heappop(self._liveness)
+                await self._evict(connection, "reaped")
+                reaped += 1
+        return reaped
 
-    async def connect(self, agent_id: str, websocket: WebSocket) -> AgentConnection:
-        """Register a new agent connection."""
+    async def connect(
+        self,
+        agent_id: str,
+        websocket: WebSocket,
+        codecs: Optional[List[str]] = None,
+        session: Optional[str] = None,
+        last_seen: Optional[str] = None,
+    ) -> AgentConnection:
+        """Register a new agent connection.
+
+        If the agent offered codecs, the chosen one is announced in a JSON
+        {"cmd": "codec"} frame before anything else is sent.
+
+        An agent that passes a session token (or "new") gets a JSON
+        {"cmd": "session"} frame next. If the token matches its live session,
+        direct messages after last_seen are delivered again first.
+        """
         await websocket.accept()
-        connection = AgentConnection(agent_id, websocket)
+        codec = negotiate_codec(codecs) if codecs else JSON_CODEC
+        previous = self.connections.get(agent_id)
+        if previous is not None:
+            await previous.close()
+        connection = AgentConnection(
+            agent_id,
+            websocket,
+            queue_size=self.queue_size,
+            send_timeout=self.send_timeout,
+            direct_policy=self.direct_overflow,
+            on_failure=self._evict,
+            codec=codec,
+        )
+        if previous is not None:
+            # The new link takes over the agent's subscriptions, so they are
+            # cleaned up (and cluster interest withdrawn) when it goes
+            connection.subscribed_events = previous.subscribed_events
         self.connections[agent_id] = connection
+        connection.start()
+        self._track(connection)
+        self.churn["connected"] += 1
+        if codecs:
+            await connection.enqueue(
+                JSON_CODEC.encode({"cmd": "codec", "codec": codec.name}), OverflowPolicy.BLOCK,
+            )
+        if session is not None:
+            await self._resume_session(connection, session, last_seen)
+
+        if self.mailbox is not None:
+            await self.flush_mailbox(connection)
 
         # Broadcast hello to other agents
         await self.broadcast_system({
@@ -55,17 +371,58 @@ class RelayServer:
 
         return connection
 
-    async def disconnect(self, agent_id: str):
-        """Remove an agent connection."""
-        if agent_id in self.connections:
-            del self.connections[agent_id]
-
-            # Remove from all event subscriptions
-            for event_id in list(self.event_subscriptions.keys()):
-                self.event_subscriptions[event_id].discard(agent_id)
-                if not self.event_subscriptions[event_id]:
+    async def _resume_session(self, connection: AgentConnection, token: str, last_seen: Optional[str]):
+        """Announce the agent's session and replay what it missed."""
+        now = time.monotonic()
+        for agent_id, expired in list(self.sessions.items()):
+            if expired.expires_at is not None and expired.expires_at <= now:
+                del self.sessions[agent_id]
+
+        session = self.sessions.get(connection.agent_id)
+        resumed = session is not None and secrets.compare_digest(session.token.encode(), token.encode())
+        if not resumed:
+            session = AgentSession(self.session_replay_size)
+            self.sessions[connection.agent_id] = session
+        session.expires_at = None
+
+        await connection.enqueue(JSON_CODEC.encode({
+            "cmd": "session", "session": session.token, "resumed": resumed,
+        }), OverflowPolicy.BLOCK)
+        if resumed:
+            for envelope in session.after(last_seen):
+                try:
+                    await connection.send(envelope)
+                except OutboundQueueFull:
+                    break
+
+    def _remove(self, agent_id: str, connection: Optional[AgentConnection] = None) -> bool:
+        """Drop an agent's connection and subscriptions without notifying anyone.
+
+        If connection is given, only that connection is removed, so a stale
+        socket cannot remove the agent's newer connection.
+        """
+        current = self.connections.get(agent_id)
+        if current is None or (connection is not None and current is not connection):
+            return False
+        del self.connections[agent_id]
+        current.stop()
+        session = self.sessions.get(agent_id)
+        if session is not None:
+            session.expires_at = time.monotonic() + self.session_ttl
+
+        # Remove from all event subscriptions
+        for event_id in current.subscribed_events:
+            subscribers = self.event_subscriptions.get(event_id)
+            if subscribers is not None:
+                subscribers.discard(agent_id)
+                if not subscribers:
                     del self.event_subscriptions[event_id]
+        return True
 
+    async def disconnect(self, agent_id: str, connection: Optional[AgentConnection] = None):
+        """Remove an agent connection."""
+        if self._remove(agent_id, connection):
+            self.churn["disconnected"] += 1
             # Broadcast goodbye
             await self.broadcast_system({
                 "type": "agent_disconnected",
@@ -73,102 +430,239 @@ class RelayServer:
                 "timestamp": datetime.utcnow().isoformat(),
             })
 
-    async def handle_message(self, sender_id: str, data: dict):
-        """Handle an incoming message from an agent."""
+    async def handle_message(
+        self,
+        sender_id: str,
+        data: dict,
+        frame: Optional[Frame] = None,
+        codec: Optional[Codec] = None,
+    ):
+        """Handle an incoming message from an agent.
+
+        Only the routing header is read. frame is the message as received in
+        codec; recipients on the same codec get those bytes unchanged.
+        """
 
         try:
-            message = AgentMessage.from_wire(data)
-        except Exception as e:
+            envelope = Envelope(data, frame, codec)
+        except ValueError as e:
             # Send error back to sender
             if sender_id in self.connections:
-                error = create_error_message(
-                    "relay",
-                    sender_id,
-                    "INVALID_MESSAGE",
-                    str(e),
+                await self._send_error(
+                    self.connections[sender_id],
+                    create_error_message("relay", sender_id, "INVALID_MESSAGE", str(e)),
                 )
-                await self.connections[sender_id].send(error)
             return
 
         # Log message (excluding sensitive ones)
-        if message.shareable:
-            self.message_log.append({
-                "id": message.id,
-                "type": message.type.value,
-                "sender": message.sender_agent_id,
-                "recipient": message.recipient_agent_id,
-                "event_id": message.event_id,
-                "timestamp": message.timestamp.isoformat(),
-            })
+        if envelope.shareable:
+            self.message_log.record_header(envelope.header)
 
         # Route the message
-        if message.recipient_agent_id == "broadcast":
-            await self.broadcast(message, exclude={sender_id})
-        elif message.recipient_agent_id.startswith("event:"):
+        recipient = envelope.header.recipient
+        if recipient == "broadcast":
+            await self.broadcast(envelope, exclude={sender_id})
+        elif recipient.startswith("event:"):
             # Broadcast to all agents subscribed to an event
-            event_id = message.recipient_agent_id.replace("event:", "")
-            await self.broadcast_to_event(event_id, message, exclude={sender_id})
+            event_id = recipient.replace("event:", "")
+            await self.broadcast_to_event(event_id, envelope, exclude={sender_id})
         else:
             # Direct message to specific agent
-            await self.route_to_agent(message)
+            await self.route_to_agent(envelope)
 
-    async def route_to_agent(self, message: AgentMessage):
-        """Route a message to a specific agent."""
-        recipient_id = message.recipient_agent_id
+    async def handle_batch(self, sender_id: str, messages: List[dict]):
+        """Handle a batch frame's messages in order."""
+        for data in messages:
+            await self.handle_message(sender_id, data)
 
-        if recipient_id in self.connections:
-            await self.connections[recipient_id].send(message)
+    async def route_to_agent(self, message: Union[AgentMessage, Envelope]):
+        """Route a message to a specific agent."""
+        envelope = Envelope.of(message)
+        recipient_id = envelope.header.recipient
+        connection = self.connections.get(recipient_id)
+
+        if connection is not None:
+            try:
+                await connection.send(envelope)
+                session = self.sessions.get(recipient_id)
+                if session is not None:
+                    session.recent.append(envelope)
+            except OutboundQueueFull:
+                if connection.direct_policy is OverflowPolicy.BLOCK:
+                    await self._evict(connection)
+                if envelope.header.requires_response:
+                    await self._reply_error(
+                        envelope, "AGENT_BUSY", f"Agent {recipient_id} is not accepting messages",
+                    )
+        elif self.mailbox is not None and await self.mailbox.put(envelope):
+            # Delivered when the agent reconnects; any reply comes then
+            pass
         else:
-            # Agent not online - queue for later or send error
-            if message.requires_response:
-                error = create_error_message(
-                    "relay",
-                    message.sender_agent_id,
-                    "AGENT_OFFLINE",
-                    f"Agent {recipient_id} is not online",
-                    reply_to=message.id,
+            # Agent not online and the message can't be held - send error
+            if envelope.header.requires_response:
+                await self._reply_error(
+                    envelope, "AGENT_OFFLINE", f"Agent {recipient_id} is not online",
                 )
-                if message.sender_agent_id in self.connections:
-                    await self.connections[message.sender_agent_id].send(error)
 
-    async def broadcast(self, message: AgentMessage, exclude: Set[str] = None):
+    async def flush_mailbox(self, connection: AgentConnection) -> int:
+        """Deliver an agent's held messages in batches. Returns how many were sent.
+
+        Each batch is acknowledged once it has been written to the
+        websocket. If the connection fails, stays full or is replaced, the
+        unwritten messages remain in the mailbox for the next connect.
+        """
+        agent_id = connection.agent_id
+        sent = 0
+        while self.connections.get(agent_id) is connection:
+            batch = await self.mailbox.fetch(agent_id, self.mailbox_flush_batch)
+            if not batch:
+                break
+            delivered = 0
+            try:
+                for _, text in batch:
+                    if connection.codec is not JSON_CODEC:
+                        text = connection.codec.encode(JSON_CODEC.decode(text))
+                    await connection.enqueue(text, OverflowPolicy.BLOCK)
+                    delivered += 1
+            except OutboundQueueFull:
+                pass
+            if not await connection.flush() or self.connections.get(agent_id) is not connection:
+                break
+            if delivered:
+                await self.mailbox.ack(agent_id, batch[delivered - 1][0], delivered)
+                sent += delivered
+            if delivered < len(batch):
+                break
+        return sent
+
+    async def _reply_error(self, envelope: Envelope, error_code: str, error_message: str):
+        """Tell a sender its message was not delivered, if the sender has room."""
+        sender = self.connections.get(envelope.header.sender)
+        if sender is None:
+            return
+        await self._send_error(sender, create_error_message(
+            "relay",
+            envelope.header.sender,
+            error_code,
+            error_message,
+            reply_to=envelope.header.id,
+        ))
+
+    async def reply(self, connection: AgentConnection, data: dict):
+        """Answer an agent's command; never dropped, so a stuck agent is evicted."""
+        try:
+            await connection.send_json(data, OverflowPolicy.BLOCK)
+        except OutboundQueueFull:
+            await self._evict(connection)
+
+    @staticmethod
+    async def _send_error(connection: AgentConnection, error: AgentMessage):
+        try:
+            await connection.enqueue(connection.codec.encode(error.to_wire()), OverflowPolicy.ERROR)
+        except OutboundQueueFull:
+            pass
+
+    async def _evict(self, connection: AgentConnection, reason: str = "evicted"):
+        """Close a failed, stuck or silent connection and announce its departure."""
+        if self._remove(connection.agent_id, connection):
+            self.churn[reason] += 1
+            await connection.close()
+            await self.broadcast_system({
+                "type": "agent_disconnected",
+                "agent_id": connection.agent_id,
+                "timestamp": datetime.utcnow().isoformat(),
+            })
+
+    async def fan_out(self, agent_ids: Iterable[str], frames: WireFrame, policy: OverflowPolicy):
+        """Queue one message for many agents, encoding it once per codec.
+
+        Recipients with room are queued immediately. Those with full queues are
+        handled concurrently under policy; with BLOCK, agents that stay full
+        past send_timeout are evicted.
+        """
+        full = []
+        for agent_id in agent_ids:
+            connection = self.connections.get(agent_id)
+            if connection is None:
+                continue
+            if connection.queue_full and policy is not OverflowPolicy.DROP_OLDEST:
+                full.append(connection)
+            else:
+                await connection.enqueue(frames.frame(connection.codec), policy)
+
+        if not full:
+            return
+        results = await asyncio.gather(
+            *(connection.enqueue(frames.frame(connection.codec), policy) for connection in full),
+            return_exceptions=True,
+        )
+        if policy is OverflowPolicy.BLOCK:
+            await asyncio.gather(*(
+                self._evict(connection)
+                for connection, result in zip(full, results)
+                if isinstance(result, OutboundQueueFull)
+            ))
+
+    async def broadcast(self, message: Union[AgentMessage, Envelope], exclude: Set[str] = None):
         """Broadcast a message to all connected agents."""
         exclude = exclude or set()
-
-        for agent_id, connection in self.connections.items():
-            if agent_id not in exclude:
-                try:
-                    await connection.send(message)
-                except Exception:
-                    pass  # Handle disconnected clients
+        await self.fan_out(
+            [a for a in self.connections if a not in exclude],
+            Envelope.of(message),
+            self.direct_overflow,
+        )
 
     async def broadcast_to_event(
         self,
         event_id: str,
-        message: AgentMessage,
+        message: Union[AgentMessage, Envelope],
         exclude: Set[str] = None,
     ):
-        """Broadcast a message to all agents subscribed to an event."""
-        exclude = exclude or set()
+        """Broadcast a message to all agents subscribed to an event.
+
+        For requests (requires_response), the sender is first told which
+        agents it reached, so it knows how many replies to wait for.
+        """
+        envelope = Envelope.of(message)
+        recipients = self._event_recipients(event_id, exclude or set())
+        if envelope.header.requires_response:
+            await self._announce_fanout(envelope, recipients)
+        await self.fan_out(recipients, envelope, self.direct_overflow)
+
+    def _event_recipients(self, event_id: str, exclude: Set[str]) -> List[str]:
         subscribers = self.event_subscriptions.get(event_id, set())
-
-        for agent_id in subscribers:
-            if agent_id not in exclude and agent_id in self.connections:
-                try:
-                    await self.connections[agent_id].send(message)
-                except Exception:
-                    pass
+        return [a for a in subscribers if a not in exclude and a in self.connections]
+
+    @staticmethod
+    def _fanout_ack(envelope: Envelope, recipients: List[str], more: int = 0) -> dict:
+        return {
+            "cmd": "fanout",
+            "reply_to": envelope.header.id,
+            "recipients": recipients,
+            "more": more,  # further acks to expect for this request (other relay workers)
+        }
+
+    async def _announce_fanout(self, envelope: Envelope, recipients: List[str]):
+        """Send a {"cmd": "fanout"} ack to the sender of an event request."""
+        await self._send_ack(envelope.header.sender, self._fanout_ack(envelope, recipients))
+
+    async def _send_ack(self, agent_id: str, ack: dict):
+        connection = self.connections.get(agent_id)
+        if connection is None:
+            return
+        try:
+            await connection.enqueue(connection.codec.encode(ack), self.direct_overflow)
+        except OutboundQueueFull:
+            pass
 
     async def broadcast_system(self, data: dict, exclude: Set[str] = None):
         """Broadcast a system message."""
         exclude = exclude or set()
-
-        for agent_id, connection in self.connections.items():
-            if agent_id not in exclude:
-                try:
-                    await connection.send_json(data)
-                except Exception:
-                    pass
+        await self.fan_out(
+            [a for a in self.connections if a not in exclude],
+            WireFrame(data),
+            OverflowPolicy.DROP_OLDEST,
+        )
 
     def subscribe_to_event(self, agent_id: str, event_id: str):
         """Subscribe an agent to event updates."""
@@ -187,6 +681,14 @@ class RelayServer:
         if agent_id in self.connections:
             self.connections[agent_id].subscribed_events.discard(event_id)
 
+    def churn_stats(self) -> dict:
+        """Connection churn counters and liveness tracking size."""
+        return {
+            **self.churn,
+            "online": len(self.connections),
+            "liveness_tracked": len(self._liveness),
+        }
+
     def get_online_agents(self) -> list:
         """Get list of online agent IDs."""
         return list(self.connections.keys())
@@ -200,6 +702,7 @@ class RelayServer:
                 "online": True,
                 "connected_at": conn.connected_at.isoformat(),
                 "subscribed_events": list(conn.subscribed_events),
+                "outbound_queue": conn.queue_stats(),
             }
         return None
 
@@ -212,10 +715,20 @@ relay = RelayServer()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
+    config = get_settings().relay
+    if config.mailbox_enabled:
+        relay.mailbox = Mailbox(max_per_agent=config.mailbox_max_messages)
+        await relay.mailbox.connect()
+    await relay.start()
     yield
     # Cleanup on shutdown
     for agent_id in list(relay.connections.keys()):
         await relay.disconnect(agent_id)
+    if relay.mailbox is not None:
+        await relay.mailbox.close()
+        relay.mailbox = None
+    await relay.stop()
+    relay.message_log.close()
 
 
 app = FastAPI(
@@ -235,30 +748,61 @@ app.add_middleware(
 
 
 @app.websocket("/ws/{agent_id}")
-async def websocket_endpoint(websocket: WebSocket, agent_id: str):
-    """WebSocket endpoint for agent connections."""
-    connection = await relay.connect(agent_id, websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    agent_id: str,
+    codecs: Optional[str] = None,
+    session: Optional[str] = None,
+    last_seen: Optional[str] = None,
+):
+    """WebSocket endpoint for agent connections.
+
+    Agents may offer wire codecs, best first: /ws/{agent_id}?codecs=msgpack,json
+    and resume a session: /ws/{agent_id}?session=<token>&last_seen=<message id>
+    """
+    connection = await relay.connect(
+        agent_id, websocket, codecs.split(",") if codecs else None, session, last_seen,
+    )
 
     try:
         while True:
-            data = await websocket.receive_json()
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            connection.touch()
+            frame = received.get("bytes")
+            if frame is None:
+                frame = received.get("text")
+            try:
+                codec = codec_for_frame(frame)
+                data = codec.decode(frame)
+            except Exception as e:
+                await RelayServer._send_error(connection, create_error_message(
+                    "relay", agent_id, "INVALID_MESSAGE", f"Could not decode frame: {e}",
+                ))
+                continue
 
             # Handle special commands
             if data.get("cmd") == "subscribe":
                 relay.subscribe_to_event(agent_id, data["event_id"])
-                await websocket.send_json({"status": "subscribed", "event_id": data["event_id"]})
+                await relay.reply(connection, {"status": "subscribed", "event_id": data["event_id"]})
             elif data.get("cmd") == "unsubscribe":
                 relay.unsubscribe_from_event(agent_id, data["event_id"])
-                await websocket.send_json({"status": "unsubscribed", "event_id": data["event_id"]})
+                await relay.reply(connection, {"status": "unsubscribed", "event_id": data["event_id"]})
+            elif data.get("cmd") == "batch":
+                await relay.handle_batch(agent_id, data.get("messages", []))
             elif data.get("cmd") == "ping":
                 connection.last_ping = datetime.utcnow()
-                await websocket.send_json({"cmd": "pong"})
+                await relay.reply(connection, {"cmd": "pong"})
             else:
                 # Regular message
-                await relay.handle_message(agent_id, data)
+                await relay.handle_message(agent_id, data, frame, codec)
 
     except WebSocketDisconnect:
-        await relay.disconnect(agent_id)
+        pass
+    finally:
+        # No-op if the connection was already evicted or replaced
+        await relay.disconnect(agent_id, connection)
 
 
 @app.get("/")
@@ -271,6 +815,16 @@ async def root():
     }
 
 
+@app.get("/stats")
+async def get_stats():
+    """Connection churn, outbound log and mailbox counters."""
+    return {
+        "connections": relay.churn_stats(),
+        "message_log": relay.message_log.stats(),
+        "mailbox": relay.mailbox.stats() if relay.mailbox is not None else None,
+    }
+
+
 @app.get("/agents")
 async def list_agents():
     """List online agents."""
@@ -280,6 +834,21 @@ async def list_agents():
     }
 
 
+@app.get("/messages")
+async def list_messages(
+    event_id: Optional[str] = None,
+    sender: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = 100,
+):
+    """Recent message metadata, filtered by event, sender and time."""
+    messages = relay.message_log.query(event_id=event_id, sender=sender, since=since, limit=limit)
+    return {
+        "messages": messages,
+        "count": len(messages),
+    }
+
+
 @app.get("/agents/{agent_id}")
 async def get_agent(agent_id: str):
     """Get status of a specific agent."""